@@ -7,6 +7,7 @@ from aiaccel import (
     module,
     optimizer,
     parameter,
+    pruner,
     storage,
     tensorboard,
     util,
@@ -24,6 +25,7 @@ __all__ = [
     "cli",
     "optimizer",
     "manager",
+    "pruner",
     "storage",
     "tensorboard",
     "util",
@@ -1,8 +1,14 @@
-from aiaccel.abci.qstat import parse_job_list, parse_qstat
+from aiaccel.abci.qdel import create_qdel_command
+from aiaccel.abci.qstat import QstatDiff, QstatPoller, iterparse_qstat, parse_job_list, parse_qstat, parse_task_ids
 from aiaccel.abci.qsub import create_qsub_command
 
 __all__ = [
+    "QstatDiff",
+    "QstatPoller",
+    "iterparse_qstat",
     "parse_job_list",
     "parse_qstat",
+    "parse_task_ids",
+    "create_qdel_command",
     "create_qsub_command",
 ]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+
+def create_qdel_command(job_id: str, task_id: int | None = None) -> list[str]:
+    """Create ABCI 'qdel' command.
+
+    Args:
+        job_id (str): The job id from 'qstat'.
+        task_id (int | None, optional): The task id of a task of an array
+            job. Defaults to None (the whole job).
+
+    Returns:
+        list: A list to run 'qdel' command.
+    """
+    command = ["qdel", str(job_id)]
+    if task_id is not None:
+        command += ["-t", str(task_id)]
+    return command
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import io
+import subprocess
+import time
 import xml.etree.ElementTree as ElementTree
-from typing import Any
+from typing import IO, Any, NamedTuple, Tuple, Union
 from xml.etree.ElementTree import Element
 
 """ Example of stat
@@ -19,6 +22,42 @@ stat = {
 }
 """
 
+# The keys of a stat by the tag of the 'qstat' XML, in the order of the stat.
+_JOB_LIST_TAGS = {
+    "JB_job_number": "job-ID",
+    "JAT_prio": "prior",
+    "JB_name": "name",
+    "JB_owner": "user",
+    "state": "state",
+    "JAT_start_time": "submit/start at",
+    "queue_name": "queue",
+    "jclass_name": "jclass",
+    "slots": "slots",
+    "tasks": "ja-task-ID",
+}
+
+# A job is identified by its job id and its task id. The pending tasks of an
+# array job share one entry, whose task id is None.
+JobKey = Tuple[str, Union[str, None]]
+
+
+def get_job_key(stat: dict[str, Any]) -> JobKey:
+    """Get the key of a job parsed from 'qstat'.
+
+    The range of the pending tasks of an array job, such as "3-10:1",
+    shrinks whenever a task starts, so it is not a part of the key.
+
+    Args:
+        stat (dict[str, Any]): A job parsed from 'qstat'.
+
+    Returns:
+        JobKey: The job id, and the task id of a running task or None.
+    """
+    task_id = stat["ja-task-ID"]
+    if task_id is not None and not task_id.strip().isdigit():
+        task_id = None
+    return (stat["job-ID"], task_id)
+
 
 def parse_qstat(qstat: str) -> list[dict[str, Any]]:
     """Parse ABCI 'qstat' command result.
@@ -30,16 +69,32 @@ def parse_qstat(qstat: str) -> list[dict[str, Any]]:
     Returns:
         list[dict]: A parsed job list from ABCI 'qstat' command.
     """
-    root = ElementTree.fromstring(qstat)
-    stat_list = []
+    return list(iterparse_qstat(io.BytesIO(qstat.encode("utf-8"))).values())
 
-    for i in root.findall("./queue_info/job_list"):
-        stat_list += parse_job_list(i)
 
-    for i in root.findall("./job_info/job_list"):
-        stat_list += parse_job_list(i)
+def iterparse_qstat(source: IO[bytes]) -> dict[JobKey, dict[str, Any]]:
+    """Parse ABCI 'qstat' command result while it is read.
 
-    return stat_list
+    Each job is parsed as soon as its element has been read, and the element
+    is discarded, so the whole document is never held in memory.
+
+    Args:
+        source (IO[bytes]): The output of 'qstat -xml'.
+
+    Returns:
+        dict[JobKey, dict[str, Any]]: The parsed jobs by job id and task id.
+
+    Raises:
+        ElementTree.ParseError: Causes when the output is not a valid XML.
+    """
+    jobs: dict[JobKey, dict[str, Any]] = {}
+    for _, element in ElementTree.iterparse(source, events=("end",)):
+        if element.tag != "job_list":
+            continue
+        for stat in parse_job_list(element):
+            jobs[get_job_key(stat)] = stat
+        element.clear()
+    return jobs
 
 
 def parse_job_list(job_list: Element) -> list[dict[str, Any]]:
@@ -52,52 +107,125 @@ def parse_job_list(job_list: Element) -> list[dict[str, Any]]:
     Returns:
         list: A job list converted from a XML element of 'qstat' command.
     """
-    stat_list = []
-    job_id = None
-    prior = None
-    name = None
-    user = None
-    state = None
-    submit_start_at = None
-    queue = None
-    jclass = None
-    slots = None
-    ja_task_id = None
-
+    stat: dict[str, Any] = dict.fromkeys(_JOB_LIST_TAGS.values())
     for j in job_list:
-        if "JB_job_number" == j.tag:
-            job_id = j.text
-        elif "JAT_prio" == j.tag:
-            prior = j.text
-        elif "JB_name" == j.tag:
-            name = j.text
-        elif "JB_owner" == j.tag:
-            user = j.text
-        elif "state" == j.tag:
-            state = j.text
-        elif "JAT_start_time" == j.tag:
-            submit_start_at = j.text
-        elif "queue_name" == j.tag:
-            queue = j.text
-        elif "jclass_name" == j.tag:
-            jclass = j.text
-        elif "slots" == j.tag:
-            slots = j.text
-
-    if job_id is not None and name is not None:
-        stat_list.append(
-            {
-                "job-ID": job_id,
-                "prior": prior,
-                "name": name,
-                "user": user,
-                "state": state,
-                "submit/start at": submit_start_at,
-                "queue": queue,
-                "jclass": jclass,
-                "slots": slots,
-                "ja-task-ID": ja_task_id,
-            }
-        )
-
-    return stat_list
+        key = _JOB_LIST_TAGS.get(j.tag)
+        if key is not None:
+            stat[key] = j.text
+
+    if stat["job-ID"] is None or stat["name"] is None:
+        return []
+    return [stat]
+
+
+def parse_task_ids(tasks: str | None) -> list[int]:
+    """Parse the task ids of an array job from 'qstat'.
+
+    The pending tasks of an array job are shown in one entry as ranges such
+    as "2-10:1" or "1,4-8:2", and each running task in its own entry.
+
+    Args:
+        tasks (str | None): The 'ja-task-ID' of a job.
+
+    Returns:
+        list[int]: The task ids. Empty if the job is not an array job.
+    """
+    if tasks is None or tasks.strip() == "":
+        return []
+    task_ids: list[int] = []
+    for part in tasks.strip().split(","):
+        first, _, rest = part.partition("-")
+        if rest == "":
+            task_ids.append(int(first))
+            continue
+        last, _, step = rest.partition(":")
+        task_ids.extend(range(int(first), int(last) + 1, int(step) if step != "" else 1))
+    return task_ids
+
+
+class QstatDiff(NamedTuple):
+    """The changes of the jobs between two runs of 'qstat'.
+
+    A job is changed if its state has changed.
+    """
+
+    added: list[dict[str, Any]]
+    changed: list[dict[str, Any]]
+    removed: list[dict[str, Any]]
+
+
+def diff_jobs(old: dict[JobKey, dict[str, Any]], new: dict[JobKey, dict[str, Any]]) -> QstatDiff:
+    """Get the changes of the jobs between two runs of 'qstat'.
+
+    Args:
+        old (dict[JobKey, dict[str, Any]]): The jobs of the previous run.
+        new (dict[JobKey, dict[str, Any]]): The jobs of the current run.
+
+    Returns:
+        QstatDiff: The added and the changed jobs of `new`, and the jobs of
+        `old` that have left the queue.
+    """
+    added = [stat for key, stat in new.items() if key not in old]
+    changed = [stat for key, stat in new.items() if key in old and old[key]["state"] != stat["state"]]
+    removed = [stat for key, stat in old.items() if key not in new]
+    return QstatDiff(added, changed, removed)
+
+
+class QstatPoller:
+    """Runs 'qstat' at most once per interval and keeps the jobs.
+
+    On a busy group the output of 'qstat' is large, so all users of the job
+    states read `jobs` instead of running 'qstat' themselves. If 'qstat'
+    fails, the jobs of the previous run are kept.
+
+    Args:
+        min_interval (float): The minimum seconds between two runs of
+            'qstat'.
+        command (list[str] | None, optional): The command printing the jobs
+            in the XML of 'qstat -xml'. Defaults to None ('qstat -xml').
+
+    Attributes:
+        jobs (dict[JobKey, dict[str, Any]]): The jobs of the last run by job
+            id and task id.
+        num_polls (int): The number of runs of 'qstat'.
+    """
+
+    def __init__(self, min_interval: float, command: list[str] | None = None) -> None:
+        self.min_interval = min_interval
+        self.command = ["qstat", "-xml"] if command is None else command
+        self.jobs: dict[JobKey, dict[str, Any]] = {}
+        self.num_polls = 0
+        self._last_poll_time: float | None = None
+
+    def poll(self, force: bool = False) -> QstatDiff | None:
+        """Runs 'qstat' unless it has run in the last min_interval seconds.
+
+        Args:
+            force (bool, optional): Runs 'qstat' regardless of the interval.
+                Defaults to False.
+
+        Returns:
+            QstatDiff | None: The changes of the jobs. None if 'qstat' has
+            not run or has failed.
+        """
+        now = time.monotonic()
+        if not force and self._last_poll_time is not None and now - self._last_poll_time < self.min_interval:
+            return None
+        self._last_poll_time = now
+        self.num_polls += 1
+
+        proc = subprocess.Popen(self.command, stdout=subprocess.PIPE)
+        assert proc.stdout is not None
+        jobs: dict[JobKey, dict[str, Any]] | None
+        try:
+            jobs = iterparse_qstat(proc.stdout)
+        except ElementTree.ParseError:
+            jobs = None
+        finally:
+            proc.stdout.close()
+        if proc.wait() != 0 or jobs is None:
+            return None
+
+        diff = diff_jobs(self.jobs, jobs)
+        self.jobs = jobs
+        return diff
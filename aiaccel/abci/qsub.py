@@ -23,12 +23,15 @@ stat = {
 """
 
 
-def create_qsub_command(config: DictConfig, runner_file: Path) -> list[str]:
+def create_qsub_command(config: DictConfig, runner_file: Path, num_tasks: int | None = None) -> list[str]:
     """Create ABCI 'qsub' command.
 
     Args:
         config (Config): A Config object.
         runner_file (Path): A path of 'qsub' batch file.
+        num_tasks (int | None, optional): The number of tasks of an array
+            job. The tasks are numbered from 1. Defaults to None (not an
+            array job).
 
     Returns:
         list: A list to run 'qsub' command.
@@ -46,6 +49,8 @@ def create_qsub_command(config: DictConfig, runner_file: Path) -> list[str]:
         f"{path / dict_stderr}",
         str(runner_file),
     ]
+    if num_tasks is not None:
+        command[-1:-1] = ["-t", f"1-{num_tasks}"]
 
     #
     # additional option
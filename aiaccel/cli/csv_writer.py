@@ -1,4 +1,5 @@
 import csv
+import itertools
 import os
 from logging import StreamHandler, getLogger
 
@@ -34,7 +35,9 @@ class CsvWriter:
         self.workspace = Workspace(self.config.generic.workspace)
         self.fp = self.workspace.result_csv_file
         self.trialid = TrialId(self.config)
-        self.storage = Storage(self.workspace.storage_file_path)
+        self.storage = Storage(
+            self.workspace.storage_file_path, backend=self.config.generic.storage_backend, read_only=True
+        )
         self.lock_file = {"result_txt": str(self.workspace.lock / "result_txt")}
 
     def _get_zero_padding_trial_id(self, trial_id: int) -> str:
@@ -57,39 +60,28 @@ class CsvWriter:
         Returns:
             None
         """
-        data = []
-        header = []
-
-        trial_ids = self.storage.trial.get_all_trial_id()
-
-        if trial_ids is None or len(trial_ids) == 0:
+        # Trials are streamed in batches so that large studies are not loaded
+        # into memory at once.
+        records = self.storage.get_trials()
+        example = next(records, None)
+        if example is None:
             return
 
-        # write header
-        example = self.storage.get_hp_dict(trial_ids[0])
-        header.append("trial_id")
-        for param in example["parameters"]:
-            header.append(param["parameter_name"])
-        header.append("objective")
-
         with InterProcessLock(self.lock_file["result_txt"]):
             with open(self.fp, "w") as f:
                 writer = csv.writer(f, lineterminator="\n")
-                writer.writerow(header)
 
-        # write result data
-        trial_id_str = [self._get_zero_padding_trial_id(trial_id) for trial_id in trial_ids]
-        results = [self.storage.get_hp_dict(n) for n in trial_id_str]
-
-        for contents in results:
-            row = []
-            row.append(str(contents["trial_id"]))
-            for param in contents["parameters"]:
-                row.append(param["value"])
-            row.append(contents["result"])
-            data.append(row)
+                # write header
+                header = ["trial_id"]
+                for param in example["parameters"]:
+                    header.append(param["parameter_name"])
+                header.append("objective")
+                writer.writerow(header)
 
-        with InterProcessLock(self.lock_file["result_txt"]):
-            with open(self.fp, "a") as f:
-                writer = csv.writer(f, lineterminator="\n")
-                writer.writerows(data)
+                # write result data
+                for contents in itertools.chain([example], records):
+                    row = [self._get_zero_padding_trial_id(contents["trial_id"])]
+                    for param in contents["parameters"]:
+                        row.append(param["value"])
+                    row.append(contents["result"])
+                    writer.writerow(row)
@@ -1,6 +1,7 @@
 from argparse import ArgumentParser
 from pathlib import Path
 
+import numpy as np
 from omegaconf.dictconfig import DictConfig
 
 from aiaccel.config import load_config
@@ -24,7 +25,9 @@ class Plotter:
 
     def __init__(self, config: DictConfig):
         self.workspace = Workspace(config.generic.workspace)
-        self.storage = Storage(self.workspace.storage_file_path)
+        self.storage = Storage(
+            self.workspace.storage_file_path, backend=config.generic.storage_backend, read_only=True
+        )
         self.goals = [item.value for item in config.optimize.goal]
         self.cplt = EasyVisualizer()
 
@@ -49,22 +52,20 @@ class Plotter:
             print("Invalid data")
             return
 
+        # The results of pruned trials do not update the best values.
+        trajectories = self.storage.result.get_best_trajectory(self.goals)
+
         plot_data = []
         captions = []
-        for objective_id, (goal_, objectives_) in enumerate(zip(self.goals, objectives)):
-            current_best = float("inf") if goal_ == "minimize" else float("-inf")
-            comparator = min if goal_ == "minimize" else max
-            best_trajectory = []
-            update_id = 0
-            for trial_id, objective in enumerate(objectives_):
-                if comparator(current_best, objective) == objective:
-                    current_best = objective
-                    update_id = trial_id
-                best_trajectory.append(current_best)
+        for objective_id, objectives_ in enumerate(objectives):
+            trajectory = trajectories[:, objective_id]
+            # The last trial that reached the final best value.
+            updates = np.flatnonzero(np.array(objectives_, dtype=float) == trajectory)
+            update_id = int(updates[-1]) if len(updates) > 0 else 0
             plot_data.append(objectives_)
-            plot_data.append(best_trajectory)
+            plot_data.append(trajectory.tolist())
             captions.append(f"objective[{objective_id}]")
-            captions.append(f"best value[{objective_id}] (final={best_trajectory[-1]}@trial_id={update_id})")
+            captions.append(f"best value[{objective_id}] (final={trajectory[-1]}@trial_id={update_id})")
 
         self.cplt.caption(captions)
         self.cplt.line_plot(plot_data)
@@ -19,21 +19,22 @@ def write_results_to_database(
     start_time: str | None = None,
     end_time: str | None = None,
 ) -> None:
-    storage = Storage(storage_file_path)
-
     if objective is None:
         raise Exception("Could not get objective")
-    storage.result.set_any_trial_objective(trial_id, objective)
-    if returncode is not None:
-        storage.returncode.set_any_trial_returncode(trial_id, returncode)
-    if start_time is not None:
-        storage.timestamp.set_any_trial_start_time(trial_id, start_time)
-    if end_time is not None:
-        storage.timestamp.set_any_trial_end_time(trial_id, end_time)
+
+    storage = Storage(storage_file_path)
+    try:
+        storage.set_any_trial_result(trial_id, objective, returncode, start_time, end_time)
+    finally:
+        storage.close()
 
 
 def main() -> None:
-    """Writes the result of a trial to a file."""
+    """Writes the result of a trial to a file.
+
+    Local jobs write their results in the manager process. This command is
+    for job scripts running elsewhere (ABCI) and other external scripts.
+    """
 
     parser = ArgumentParser()
     parser.add_argument("--storage_file_path", type=str, required=True)
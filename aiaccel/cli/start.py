@@ -87,7 +87,7 @@ def main() -> None:  # pragma: no cover
     optimizer = create_optimizer(config.optimize.search_algorithm)(config)
     manager = create_manager(config.resource.type.value)(config, optimizer)
     tensorboard = TensorBoard(config)
-    storage = Storage(workspace.storage_file_path)
+    storage = Storage(workspace.storage_file_path, backend=config.generic.storage_backend)
 
     time_s = time.time()
     loop_start_time = datetime.now()
@@ -96,6 +96,7 @@ def main() -> None:  # pragma: no cover
     buff = Buffer(["num_finished", "available_pool_size"])
     buff.d["num_finished"].set_max_len(2)
     buff.d["available_pool_size"].set_max_len(2)
+    next_report_time = time_s
 
     manager.pre_process()
 
@@ -108,7 +109,9 @@ def main() -> None:  # pragma: no cover
                 break
             if not manager.is_error_free():
                 break
-            if int((time.time() - time_s)) % 10 == 0:
+            # Report once every 10 seconds.
+            if time.time() >= next_report_time:
+                next_report_time = time.time() + 10
                 returncodes = storage.returncode.get_all_trial_returncode()
                 if any(item != 0 for item in returncodes):
                     logger.error("Some trials are failed.")
@@ -140,7 +143,8 @@ def main() -> None:  # pragma: no cover
                 if buff.d["available_pool_size"].Len == 1 or buff.d["available_pool_size"].has_difference():
                     manager.logger.info(f"pool_size: {available_pool_size}")
 
-            time.sleep(config.generic.sleep_time)
+            # Sleeps until a job or a trial needs to be processed.
+            manager.wait_for_events(timeout=max(0.0, next_report_time - time.time()))
 
         except Exception as e:
             logger.exception("Unexpected error occurred.")
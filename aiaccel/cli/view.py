@@ -24,7 +24,9 @@ class Viewer:
 
     def __init__(self, config: DictConfig) -> None:
         self.workspace = Workspace(config.generic.workspace)
-        self.storage = Storage(self.workspace.storage_file_path)
+        self.storage = Storage(
+            self.workspace.storage_file_path, backend=config.generic.storage_backend, read_only=True
+        )
 
     def view(self) -> None:
         """Print database information
@@ -35,14 +37,13 @@ class Viewer:
         symbols = ["─", "╰", "╭", "╮", "╯", "│"]
         infos = []
         len_margin = 2
-        trial_ids = self.storage.trial.get_all_trial_id()
-
-        for trial_id in trial_ids:
-            start_time = self.storage.timestamp.get_any_trial_start_time(trial_id)
-            end_time = self.storage.timestamp.get_any_trial_end_time(trial_id)
-            status = self.storage.trial.get_any_trial_state(trial_id)
-            job = self.storage.jobstate.get_any_trial_jobstate(trial_id)
-            result = self.storage.result.get_any_trial_objective(trial_id)
+        for record in self.storage.get_trials():
+            trial_id = record["trial_id"]
+            start_time = record["start_time"]
+            end_time = record["end_time"]
+            status = record["state"]
+            job = record["jobstate"]
+            result = record["result"]
 
             error_file = self.workspace.get_error_output_file(trial_id)
             error = ""
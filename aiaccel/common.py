@@ -35,6 +35,7 @@ resource_type_local = "local"
 resource_type_abci = "abci"
 resource_type_mpi = "mpi"
 resource_type_python_local = "python_local"
+resource_type_async_local = "async_local"
 
 search_algorithm_budget_specified_grid = "aiaccel.optimizer.BudgetSpecifiedGridOptimizer"
 search_algorithm_grid = "aiaccel.optimizer.GridOptimizer"
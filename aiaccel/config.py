@@ -16,6 +16,7 @@ class ResourceType(Enum):
     abci: str = "abci"
     local: str = "local"
     python_local: str = "python_local"
+    async_local: str = "async_local"
     mpi: str = "mpi"
 
     @classmethod
@@ -46,17 +47,30 @@ class GenericConfig:
     job_command: str
     python_file: str
     function: str
+    batch_function: bool
+    batch_size: int
     batch_job_timeout: int
     sleep_time: Union[float, int]
     enabled_variable_name_argumentation: bool
     logging_level: str
     is_ignore_warning: bool
+    enabled_sqlite_wal_mode: bool
+    sqlite_busy_timeout: Union[float, int]
+    checkpoint_interval: int
+    checkpoint_serializer: str
+    storage_backend: str
+    storage_flush_interval: Optional[float]
+    warm_workers: bool
+    evaluation_cache: Optional[str]
+    objective_version: str
 
 
 @dataclass
 class ResourceConifig:
     type: ResourceType  # noqa: A003
     num_workers: int
+    cores_per_trial: Optional[int]
+    memory_per_trial: Optional[float]
     mpi_npernode: Optional[int]
     mpi_enviroment: Optional[str]
     mpi_bat_rt_type: Optional[str]
@@ -79,6 +93,9 @@ class AbciConifig:
     job_script_preamble_path: Optional[str]
     job_execution_options: Optional[str]
     runner_search_pattern: Optional[str]
+    array_job: bool
+    array_job_size: int
+    qstat_interval: Union[float, int]
 
 
 @dataclass
@@ -97,6 +114,18 @@ class ParameterConfig:
     num_numeric_choices: Optional[int]
 
 
+@dataclass
+class PrunerConfig:
+    type: Optional[str]  # noqa: A003
+    percentile: Union[float, int]
+    n_startup_trials: int
+    n_warmup_steps: int
+    min_resource: int
+    max_resource: Optional[int]
+    reduction_factor: int
+    check_interval: Union[float, int]
+
+
 @dataclass
 class OptimizeConifig:
     search_algorithm: str
@@ -107,6 +136,7 @@ class OptimizeConifig:
     grid_accept_small_trial_number: bool
     grid_sampling_method: str
     parameters: List[ParameterConfig]
+    pruner: PrunerConfig
 
 
 @dataclass
@@ -1,7 +1,9 @@
 from aiaccel.manager.abci_manager import AbciManager
 from aiaccel.manager.abstract_manager import AbstractManager
+from aiaccel.manager.async_local_manager import AsyncLocalManager
 from aiaccel.manager.create import create_manager
-from aiaccel.manager.job import AbciModel, AbstractModel, CustomMachine, Job, LocalModel
+from aiaccel.manager.event_loop import EventLoop, TimerHandle
+from aiaccel.manager.job import AbciModel, AbstractModel, CustomMachine, Job, JobState, LocalModel
 from aiaccel.manager.local_manager import LocalManager
 from aiaccel.manager.pylocal_manager import PylocalManager
 
@@ -10,10 +12,14 @@ __all__ = [
     "AbciManager",
     "AbstractModel",
     "AbstractManager",
+    "AsyncLocalManager",
     "CustomMachine",
+    "EventLoop",
     "Job",
+    "JobState",
     "LocalModel",
     "LocalManager",
     "PylocalManager",
+    "TimerHandle",
     "create_manager",
 ]
@@ -2,36 +2,190 @@ from __future__ import annotations
 
 import re
 import subprocess
+from typing import Any
 
-from aiaccel.abci import parse_qstat
+from omegaconf.dictconfig import DictConfig
+
+from aiaccel.abci import QstatPoller, create_qdel_command, create_qsub_command, parse_task_ids
 from aiaccel.manager.abstract_manager import AbstractManager
 from aiaccel.manager.job.model.abci_model import AbciModel
+from aiaccel.optimizer.abstract_optimizer import AbstractOptimizer
+from aiaccel.util import OutputHandler
 
 
 class AbciManager(AbstractManager):
-    """A manager class running on ABCI environment."""
+    """A manager class running on ABCI environment.
+
+    If ABCI.array_job is enabled, the jobs started in a main loop are
+    submitted in array jobs of up to ABCI.array_job_size tasks, so one qsub
+    covers many trials.
+
+    The jobs are read from 'qstat' at most once per ABCI.qstat_interval
+    seconds.
+
+    Attributes:
+        qstat (QstatPoller): Runs 'qstat' and keeps the jobs.
+        trials_to_submit (list[int]): Trial ids of the started jobs that have
+            not been submitted in an array job yet.
+        array_jobs (dict[str, list[int]]): The trial ids of the tasks of the
+            submitted array jobs, by job name.
+        trials_to_delete (list[int]): Trial ids of the stopped jobs that have
+            not been deleted with 'qdel' yet.
+    """
+
+    def __init__(self, config: DictConfig, optimizer: AbstractOptimizer) -> None:
+        super().__init__(config, optimizer)
+        if self.config.ABCI.array_job and self.config.ABCI.array_job_size < 1:
+            raise ValueError(f"array_job_size must be positive: {self.config.ABCI.array_job_size}")
+        self.qstat = QstatPoller(self.config.ABCI.qstat_interval)
+        self.trials_to_submit: list[int] = []
+        self.array_jobs: dict[str, list[int]] = {}
+        self.trials_to_delete: list[int] = []
+
+    def inner_loop_main_process(self) -> bool:
+        """A main loop process. This process is repeated every main loop.
+
+        The jobs started in this main loop are submitted in array jobs if
+        ABCI.array_job is enabled, and the jobs stopped in it, such as pruned
+        jobs, are deleted.
 
-    def get_stats(self) -> None:
-        """Get a current status and update.
+        Returns:
+            bool: The process succeeds or not. The main loop exits if failed.
+        """
+        result = super().inner_loop_main_process()
+        self.submit_array_jobs()
+        self.delete_jobs()
+        return result
 
-        Args:
+    def submit_array_jobs(self) -> None:
+        """Submits the started jobs in array jobs.
+
+        Returns:
             None
+        """
+        array_job_size = self.config.ABCI.array_job_size
+        while len(self.trials_to_submit) > 0:
+            trial_ids = self.trials_to_submit[:array_job_size]
+            del self.trials_to_submit[:array_job_size]
+            self.submit_array_job(trial_ids)
+
+    def submit_array_job(self, trial_ids: list[int]) -> None:
+        """Submits one array job whose task i runs the (i - 1)-th trial.
+
+        Args:
+            trial_ids (list[int]): Trial IDs. Their batch files have been
+                created.
 
         Returns:
             None
         """
-        commands = "qstat -xml"
-        p = subprocess.Popen(commands, stdout=subprocess.PIPE, shell=True)
-        stdout_data, _ = p.communicate()
-        stats = stdout_data.decode("utf-8")
+        runner_file_path = self.workspace.get_array_job_file(trial_ids[0])
+        self.job_model.create_array_job_file(
+            runner_file_path=runner_file_path,
+            manifest_file_path=self.workspace.get_array_job_manifest_file(trial_ids[0]),
+            trial_runner_file_paths=[self.workspace.get_runner_file(trial_id) for trial_id in trial_ids],
+            job_script_preamble=self.job_script_preamble,
+            dict_lock=self.workspace.lock,
+        )
+        self.array_jobs[runner_file_path.name] = trial_ids
+
+        runner_command = create_qsub_command(self.config, runner_file_path, num_tasks=len(trial_ids))
+        self.logger.info(f'runner command: {" ".join(runner_command)}, trials: {trial_ids}')
+        proc = subprocess.Popen(runner_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        OutputHandler(proc).start()
+
+    def delete_jobs(self) -> None:
+        """Deletes the stopped jobs with 'qdel'.
+
+        The task of an array job is deleted alone. 'qstat' runs again if a
+        job is not in the jobs of its last run, such as a job submitted
+        since then.
 
-        if len(stats) < 1:
+        Returns:
+            None
+        """
+        if len(self.trials_to_delete) == 0:
             return
+        trial_ids, self.trials_to_delete = self.trials_to_delete, []
+        stats = {trial_id: self.find_job_stat(trial_id) for trial_id in trial_ids}
+        if any(stat is None for stat in stats.values()):
+            self.get_stats(force=True)
+            stats = {trial_id: self.find_job_stat(trial_id) for trial_id in trial_ids}
+
+        for trial_id, stat in stats.items():
+            if stat is None:
+                self.logger.warning(f"The job of trial {trial_id} is not in the queue.")
+                continue
+            task_id = stat["ja-task-ID"] if "trial_id" in stat else None
+            command = create_qdel_command(stat["job-ID"], task_id)
+            self.logger.info(f'delete command: {" ".join(command)}, trial: {trial_id}')
+            proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if proc.returncode != 0:
+                self.logger.warning(f"Could not delete the job of trial {trial_id}: {proc.stderr.decode().strip()}")
+
+    def find_job_stat(self, trial_id: int) -> dict[str, Any] | None:
+        """Get the status of the job of a trial from the last 'qstat'.
 
-        self.stats = parse_qstat(stats)
+        Args:
+            trial_id (int): Trial ID.
 
+        Returns:
+            dict[str, Any] | None: The status of the job, or of the task of
+            an array job. None if it is not in the queue.
+        """
+        name = self.workspace.get_runner_file(trial_id).name
         for stat in self.stats:
+            if stat.get("trial_id", None) == trial_id or ("trial_id" not in stat and stat["name"] == name):
+                return stat
+        return None
+
+    def get_stats(self, force: bool = False) -> None:
+        """Get a current status and update.
+
+        `stats` is updated only when 'qstat' has run, and the jobs whose
+        states have changed since the previous run are logged. The tasks of
+        the array jobs are listed one by one, with the key "trial_id".
+
+        Args:
+            force (bool, optional): Runs 'qstat' regardless of
+                ABCI.qstat_interval. Defaults to False.
+
+        Returns:
+            None
+        """
+        diff = self.qstat.poll(force=force)
+        if diff is None:
+            return
+
+        self.stats = []
+        for stat in self.qstat.jobs.values():
+            self.stats.extend(self.expand_array_job_stat(stat))
+
+        for stat in diff.added + diff.changed:
             self.logger.info(f'stat job-ID: {stat["job-ID"]}, ' f'name: {stat["name"]}, ' f'state: {stat["state"]}')
+        for stat in diff.removed:
+            self.logger.info(f'stat job-ID: {stat["job-ID"]}, name: {stat["name"]}, left the queue')
+
+    def expand_array_job_stat(self, stat: dict[str, Any]) -> list[dict[str, Any]]:
+        """Get the status of each task of an array job submitted by this
+        manager.
+
+        Args:
+            stat (dict[str, Any]): A job parsed from 'qstat'.
+
+        Returns:
+            list[dict[str, Any]]: One status per task, with its task id and
+            its trial id. `[stat]` if it is not an array job of this manager.
+        """
+        trial_ids = self.array_jobs.get(stat["name"])
+        task_ids = parse_task_ids(stat["ja-task-ID"])
+        if trial_ids is None or len(task_ids) == 0:
+            return [stat]
+        return [
+            {**stat, "ja-task-ID": task_id, "trial_id": trial_ids[task_id - 1]}
+            for task_id in task_ids
+            if 1 <= task_id <= len(trial_ids)
+        ]
 
     def parse_trial_id(self, command: str) -> str | None:
         """Parse a command string and extract an unique name.
@@ -62,3 +216,11 @@ class AbciManager(AbstractManager):
             AbciModel: Model object.
         """
         return AbciModel()
+
+    def __getstate__(self) -> dict[str, Any]:
+        obj = super().__getstate__()
+        del obj["qstat"]
+        del obj["trials_to_submit"]
+        del obj["array_jobs"]
+        del obj["trials_to_delete"]
+        return obj
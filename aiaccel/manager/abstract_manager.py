@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import time
 from typing import Any
 
 from omegaconf.dictconfig import DictConfig
 
+from aiaccel.manager.event_loop import EventLoop, TimerHandle
 from aiaccel.manager.job.job import Job
 from aiaccel.manager.job.model.local_model import LocalModel
 from aiaccel.module import AbstractModule
 from aiaccel.optimizer.abstract_optimizer import AbstractOptimizer
-from aiaccel.util import Buffer, create_yaml
+from aiaccel.pruner import AbstractPruner, create_pruner
+from aiaccel.util import Buffer, ProcessRegistry, create_job_script_preamble, create_yaml
 
 
 class AbstractManager(AbstractModule):
@@ -23,13 +26,41 @@ class AbstractManager(AbstractModule):
         num_workers (int): The number of workers.
         trial_number (int): The maximum number of trials.
         stats (list[Any]): A list of statistics.
-        jobs (list[Any]): A list of jobs.
-        job_status (dict[Any, Any]): A dictionary of job status.
+        process_registry (ProcessRegistry): The processes spawned for the
+            running trials.
+        jobs (dict[int, Job]): The running jobs by trial id.
         start_trial_id (int): The start trial id.
         buff (Buffer): A buffer object.
         job_completed_count (int): The number of completed jobs.
+        events (EventLoop): Wakes up the main loop when a job or a trial
+            needs to be processed.
+        jobs_to_step (set[int]): Trial ids of the jobs to process in the next
+            main loop.
+        timeout_timers (dict[int, TimerHandle]): The timers of the job
+            timeouts by trial id.
+        job_model (Any): The model of the state machine shared by the jobs.
+        job_script_preamble (str): The job script preamble of the jobs.
+        trials_to_cache (set[int]): Trial ids of the finished trials to add to
+            the evaluation cache.
+        pruner (AbstractPruner | None): Stops unpromising trials if
+            optimize.pruner.type is set.
+        pruning_timers (dict[int, TimerHandle]): The timers of the next
+            pruning checks by trial id.
+        failed (bool): Whether a job has failed or timed out.
     """
 
+    # Whether the jobs have to be polled every sleep_time seconds. Managers
+    # whose jobs report their progress to `events` (for example, when the
+    # job process exits) set False, and the main loop then processes only
+    # the jobs that have events.
+    polls_jobs = True
+    # Whether the manager can stop running trials for optimize.pruner.
+    supports_pruning = True
+    # Whether the manager runs the trials as processes on this machine and
+    # supports resource.cores_per_trial, resource.memory_per_trial and
+    # generic.warm_workers.
+    supports_local_resources = False
+
     def __init__(self, config: DictConfig, optimizer: AbstractOptimizer) -> None:
         super().__init__(config, "manager")
         self.set_logger(
@@ -42,13 +73,45 @@ class AbstractManager(AbstractModule):
         self.num_workers = self.config.resource.num_workers
         self.trial_number = self.config.optimize.trial_number
         self.stats: list[Any] = []
-        self.jobs: list[Any] = []
-        self.job_status: dict[Any, Any] = {}
+        self.process_registry = ProcessRegistry()
+        self.jobs: dict[int, Job] = {}
         self.start_trial_id = self.config.resume if self.config.resume is not None else 0
         self.buff = Buffer([trial_id for trial_id in range(self.start_trial_id, self.trial_number)])
         for trial_id in range(self.start_trial_id, self.trial_number):
             self.buff.d[trial_id].set_max_len(2)
         self.job_completed_count = 0
+        self.failed = False
+        self.events = EventLoop()
+        self.jobs_to_step: set[int] = set()
+        self.timeout_timers: dict[int, TimerHandle] = {}
+        self.trials_to_cache: set[int] = set()
+        if not self.supports_local_resources:
+            local_options = {
+                "resource.cores_per_trial": self.config.resource.cores_per_trial is not None,
+                "resource.memory_per_trial": self.config.resource.memory_per_trial is not None,
+                "generic.warm_workers": bool(self.config.generic.warm_workers),
+            }
+            for name, is_set in local_options.items():
+                if is_set:
+                    raise ValueError(f"{type(self).__name__} does not support {name}.")
+        self.pruner: AbstractPruner | None = None
+        self.pruning_timers: dict[int, TimerHandle] = {}
+        if self.config.optimize.pruner.type is not None:
+            if not self.supports_pruning:
+                raise ValueError(f"{type(self).__name__} does not support pruning.")
+            if len(self.goals) != 1:
+                raise ValueError("Pruning supports a single objective only.")
+            self.pruner = create_pruner(self.config.optimize.pruner.type)(self.config)
+        # The models are stateless, so all jobs share one model.
+        self.job_model = self.create_model()
+        self.job_script_preamble = create_job_script_preamble(
+            self.config.ABCI.job_script_preamble, self.config.ABCI.job_script_preamble_path
+        )
+        # All trial state changes are made in the manager process, so the
+        # main loop reads trial states from memory instead of polling SQLite.
+        self.unsubscribe_trial_state = self.storage.trial.enable_state_index().subscribe(
+            self.on_trial_state_changed
+        )
 
     def start_job(self, trial_id: int) -> Job | None:
         """Start a new job.
@@ -60,17 +123,49 @@ class AbstractManager(AbstractModule):
             Job | None: A reference for created job. It returns None if
             specified hyper parameter file already exists.
         """
-        trial_ids = [job.trial_id for job in self.jobs]
-        if trial_id not in trial_ids:
-            job = Job(self.config, self, self.create_model(), trial_id)
-            self.jobs.append(job)
+        if trial_id not in self.jobs:
+            job = Job(self.config, self, self.job_model, trial_id)
+            self.jobs[trial_id] = job
             self.logger.debug(f"Submit a job: {str(trial_id)}")
             job.main()
+            # Job.is_timeout() holds strictly after batch_job_timeout seconds.
+            self.timeout_timers[trial_id] = self.events.call_later(
+                self.config.generic.batch_job_timeout + 0.01, trial_id
+            )
             return job
         else:
             self.logger.error(f"Specified trial {trial_id} is already running ")
             return None
 
+    def schedule_pruning_check(self, trial_id: int) -> None:
+        """Steps a running job after optimize.pruner.check_interval seconds,
+        unless a check is already scheduled.
+
+        Args:
+            trial_id (int): The trial id of the job.
+
+        Returns:
+            None
+        """
+        timer = self.pruning_timers.get(trial_id)
+        if timer is None or timer.deadline <= time.monotonic():
+            self.pruning_timers[trial_id] = self.events.call_later(
+                self.config.optimize.pruner.check_interval, trial_id
+            )
+
+    def cancel_pruning_check(self, trial_id: int) -> None:
+        """Cancels the scheduled pruning check of a job.
+
+        Args:
+            trial_id (int): The trial id of the job.
+
+        Returns:
+            None
+        """
+        timer = self.pruning_timers.pop(trial_id, None)
+        if timer is not None:
+            timer.cancel()
+
     def get_available_pool_size(self, num_ready: int, num_running: int, num_finished: int) -> int:
         """Get the number of available pool size.
 
@@ -101,6 +196,7 @@ class AbstractManager(AbstractModule):
         Returns:
             None
         """
+        self.write_evaluation_cache()
         available_pool_size = self.get_available_pool_size(num_ready, num_running, num_finished)
         if available_pool_size == 0:
             return
@@ -109,20 +205,89 @@ class AbstractManager(AbstractModule):
         if sum_status >= self.trial_number or self.optimizer.is_all_parameters_generated():
             return
 
-        if not self.all_parameters_processed(num_ready, num_running) and not self.all_parameters_registered(
+        if self.all_parameters_processed(num_ready, num_running) or self.all_parameters_registered(
             num_ready, num_running, num_finished
         ):
-            for _ in range(available_pool_size):
-                self.optimizer.run_optimizer()
-                if self.optimizer.is_all_parameters_generated():
-                    self.logger.info("All parameters are generated.")
-                    if self.optimizer.trial_id.integer < self.trial_number:
-                        self.logger.info("But the number of generated parameters is less than the number of trials.")
-                        self.logger.info(
-                            f"So, the number of trials is updated. new trial number: {self.optimizer.trial_id.integer}"
-                        )
-                        self.update_trial_number(self.optimizer.trial_id.integer)
-                    break
+            return
+
+        # Each trial is registered in its own unit of work, so the storage is
+        # not locked while the optimizer generates the next parameters.
+        for _ in range(available_pool_size):
+            self.optimizer.run_optimizer()
+            if self.optimizer.is_all_parameters_generated():
+                self.logger.info("All parameters are generated.")
+                if self.optimizer.trial_id.integer < self.trial_number:
+                    self.logger.info("But the number of generated parameters is less than the number of trials.")
+                    self.logger.info(
+                        f"So, the number of trials is updated. new trial number: {self.optimizer.trial_id.integer}"
+                    )
+                    self.update_trial_number(self.optimizer.trial_id.integer)
+                break
+        # The new trials are looked up in the evaluation cache together, and
+        # those found there are finished before the ready trials are started.
+        self.optimizer.look_up_evaluation_cache()
+
+    def on_trial_state_changed(self, trial_id: int, old_state: str | None, new_state: str | None) -> None:
+        """Called when a change of a trial state is committed.
+
+        Args:
+            trial_id (int): The trial id.
+            old_state (str | None): The previous state. None for a new trial.
+            new_state (str | None): The new state. None for a deleted trial.
+
+        Returns:
+            None
+        """
+        self.logger.debug(f"trial {trial_id}: {old_state} -> {new_state}")
+        if new_state == "finished" and self.optimizer.evaluation_cache is not None:
+            self.trials_to_cache.add(trial_id)
+        self.events.notify(trial_id)
+
+    def write_evaluation_cache(self) -> None:
+        """Adds the results of the finished trials to the evaluation cache.
+
+        Only the trials that have succeeded are added; failed and pruned
+        trials are not. The results are added in one transaction.
+
+        Returns:
+            None
+        """
+        cache = self.optimizer.evaluation_cache
+        if cache is None or len(self.trials_to_cache) == 0:
+            return
+        trial_ids, self.trials_to_cache = self.trials_to_cache, set()
+        jobstates = self.storage.jobstate.get_trials_jobstate(list(trial_ids))
+        results: list[tuple[list[dict[str, Any]], list[Any]]] = []
+        for trial_id in sorted(trial_ids):
+            if jobstates.get(trial_id) in ("failure", "timeout", "pruned"):
+                continue
+            if self.storage.returncode.get_any_trial_returncode(trial_id) not in (None, 0):
+                continue
+            objective = self.storage.result.get_any_trial_objective(trial_id)
+            params = self.storage.hp.get_any_trial_params(trial_id)
+            if objective is None or params is None:
+                continue
+            results.append(([{"parameter_name": p.param_name, "value": p.param_value} for p in params], objective))
+        cache.set_many(results)
+
+    def wait_for_events(self, timeout: float | None = None) -> None:
+        """Waits until a job or a trial needs to be processed.
+
+        Returns at once if something has happened since the previous main
+        loop. If the manager polls its jobs, it waits at most sleep_time
+        seconds.
+
+        Args:
+            timeout (float | None, optional): The maximum seconds to wait.
+                Defaults to None.
+
+        Returns:
+            None
+        """
+        if self.polls_jobs:
+            sleep_time = self.config.generic.sleep_time
+            timeout = sleep_time if timeout is None else min(timeout, sleep_time)
+        self.jobs_to_step.update(self.events.wait(timeout))
 
     def pre_process(self) -> None:
         """Pre-procedure before executing processes.
@@ -143,6 +308,13 @@ class AbstractManager(AbstractModule):
             None
         """
         self.optimizer.finalize_operation()
+        self.unsubscribe_trial_state()
+        # The trials that finished in the last main loop.
+        self.write_evaluation_cache()
+        if self.optimizer.evaluation_cache is not None:
+            self.optimizer.evaluation_cache.close()
+        # An in-memory storage is written to the file for reading and resuming.
+        self.storage.flush()
         self.logger.info("finished.")
 
     def inner_loop_main_process(self) -> bool:
@@ -162,26 +334,43 @@ class AbstractManager(AbstractModule):
         readies = self.storage.trial.get_ready()
         # find a new hp
         for ready in readies:
-            if ready not in [job.trial_id for job in self.jobs]:
+            if ready not in self.jobs:
+                # Not in a unit of work, because starting the job submits it.
                 self.start_job(ready)
                 self.serialize(ready)
 
-        for job in self.jobs:
-            job.main()
-            state_name = job.get_state_name()
-            if state_name in {"success", "failure", "timeout"}:
-                self.job_completed_count += 1
-                self.jobs.remove(job)
-                if state_name == "success":
-                    continue
-                else:
-                    self.logger.error(f"Job: {job.trial_id} is {state_name}.")
-                    return False
-            # Only log if the state has changed.
-            if job.trial_id in self.buff.d.keys():
-                self.buff.d[job.trial_id].Add(state_name)
-                if self.buff.d[job.trial_id].has_difference():
-                    self.logger.info(f"name: {job.trial_id}, state: {state_name}")
+        if self.polls_jobs:
+            jobs = list(self.jobs.values())
+        else:
+            jobs = [self.jobs[trial_id] for trial_id in self.jobs_to_step if trial_id in self.jobs]
+        self.jobs_to_step.clear()
+
+        # The writes of the jobs processed here, such as the results of jobs
+        # that finished close together, are committed at once.
+        with self.storage.transaction():
+            for job in jobs:
+                job.main()
+                state_name = job.get_state_name()
+                if state_name in {"success", "failure", "timeout", "pruned"}:
+                    self.job_completed_count += 1
+                    del self.jobs[job.trial_id]
+                    timer = self.timeout_timers.pop(job.trial_id, None)
+                    if timer is not None:
+                        timer.cancel()
+                    self.cancel_pruning_check(job.trial_id)
+                    # The next main loop dispatches a new job without waiting.
+                    self.events.notify()
+                    if state_name in {"success", "pruned"}:
+                        continue
+                    else:
+                        self.logger.error(f"Job: {job.trial_id} is {state_name}.")
+                        self.failed = True
+                        return False
+                # Only log if the state has changed.
+                if job.trial_id in self.buff.d.keys():
+                    self.buff.d[job.trial_id].Add(state_name)
+                    if self.buff.d[job.trial_id].has_difference():
+                        self.logger.info(f"name: {job.trial_id}, state: {state_name}")
 
         if self.trial_number == self.job_completed_count:
             self.logger.info("All jobs are completed.")
@@ -213,12 +402,9 @@ class AbstractManager(AbstractModule):
         Returns:
             bool: True if all trials are error free.
         """
-        jobstates = self.storage.jobstate.get_all_trial_jobstate()
-        for trial_id in self.job_status.keys():
-            for jobstate in jobstates:
-                if jobstate["trial_id"] == trial_id and "failure" in jobstate["jobstate"].lower():
-                    self.logger.info(f"Job: {trial_id} is Failed.")
-                    return False
+        # Set when a job ends, so the storage is not read every main loop.
+        if self.failed:
+            return False
         return self.optimizer.is_error_free()
 
     def create_model(self) -> Any:
@@ -298,13 +484,10 @@ class AbstractManager(AbstractModule):
             None
         """
 
-        best_trial_ids, _ = self.storage.get_best_trial(self.goals)
-        if best_trial_ids is None:
+        hp_results = self.storage.get_best_trial_dict(self.goals)
+        if hp_results is None:
             self.logger.error(f"Failed to output {self.workspace.best_result_file}.")
             return
-        hp_results = []
-        for best_trial_id in best_trial_ids:
-            hp_results.append(self.storage.get_hp_dict(best_trial_id))
         create_yaml(self.workspace.best_result_file, hp_results, self.workspace.lock)
         finished = self.storage.get_num_finished()
         if self.config.optimize.trial_number >= finished:
@@ -314,5 +497,14 @@ class AbstractManager(AbstractModule):
     def __getstate__(self) -> dict[str, Any]:
         obj = super().__getstate__()
         del obj["jobs"]
+        del obj["process_registry"]
+        del obj["job_model"]
         del obj["optimizer"]
+        del obj["unsubscribe_trial_state"]
+        del obj["events"]
+        del obj["timeout_timers"]
+        del obj["trials_to_cache"]
+        del obj["pruner"]
+        del obj["pruning_timers"]
+        del obj["failed"]
         return obj
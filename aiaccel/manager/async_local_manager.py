@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+from asyncio.subprocess import PIPE
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+from omegaconf.dictconfig import DictConfig
+
+from aiaccel.common import datetime_format
+from aiaccel.manager.abstract_manager import AbstractManager
+from aiaccel.manager.job.model.local_model import LocalModel, parse_objectives
+from aiaccel.optimizer.abstract_optimizer import AbstractOptimizer
+from aiaccel.util.output_multiplexer import DEFAULT_TAIL_LINES
+
+
+class AsyncLocalManager(AbstractManager):
+    """A manager class running job_command trials on a local computer with
+    asyncio.
+
+    Each trial is a coroutine that starts the job command with
+    asyncio.create_subprocess_exec() and awaits its completion, with
+    batch_job_timeout enforced by asyncio.wait_for(). The completed trials
+    are queued to one storage writer task, which commits the trials that
+    completed close together at once. The event loop runs while the main
+    loop waits for events, so no thread is used per trial.
+
+    Attributes:
+        loop (asyncio.AbstractEventLoop): The event loop running the trials.
+        tasks (dict[int, asyncio.Task]): The running trials by trial id.
+        failed (bool): Whether a trial has failed, has timed out or has no
+            objective, or the results could not be written.
+    """
+
+    polls_jobs = False
+    supports_pruning = False
+
+    def __init__(self, config: DictConfig, optimizer: AbstractOptimizer) -> None:
+        super().__init__(config, optimizer)
+        self.command_builder = LocalModel()
+        self.tasks: dict[int, asyncio.Task[None]] = {}
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._setup())
+
+    async def _setup(self) -> None:
+        # Queues and events are created in the loop that uses them.
+        self.results: asyncio.Queue[tuple[int, int | None, list[str], str]] = asyncio.Queue()
+        self.results_written = asyncio.Event()
+        self.writer = asyncio.ensure_future(self._write_results())
+
+    def inner_loop_main_process(self) -> bool:
+        """A main loop process. This process is repeated every main loop.
+
+        Returns:
+            bool: The process succeeds or not. The main loop exits if failed.
+        """
+        if self.failed:
+            return False
+
+        num_ready, num_running, num_finished = self.storage.get_num_running_ready_finished()
+        self.search_hyperparameters(num_ready, num_running, num_finished)
+        if num_finished >= self.trial_number:
+            return False
+
+        trial_ids = [trial_id for trial_id in self.storage.trial.get_ready() if trial_id not in self.tasks]
+        if len(trial_ids) > 0:
+            start_time = datetime.now().strftime(datetime_format)
+            with self.storage.transaction():
+                for trial_id in trial_ids:
+                    self.storage.trial.set_any_trial_state(trial_id=trial_id, state="running")
+                    self.storage.timestamp.set_any_trial_start_time(trial_id=trial_id, start_time=start_time)
+                    self.serialize(trial_id)
+            for trial_id in trial_ids:
+                self.tasks[trial_id] = self.loop.create_task(self._run_trial(trial_id))
+                self.logger.debug(f"Submit a job: {trial_id}")
+        return True
+
+    def wait_for_events(self, timeout: float | None = None) -> None:
+        """Runs the trials until results are written or the timeout expires.
+
+        Args:
+            timeout (float | None, optional): The maximum seconds to wait.
+                Defaults to None.
+
+        Returns:
+            None
+        """
+        self.loop.run_until_complete(self._wait_for_results(timeout))
+
+    async def _wait_for_results(self, timeout: float | None) -> None:
+        try:
+            await asyncio.wait_for(self.results_written.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.results_written.clear()
+
+    async def _run_trial(self, trial_id: int) -> None:
+        content = self.storage.get_hp_dict(trial_id)
+        error_output_file = self.workspace.get_error_output_file(trial_id)
+        command = self.command_builder.create_runner_command(
+            self.config.generic.job_command,
+            content,
+            trial_id,
+            str(self.config.config_path),
+            str(error_output_file),
+            self.config.generic.enabled_variable_name_argumentation,
+        )
+        self.logger.info(f'runner command: {" ".join(command)}')
+
+        with open(error_output_file, "ab") as stderr:
+            proc = await asyncio.create_subprocess_exec(*command, stdout=PIPE, stderr=stderr)
+        stdouts: deque[str] = deque(maxlen=DEFAULT_TAIL_LINES)
+
+        async def communicate() -> int:
+            assert proc.stdout is not None
+            async for line in proc.stdout:
+                stdouts.append(line.decode(errors="replace").strip())
+            return await proc.wait()
+
+        state = "finished"
+        returncode: int | None = None
+        try:
+            returncode = await asyncio.wait_for(communicate(), self.config.generic.batch_job_timeout)
+        except asyncio.TimeoutError:
+            state = "timeout"
+        finally:
+            # Also reached when the trial is cancelled by post_process().
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        self.results.put_nowait((trial_id, returncode, list(stdouts), state))
+
+    async def _write_results(self) -> None:
+        while True:
+            results = [await self.results.get()]
+            while not self.results.empty():
+                results.append(self.results.get_nowait())
+            end_time = datetime.now().strftime(datetime_format)
+            try:
+                with self.storage.transaction():
+                    for trial_id, returncode, stdouts, state in results:
+                        self._write_result(trial_id, returncode, stdouts, state, end_time)
+            except Exception as e:
+                # The writer keeps running, so the main loop is woken up and
+                # exits instead of waiting for results forever.
+                self.logger.error(f"Could not write the results of trials {[result[0] for result in results]}: {e}")
+                self.failed = True
+            self.results_written.set()
+
+    def _write_result(
+        self, trial_id: int, returncode: int | None, stdouts: list[str], state: str, end_time: str
+    ) -> None:
+        self.tasks.pop(trial_id, None)
+        self.job_completed_count += 1
+        if state == "finished":
+            try:
+                objectives = parse_objectives(stdouts, self.goals, self.logger)
+            except Exception as e:
+                # The trial is finished without a result, so it is not left
+                # running in the storage.
+                self.logger.error(f"Job: {trial_id} is failure. {e}")
+                self.storage.timestamp.set_any_trial_end_time(trial_id=trial_id, end_time=end_time)
+                self.storage.jobstate.set_any_trial_jobstate(trial_id=trial_id, state="failure")
+                self.failed = True
+            else:
+                self.storage.set_any_trial_result(trial_id, objectives, returncode=returncode, end_time=end_time)
+                self.storage.jobstate.set_any_trial_jobstate(
+                    trial_id=trial_id, state="success" if returncode == 0 else "failure"
+                )
+                if returncode != 0:
+                    self.logger.error(f"Job: {trial_id} is failure. returncode: {returncode}")
+                    self.failed = True
+        else:
+            self.logger.error(f"Job: {trial_id} is {state}.")
+            self.storage.timestamp.set_any_trial_end_time(trial_id=trial_id, end_time=end_time)
+            self.failed = True
+        self.storage.trial.set_any_trial_state(trial_id=trial_id, state=state)
+        self.logger.info(f"name: {trial_id}, state: {state}")
+
+    def post_process(self) -> None:
+        """Stops the running trials and the event loop.
+
+        Returns:
+            None
+        """
+        self.loop.run_until_complete(self._stop())
+        self.loop.close()
+        super().post_process()
+
+    async def _stop(self) -> None:
+        tasks = [*self.tasks.values(), self.writer]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def create_model(self) -> None:
+        """Creates model object of state machine.
+
+        Returns:
+            None: Because it does not use the state transition model.
+        """
+        return None
+
+    def __getstate__(self) -> dict[str, Any]:
+        obj = super().__getstate__()
+        del obj["command_builder"]
+        del obj["tasks"]
+        del obj["loop"]
+        del obj["results"]
+        del obj["results_written"]
+        del obj["writer"]
+        return obj
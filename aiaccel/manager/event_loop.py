@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import selectors
+import threading
+import time
+import weakref
+from typing import Any, Hashable
+
+
+class TimerHandle:
+    """A deadline registered with EventLoop.call_at().
+
+    Args:
+        deadline (float): The time.monotonic() value at which the key is
+            reported.
+        key (Hashable): The key reported by EventLoop.wait().
+    """
+
+    def __init__(self, deadline: float, key: Hashable) -> None:
+        self.deadline = deadline
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancels the timer.
+
+        Returns:
+            None
+        """
+        self.cancelled = True
+
+
+def _close(selector: selectors.BaseSelector, fds: tuple[int, int]) -> None:
+    selector.close()
+    for fd in fds:
+        os.close(fd)
+
+
+class EventLoop:
+    """Lets the manager loop sleep until something happens.
+
+    Other threads report events with notify(), for example when a job
+    process has exited, and deadlines such as job timeouts are kept in a
+    heap. wait() blocks in a selector on a self-pipe until an event arrives
+    or the next deadline is reached, so an idle manager does not use CPU.
+
+    Events and deadlines carry a key, typically a trial id, and wait()
+    returns the keys that occurred since the previous call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._keys: set[Hashable] = set()
+        self._woken = False
+        self._timers: list[tuple[float, int, TimerHandle]] = []
+        self._counter = itertools.count()
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._read_fd, selectors.EVENT_READ)
+        self._finalizer = weakref.finalize(self, _close, self._selector, (self._read_fd, self._write_fd))
+
+    def notify(self, key: Hashable = None) -> None:
+        """Reports an event and wakes up wait(). Safe to call from any thread.
+
+        Args:
+            key (Hashable, optional): The key of the event. None only wakes
+                up wait(). Defaults to None.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if key is not None:
+                self._keys.add(key)
+            if self._woken:
+                return
+            self._woken = True
+        try:
+            os.write(self._write_fd, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def call_at(self, deadline: float, key: Hashable) -> TimerHandle:
+        """Reports a key when time.monotonic() reaches a deadline.
+
+        Args:
+            deadline (float): The deadline in time.monotonic() seconds.
+            key (Hashable): The key to report.
+
+        Returns:
+            TimerHandle: A handle to cancel the timer.
+        """
+        handle = TimerHandle(deadline, key)
+        with self._lock:
+            heapq.heappush(self._timers, (deadline, next(self._counter), handle))
+        return handle
+
+    def call_later(self, delay: float, key: Hashable) -> TimerHandle:
+        """Reports a key after a delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            key (Hashable): The key to report.
+
+        Returns:
+            TimerHandle: A handle to cancel the timer.
+        """
+        return self.call_at(time.monotonic() + delay, key)
+
+    def _pop_due_timers(self, now: float) -> float | None:
+        # Moves the keys of due timers to the reported keys and returns the
+        # next deadline. Called with the lock held.
+        while self._timers:
+            deadline, _, handle = self._timers[0]
+            if handle.cancelled:
+                heapq.heappop(self._timers)
+            elif deadline <= now:
+                heapq.heappop(self._timers)
+                self._keys.add(handle.key)
+            else:
+                return deadline
+        return None
+
+    def wait(self, timeout: float | None = None) -> set[Any]:
+        """Waits for events or deadlines.
+
+        Returns at once if an event has been reported since the previous
+        call.
+
+        Args:
+            timeout (float | None, optional): The maximum seconds to wait.
+                Defaults to None (until an event or a deadline).
+
+        Returns:
+            set[Any]: The keys of the events and deadlines that occurred.
+        """
+        with self._lock:
+            now = time.monotonic()
+            next_deadline = self._pop_due_timers(now)
+            if self._keys or self._woken:
+                timeout = 0.0
+            elif next_deadline is not None:
+                timeout = next_deadline - now if timeout is None else min(timeout, next_deadline - now)
+
+        if timeout is None or timeout > 0:
+            self._selector.select(timeout)
+
+        with self._lock:
+            try:
+                while os.read(self._read_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+            self._woken = False
+            self._pop_due_timers(time.monotonic())
+            keys, self._keys = self._keys, set()
+        return keys
+
+    def close(self) -> None:
+        """Releases the pipe and the selector.
+
+        Returns:
+            None
+        """
+        self._finalizer()
@@ -1,4 +1,4 @@
-from aiaccel.manager.job.job import CustomMachine, Job
+from aiaccel.manager.job.job import CustomMachine, Job, JobState
 from aiaccel.manager.job.model import AbciModel, AbstractModel, LocalModel, MpiModel
 
 __all__ = [
@@ -8,4 +8,5 @@ __all__ = [
     "LocalModel",
     "MpiModel",
     "Job",
+    "JobState",
 ]
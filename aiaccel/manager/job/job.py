@@ -2,32 +2,19 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from enum import Enum
-from typing import TYPE_CHECKING, Any
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from omegaconf.dictconfig import DictConfig
 from transitions import Machine
 from transitions.extensions.states import Tags, add_state_features
 
 from aiaccel.common import datetime_format
-from aiaccel.storage import Storage
-from aiaccel.util import Buffer, create_job_script_preamble
-from aiaccel.workspace import Workspace
 
 if TYPE_CHECKING:  # pragma: no cover
     from aiaccel.manager import AbstractManager, AbstractModel
 
 
-JOB_STATES = [
-    {"name": "ready"},
-    {"name": "running"},
-    {"name": "finished"},
-    {"name": "success"},
-    {"name": "failure"},
-    {"name": "timeout"},
-]
-
-
 JOB_TRANSITIONS: list[dict[str, str | list[str]]] = [
     {
         "trigger": "next_state",
@@ -44,6 +31,14 @@ JOB_TRANSITIONS: list[dict[str, str | list[str]]] = [
         "before": "before_finished",
         "after": "after_finished",
     },
+    {
+        "trigger": "next_state",
+        "source": "running",
+        "dest": "pruned",
+        "conditions": "conditions_job_pruned",
+        "before": "before_pruned",
+        "after": "after_pruned",
+    },
     {
         "trigger": "next_state",
         "source": "finished",
@@ -64,62 +59,155 @@ JOB_TRANSITIONS: list[dict[str, str | list[str]]] = [
 ]
 
 
+class JobState(IntEnum):
+    ready = 0
+    running = 1
+    finished = 2
+    success = 3
+    failure = 4
+    timeout = 5
+    pruned = 6
+
+
+FINAL_JOB_STATES = frozenset({JobState.success, JobState.failure, JobState.timeout, JobState.pruned})
+
+
+class Transition(NamedTuple):
+    """A transition of the job state machine.
+
+    The callbacks are the names of the methods of the model. They are called
+    with the job.
+    """
+
+    dest: JobState
+    conditions: str | None
+    before: str | None
+    after: str | None
+
+
+def build_transition_table(
+    transitions: list[dict[str, str | list[str]]]
+) -> dict[str, dict[JobState, tuple[Transition, ...]]]:
+    """Build a lookup table of transitions by trigger and source state.
+
+    Args:
+        transitions (list[dict[str, str | list[str]]]): Transitions in the
+            format of JOB_TRANSITIONS.
+
+    Returns:
+        dict[str, dict[JobState, tuple[Transition, ...]]]: The transitions
+        by trigger and source state, in the order they are declared.
+    """
+    table: dict[str, dict[JobState, tuple[Transition, ...]]] = {}
+    for t in transitions:
+        sources = t["source"] if isinstance(t["source"], list) else [t["source"]]
+        transition = Transition(
+            JobState[str(t["dest"])],
+            t.get("conditions"),  # type: ignore[arg-type]
+            t.get("before"),  # type: ignore[arg-type]
+            t.get("after"),  # type: ignore[arg-type]
+        )
+        for source in sources:
+            by_source = table.setdefault(str(t["trigger"]), {})
+            by_source[JobState[source]] = by_source.get(JobState[source], ()) + (transition,)
+    return table
+
+
+JOB_TRANSITION_TABLE = build_transition_table(JOB_TRANSITIONS)
+
+_logger = logging.getLogger("root.manager.job")
+
+
 @add_state_features(Tags)
 class CustomMachine(Machine):
-    pass
+    """Deprecated. Job uses JobState and JOB_TRANSITION_TABLE instead of a
+    state machine of the transitions package. This class is kept for
+    compatibility and will be removed together with the transitions
+    dependency.
+    """
 
 
 class Job:
-    """A job thread to manage running jobs on local computer or ABCI."""
+    """A job to manage a trial running on local computer or ABCI.
+
+    The state of the job is advanced by JOB_TRANSITION_TABLE, and the
+    callbacks of the transitions are the methods of the model. The model, the
+    storage, the workspace and the job script preamble are shared by all
+    jobs of the manager.
+
+    Args:
+        config (DictConfig): A configuration object.
+        manager (AbstractManager): The manager running the job.
+        model (AbstractModel): The model of the state machine.
+        trial_id (int): Trial ID.
+
+    Attributes:
+        state (JobState): The current state.
+    """
+
+    __slots__ = (
+        "config",
+        "count_retry",
+        "logger",
+        "workspace",
+        "storage",
+        "trial_id",
+        "manager",
+        "goals",
+        "model",
+        "state",
+        "start_time",
+        "end_time",
+        "proc",
+        "th_oh",
+        "_content",
+    )
 
     def __init__(self, config: DictConfig, manager: AbstractManager, model: AbstractModel, trial_id: int) -> None:
-        super(Job, self).__init__()
-        # === Load config file===
-        self.config = config
-        # === Get config parameter values ===
-        self.count_retry = 0
-        self.logger = logging.getLogger("root.manager.job")
-        self.workspace = Workspace(self.config.generic.workspace)
-        self.storage = Storage(self.workspace.storage_file_path)
-        self.trial_id = trial_id
-        self.content = self.storage.get_hp_dict(self.trial_id)
-        self.manager = manager
-        self.goals: list[str] = self.config.optimize.goal
-        self.model = model
-        if self.model is None:
+        if model is None:
             raise ValueError(
                 "model is None. "
                 "Be sure to specify the model to use in the Job class. "
                 "For example, PylocalManager doesn't use model. "
                 "Therefore, Job class cannot be used."
             )
-        self.machine = CustomMachine(
-            model=self.model,
-            states=JOB_STATES,
-            transitions=JOB_TRANSITIONS,
-            initial=JOB_STATES[0]["name"],
-            auto_transitions=False,
-            ordered_transitions=False,
-        )
-        self.job_script_preamble = create_job_script_preamble(
-            self.config.ABCI.job_script_preamble, self.config.ABCI.job_script_preamble_path
-        )
+        self.config = config
+        self.count_retry = 0
+        self.logger = _logger
+        self.workspace = manager.workspace
+        self.storage = manager.storage
+        self.trial_id = trial_id
+        self.manager = manager
+        self.goals: list[str] = manager.goals
+        self.model = model
+        self.state = JobState.ready
         self.start_time: datetime | None = None
         self.end_time: datetime | None = None
-        self.trial_id = trial_id
         self.proc: Any = None
         self.th_oh: Any = None
-        self.buff = Buffer(["state.name"])
-        self.buff.d["state.name"].set_max_len(2)
+        self._content: dict[str, Any] | None = None
+
+    @property
+    def content(self) -> dict[str, Any]:
+        """The parameters of the trial, read from the storage when the job is
+        submitted.
+        """
+        if self._content is None:
+            self._content = self.storage.get_hp_dict(self.trial_id)
+        return self._content
 
-    def get_state_name(self) -> str | Enum:
+    @property
+    def job_script_preamble(self) -> str:
+        """The job script preamble of the manager."""
+        return self.manager.job_script_preamble
+
+    def get_state_name(self) -> str:
         """Get a current state name.
 
         Returns:
-            str | Enum: A current state name.
+            str: A current state name.
         """
-        state = self.machine.get_state(self.model.state)
-        return state.name
+        return self.state.name
 
     def set_state(self, state: str) -> None:
         """Set a current state.
@@ -127,7 +215,36 @@ class Job:
         Args:
             state (str): A current state.
         """
-        self.machine.set_state(state)
+        self.state = JobState[state]
+
+    def trigger(self, name: str) -> bool:
+        """Run a transition of the current state.
+
+        Args:
+            name (str): The trigger of the transition.
+
+        Returns:
+            bool: False if the conditions of no transition are met.
+
+        Raises:
+            ValueError: Causes when the trigger is not valid in the current
+                state.
+        """
+        transitions = JOB_TRANSITION_TABLE[name].get(self.state)
+        if transitions is None:
+            raise ValueError(f"Can't trigger event {name} from state {self.state.name}.")
+        model = self.model
+        # The first transition whose conditions are met is run.
+        for transition in transitions:
+            if transition.conditions is not None and not getattr(model, transition.conditions)(self):
+                continue
+            if transition.before is not None:
+                getattr(model, transition.before)(self)
+            self.state = transition.dest
+            if transition.after is not None:
+                getattr(model, transition.after)(self)
+            return True
+        return False
 
     def write_start_time_to_storage(self) -> None:
         """Set a start time."""
@@ -145,6 +262,20 @@ class Job:
         """Write a current state to the database."""
         self.storage.trial.set_any_trial_state(trial_id=self.trial_id, state=state)
 
+    def write_pruned_result_to_storage(self) -> None:
+        """Write the last intermediate value as the result of a pruned job.
+
+        The optimizers see this value as the objective of the trial, but it is
+        stored as a pruned result, so it does not update the best value or
+        the best trial.
+        """
+        intermediates = self.storage.intermediate.get_any_trial_intermediates(trial_id=self.trial_id)
+        if len(intermediates) > 0:
+            self.storage.result.set_any_trial_objective(
+                self.trial_id, [intermediates[max(intermediates.keys())]], pruned=True
+            )
+        self.storage.jobstate.set_any_trial_jobstate(trial_id=self.trial_id, state="pruned")
+
     def write_job_success_or_failed_to_storage(self) -> None:
         """Write a job success or failed to the database."""
         returncode = self.storage.returncode.get_any_trial_returncode(trial_id=self.trial_id)
@@ -183,18 +314,17 @@ class Job:
             None
         """
 
-        state = self.machine.get_state(self.model.state)
-        if state.name.lower() in ["failure", "success", "timeout"]:
+        if self.state in FINAL_JOB_STATES:
             return
-        if self.is_timeout():
-            self.model.timeout(self)
+        if self.state == JobState.ready:
+            # Submitting the job starts a process, so the storage is not
+            # locked meanwhile. before_running() commits its own writes.
+            self.trigger("next_state")
             return
-        if state.name.lower() == "ready":
-            self.model.next_state(self)
-        elif state.name.lower() == "running":
-            self.model.next_state(self)
-        elif state.name.lower() == "finished":
-            self.model.next_state(self)
-        else:
-            ...
+        # The writes of a state transition are committed at once.
+        with self.storage.transaction():
+            if self.is_timeout():
+                self.trigger("timeout")
+                return
+            self.trigger("next_state")
         return
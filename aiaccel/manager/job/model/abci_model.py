@@ -26,6 +26,9 @@ class AbciModel(AbstractModel):
             None
         """
         runner_file_path = obj.workspace.get_runner_file(obj.trial_id)
+        # The script of an array job has the preamble, and runs the scripts
+        # of its trials in the same shell.
+        job_script_preamble = "" if obj.config.ABCI.array_job else obj.job_script_preamble
         self.create_abci_batch_file(
             trial_id=obj.trial_id,
             param_content=obj.content,
@@ -33,7 +36,7 @@ class AbciModel(AbstractModel):
             error_file_path=obj.workspace.get_error_output_file(obj.trial_id),
             config_file_path=obj.config.config_path,
             runner_file_path=runner_file_path,
-            job_script_preamble=obj.job_script_preamble,
+            job_script_preamble=job_script_preamble,
             command=obj.config.generic.job_command,
             enabled_variable_name_argumentation=obj.config.generic.enabled_variable_name_argumentation,
             dict_lock=obj.workspace.lock,
@@ -42,12 +45,19 @@ class AbciModel(AbstractModel):
     def job_submitted(self, obj: Job) -> None:
         """Submit a job.
 
+        If ABCI.array_job is enabled, the job is submitted by the manager in
+        an array job with the other jobs started in the same main loop.
+
         Args:
             obj (Job): A job object.
 
         Returns:
             None
         """
+        if obj.config.ABCI.array_job:
+            obj.manager.trials_to_submit.append(obj.trial_id)
+            return
+
         runner_file_path = obj.workspace.get_runner_file(obj.trial_id)
         runner_command = create_qsub_command(obj.config, runner_file_path)
 
@@ -57,6 +67,20 @@ class AbciModel(AbstractModel):
         obj.th_oh = OutputHandler(obj.proc)
         obj.th_oh.start()
 
+    def stop_job(self, obj: Job) -> None:
+        """Stop a job.
+
+        The job is deleted by the manager with 'qdel' at the end of the main
+        loop, so the storage is not locked while 'qdel' runs.
+
+        Args:
+            obj (Job): A job object.
+
+        Returns:
+            None
+        """
+        obj.manager.trials_to_delete.append(obj.trial_id)
+
     def generate_command_line(self, command: str, args: list[str]) -> str:
         """Generate a command line.
 
@@ -173,6 +197,43 @@ class AbciModel(AbstractModel):
             script += s + "\n"
         self.file_create(runner_file_path, script, dict_lock)
 
+    def create_array_job_file(
+        self,
+        runner_file_path: Path,
+        manifest_file_path: Path,
+        trial_runner_file_paths: list[Path],
+        job_script_preamble: str,
+        dict_lock: Path,
+    ) -> None:
+        """Create the batch file of an array job.
+
+        The manifest lists the batch files of the trials, one per line, and
+        the task with the task id i runs the batch file on the i-th line.
+
+        Args:
+            runner_file_path (Path): The path of the batch file of the array
+                job.
+            manifest_file_path (Path): The path of the manifest.
+            trial_runner_file_paths (list[Path]): The batch files of the
+                trials created by create_abci_batch_file(), in the order of
+                the task ids.
+            job_script_preamble (str): The preamble of the batch file.
+            dict_lock (Path): The path to store lock files.
+
+        Returns:
+            None
+        """
+        manifest = "".join(f"{path}\n" for path in trial_runner_file_paths)
+        self.file_create(manifest_file_path, manifest, dict_lock)
+
+        script = ""
+        if job_script_preamble is not None and job_script_preamble != "":
+            script += job_script_preamble + "\n"
+        script += "\n"
+        script += f'trial_runner_file_path=`sed -n "${{SGE_TASK_ID}}p" {manifest_file_path}`\n'
+        script += "source $trial_runner_file_path\n"
+        self.file_create(runner_file_path, script, dict_lock)
+
     def file_create(self, path: Path, content: str, dict_lock: Path | None = None) -> None:
         """Create a text file.
 
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from aiaccel.manager import Job
 
 
 class AbstractModel(object):
-    state: str
-    expire: Any
-    next_state: Any
-    timeout: Any
+    """The callbacks of the job state machine.
+
+    A model has no state of its own, so one model is shared by all jobs of a
+    manager. The state is held by the job.
+    """
+
+    def next_state(self, obj: Job) -> bool:
+        return obj.trigger("next_state")
+
+    def expire(self, obj: Job) -> bool:
+        return obj.trigger("expire")
+
+    def timeout(self, obj: Job) -> bool:
+        return obj.trigger("timeout")
 
     def runner_create(self, obj: Job) -> None:  # noqa: U100
         ...
@@ -22,8 +32,9 @@ class AbstractModel(object):
     def before_running(self, obj: Job) -> None:
         self.runner_create(obj)
         self.job_submitted(obj)
-        obj.write_start_time_to_storage()
-        obj.write_state_to_storage("running")
+        with obj.storage.transaction():
+            obj.write_start_time_to_storage()
+            obj.write_state_to_storage("running")
 
     def after_running(self, obj: Job) -> None:  # noqa: U100
         ...
@@ -40,6 +51,39 @@ class AbstractModel(object):
     def after_finished(self, obj: Job) -> None:
         obj.write_job_success_or_failed_to_storage()
 
+    # pruned
+    def conditions_job_pruned(self, obj: Job) -> bool:
+        """Check if a running job should be stopped by the pruner.
+
+        The job is checked again after optimize.pruner.check_interval
+        seconds.
+
+        Args:
+            obj (Job): A job object.
+
+        Returns:
+            bool: True if the job should be stopped.
+        """
+        if obj.manager.pruner is None:
+            return False
+        obj.manager.schedule_pruning_check(obj.trial_id)
+        if obj.manager.pruner.prune(obj.storage, obj.trial_id):
+            obj.logger.info(f"Job: {obj.trial_id} is pruned.")
+            return True
+        return False
+
+    def before_pruned(self, obj: Job) -> None:
+        obj.write_state_to_storage("finished")
+        obj.write_end_time_to_storage()
+
+    def after_pruned(self, obj: Job) -> None:
+        try:
+            self.stop_job(obj)
+        except RuntimeError:
+            # The output handlers raise after killing the process.
+            pass
+        obj.write_pruned_result_to_storage()
+
     # timeout  # TODO: implement timeout
     def before_timeout(self, obj: Job) -> None:
         obj.write_state_to_storage("timeout")
@@ -1,15 +1,63 @@
 from __future__ import annotations
 
+import logging
+import os
 import re
+from functools import partial
 from subprocess import PIPE, Popen
 from typing import TYPE_CHECKING, Any
 
 from aiaccel.manager.job.model.abstract_model import AbstractModel
-from aiaccel.util import OutputHandler
+from aiaccel.util import OutputReader, get_thread_environment, pin_process
+from aiaccel.util.data_type import str_or_float_or_int
 
 if TYPE_CHECKING:
     from aiaccel.manager import Job
 
+# Seconds to wait for the output reader to finish after the job process has
+# exited. It only has to read the output left in the pipes.
+_OUTPUT_READER_JOIN_TIMEOUT = 0.1
+
+
+def parse_objectives(stdouts: list[str], goals: list[str], logger: logging.Logger) -> list[str | float | int]:
+    """Get the objectives of a job from its standard output.
+
+    The objectives are the last lines of the standard output.
+
+    Args:
+        stdouts (list[str]): The lines of the standard output.
+        goals (list[str]): The goals of the optimization.
+        logger (logging.Logger): A logger for warnings.
+
+    Returns:
+        list[str | float | int]: The objectives.
+
+    Raises:
+        Exception: Causes when the standard output is empty.
+    """
+    objectives: list[str] = []
+    if len(stdouts) > 0:
+        if len(stdouts) >= len(goals):
+            objectives = stdouts[-len(goals) :]
+        elif len(stdouts) == 1:
+            objectives.append(stdouts[0])
+        elif len(stdouts) > 1:
+            for i in range(len(goals)):
+                o_index = len(stdouts) - len(goals) + i
+                objectives.append(stdouts[o_index])
+        else:
+            raise NotImplementedError("Not Readched")
+        if len(stdouts) < len(goals):
+            logger.warning(
+                f"Number of objectives is less than the number of goals. "
+                f"Number of objectives: {len(stdouts)}, "
+                f"Number of goals: {len(goals)}"
+            )
+
+    if len(objectives) == 0:
+        raise Exception("Could not get objective")
+    return [str_or_float_or_int(objective) for objective in objectives]
+
 
 class LocalModel(AbstractModel):
     def runner_create(self, obj: Job) -> None:  # noqa: U100
@@ -24,6 +72,30 @@ class LocalModel(AbstractModel):
         Returns:
             None
         """
+        cores: list[int] | None = None
+        if obj.config.resource.cores_per_trial is not None:
+            cores = obj.manager.core_allocator.allocate(obj.trial_id)
+            if cores is None:
+                raise RuntimeError(f"No free cores for trial {obj.trial_id}.")
+            obj.logger.debug(f"trial {obj.trial_id}: cores {cores}")
+
+        if obj.config.optimize.pruner.type is not None:
+            obj.manager.schedule_pruning_check(obj.trial_id)
+
+        if obj.config.generic.warm_workers:
+            # The trial runs in a worker that has already imported the user
+            # program, so no process is started here.
+            xs = {param["parameter_name"]: param["value"] for param in obj.content["parameters"]}
+            obj.th_oh = obj.manager.warm_workers.submit(
+                obj.trial_id,
+                xs,
+                on_exit=partial(obj.manager.events.notify, obj.trial_id),
+                stderr_file=obj.workspace.get_error_output_file(obj.trial_id),
+                cores=cores,
+            )
+            obj.logger.info(f"warm worker trial: {obj.trial_id}, parameters: {xs}")
+            return
+
         runner_command = self.create_runner_command(
             obj.config.generic.job_command,
             obj.content,
@@ -33,11 +105,25 @@ class LocalModel(AbstractModel):
             obj.config.generic.enabled_variable_name_argumentation,
         )
         obj.logger.info(f'runner command: {" ".join(runner_command)}')
-        obj.proc = Popen(runner_command, stdout=PIPE, stderr=PIPE, bufsize=0)
+        env = None
+        preexec_fn = None
+        if cores is not None:
+            env = {**os.environ, **get_thread_environment(cores)}
+            # The child is pinned before it runs the command, so every thread
+            # of the trial inherits the affinity.
+            preexec_fn = partial(pin_process, 0, cores)
+        obj.proc = Popen(runner_command, stdout=PIPE, stderr=PIPE, bufsize=0, env=env, preexec_fn=preexec_fn)
+        obj.manager.process_registry.register(obj.trial_id, obj.proc.pid)
 
-        obj.th_oh = OutputHandler(obj.proc)
+        # The output of all jobs is read by one thread. The stderr goes to the
+        # error output file, and the manager steps the job as soon as the
+        # process has exited.
+        obj.th_oh = OutputReader(
+            obj.proc,
+            on_exit=partial(obj.manager.events.notify, obj.trial_id),
+            stderr_file=obj.workspace.get_error_output_file(obj.trial_id),
+        )
         obj.th_oh.start()
-        self.is_firsttime_called = False
 
     def conditions_job_finished(self, obj: "Job") -> bool:
         """Check if a job is finished.
@@ -50,14 +136,16 @@ class LocalModel(AbstractModel):
         """
         if super().conditions_job_finished(obj):
             return True
-        if obj.th_oh.get_returncode() is None or self.is_firsttime_called:
+        if obj.th_oh.get_returncode() is None:
             return False
-        elif obj.th_oh.is_alive():
-            return False
-        else:
-            self.write_results_to_database(obj)
-            self.is_firsttime_called = True
+        self.release_resources(obj)
+        obj.th_oh.join(_OUTPUT_READER_JOIN_TIMEOUT)
+        if obj.th_oh.is_alive():
             return False
+        # The result is written in this process, so the job finishes in the
+        # same step.
+        self.write_results_to_database(obj)
+        return True
 
     def stop_job(self, obj: Job) -> None:
         """Stop a job.
@@ -68,8 +156,43 @@ class LocalModel(AbstractModel):
         Returns:
             None
         """
+        self.release_resources(obj)
         obj.th_oh.enforce_kill()
 
+    def conditions_job_pruned(self, obj: Job) -> bool:
+        """Check if a running job should be stopped by the pruner.
+
+        A job that has exited is not pruned, because its result is being
+        read.
+
+        Args:
+            obj (Job): A job object.
+
+        Returns:
+            bool: True if the job should be stopped.
+        """
+        if obj.config.optimize.pruner.type is None:
+            return False
+        if obj.th_oh.get_returncode() is not None:
+            # The job has exited and its result is being read.
+            return False
+        return super().conditions_job_pruned(obj)
+
+    def release_resources(self, obj: Job) -> None:
+        """Release the process, the cores and the pruning checks of a job.
+
+        Args:
+            obj (Job): A job object.
+
+        Returns:
+            None
+        """
+        obj.manager.process_registry.unregister(obj.trial_id)
+        if obj.config.resource.cores_per_trial is not None:
+            obj.manager.core_allocator.release(obj.trial_id)
+        if obj.config.optimize.pruner.type is not None:
+            obj.manager.cancel_pruning_check(obj.trial_id)
+
     def create_runner_command(
         self,
         command: str,
@@ -117,7 +240,11 @@ class LocalModel(AbstractModel):
         return commands
 
     def write_results_to_database(self, obj: "Job") -> None:
-        """Create result file.
+        """Write the result of a job to the database.
+
+        The objectives are the last lines of the standard output of the job.
+        The write joins the unit of work of the caller, so the results of
+        jobs processed in the same main loop are committed together.
 
         Args:
             obj (Job): Job object.
@@ -125,56 +252,18 @@ class LocalModel(AbstractModel):
         Returns:
             None
         """
-        trial_id: str = str(obj.trial_id)
         stdouts: list[str] = obj.th_oh.get_stdouts()
         stderrs: list[str] = obj.th_oh.get_stderrs()
         returncode: int = obj.th_oh.get_returncode()
-        params: list[dict[str, Any]] = obj.content["parameters"]
-        objective: str = "nan"
-        objectives: list[str] = []
 
         error = "\n".join(stderrs)
         obj.logger.info(f"error: {error}")
 
-        if len(stdouts) > 0:
-            if len(stdouts) >= len(obj.goals):
-                objectives = stdouts[-len(obj.goals) :]
-            elif len(stdouts) == 1:
-                objectives.append(stdouts[0])
-            elif len(stdouts) > 1:
-                for i in range(len(obj.goals)):
-                    o_index = len(stdouts) - len(obj.goals) + i
-                    objectives.append(stdouts[o_index])
-            else:
-                raise NotImplementedError("Not Readched")
-            if len(stdouts) < len(obj.goals):
-                obj.logger.warning(
-                    f"Number of objectives is less than the number of goals. "
-                    f"Number of objectives: {len(stdouts)}, "
-                    f"Number of goals: {len(obj.goals)}"
-                )
-
-        args = {
-            "storage_file_path": str(obj.workspace.storage_file_path),
-            "trial_id": str(trial_id),
-            "returncode": returncode,
-        }
-
-        # commands = ["aiaccel-set-result"]
-        commands = ["python", "-m", "aiaccel.cli.set_result"]
-        for key in args.keys():
-            commands.append(f"--{key}={str(args[key])}")
-
-        commands.append("--objective")
-        if len(objectives) == 0:
-            raise Exception("Could not get objective")
-        for objective in objectives:
-            commands.append(str(objective))
-
-        for param in params:
-            if "name" in param.keys() and "value" in param.keys():
-                commands.append(f'--{param["name"]}={param["value"]}')
-
-        obj.logger.debug(f'{" ".join(commands)}')
-        Popen(commands)
+        objectives = parse_objectives(stdouts, obj.goals, obj.logger)
+        obj.logger.debug(f"trial {obj.trial_id}: objective {objectives}, returncode {returncode}")
+        obj.storage.set_any_trial_result(
+            trial_id=obj.trial_id,
+            objective=objectives,
+            returncode=returncode,
+        )
         return None
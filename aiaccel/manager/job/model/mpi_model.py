@@ -27,4 +27,3 @@ class MpiModel(LocalModel):
         obj.proc = None
         obj.th_oh = MpiOutputHandler(obj.manager, gpu_mode, processor, tag, "Job", obj.trial_id, storage=obj.storage)
         obj.th_oh.start()
-        self.is_firsttime_called = False
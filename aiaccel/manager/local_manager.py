@@ -1,38 +1,95 @@
 from __future__ import annotations
 
+import re
 import shlex
 from typing import Any
 
+from omegaconf.dictconfig import DictConfig
+
 from aiaccel.manager.abstract_manager import AbstractManager
 from aiaccel.manager.job.model.local_model import LocalModel
-from aiaccel.util import ps2joblist
+from aiaccel.optimizer.abstract_optimizer import AbstractOptimizer
+from aiaccel.util import CoreAllocator, WarmWorkerPool, get_thread_environment
 
 
 class LocalManager(AbstractManager):
-    """A manager class running on a local computer."""
+    """A manager class running on a local computer.
+
+    Attributes:
+        warm_workers (WarmWorkerPool | None): The workers running the trials
+            if generic.warm_workers is enabled.
+        core_allocator (CoreAllocator | None): Assigns the cores of the
+            trials if resource.cores_per_trial is set.
+    """
+
+    polls_jobs = False
+    supports_local_resources = True
+
+    def __init__(self, config: DictConfig, optimizer: AbstractOptimizer) -> None:
+        super().__init__(config, optimizer)
+        self.core_allocator: CoreAllocator | None = None
+        thread_environment: dict[str, str] | None = None
+        if self.config.resource.cores_per_trial is not None:
+            self.core_allocator = CoreAllocator(
+                self.config.resource.cores_per_trial, self.config.resource.memory_per_trial
+            )
+            if self.core_allocator.num_slots < self.num_workers:
+                self.logger.warning(
+                    f"Only {self.core_allocator.num_slots} trials can run at once "
+                    f"with cores_per_trial={self.config.resource.cores_per_trial}."
+                )
+            # Every trial has the same number of cores, so a warm worker is
+            # started with the thread environment of any of them.
+            thread_environment = get_thread_environment(list(range(self.core_allocator.cores_per_trial)))
+        self.warm_workers: WarmWorkerPool | None = None
+        if self.config.generic.warm_workers:
+            command = re.split(" +", self.config.generic.job_command)
+            command.append(f"--config={self.config.config_path}")
+            self.warm_workers = WarmWorkerPool(command, output_dir=self.workspace.log, env=thread_environment)
+
+    def get_available_pool_size(self, num_ready: int, num_running: int, num_finished: int) -> int:
+        """Get the number of available pool size.
+
+        The ready trials are counted against the free cores, since they take
+        their cores when they start.
+
+        Args:
+            num_ready (int): The number of ready jobs.
+            num_running (int): The number of running jobs.
+            num_finished (int): The number of finished jobs.
+
+        Returns:
+            int: The number of available pool size.
+        """
+        pool_size = super().get_available_pool_size(num_ready, num_running, num_finished)
+        if self.core_allocator is not None:
+            pool_size = min(pool_size, max(0, self.core_allocator.num_free_slots - num_ready))
+        return pool_size
+
+    def post_process(self) -> None:
+        """Stops the warm workers.
+
+        Returns:
+            None
+        """
+        if self.warm_workers is not None:
+            self.warm_workers.close()
+        super().post_process()
 
     def get_stats(self) -> None:
         """Get a current status and update.
 
+        Only the processes spawned for the running trials are sampled, with
+        their CPU time and peak resident set size. The trials run by warm
+        workers are not included.
+
         Args:
             None
 
         Returns:
             None
         """
-        res = ps2joblist()
-        command = self.config.generic.job_command
-        self.stats = []
-        trial_id_list = [job.trial_id for job in self.jobs]
-
-        for r in res:
-            if command in r["name"]:
-                trial_id = int(self.parse_trial_id(r["name"]))
-
-                if trial_id in trial_id_list:
-                    self.stats.append(r)
-                else:
-                    self.logger.warning(f"**** Unknown process: {r}")
+        self.stats = self.process_registry.sample()
 
     def parse_trial_id(self, command: str) -> Any:
         """Parse a command string and extract an unique name.
@@ -89,3 +146,9 @@ class LocalManager(AbstractManager):
             xs[param.param_name] = param.param_value
 
         return xs
+
+    def __getstate__(self) -> dict[str, Any]:
+        obj = super().__getstate__()
+        del obj["warm_workers"]
+        del obj["core_allocator"]
+        return obj
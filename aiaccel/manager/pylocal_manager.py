@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import queue
 from datetime import datetime
+from functools import partial
 from importlib.util import module_from_spec, spec_from_file_location
-from multiprocessing.pool import Pool, ThreadPool
+from multiprocessing.pool import AsyncResult, Pool, ThreadPool
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from omegaconf.dictconfig import DictConfig
 
-from aiaccel.cli.set_result import write_results_to_database
 from aiaccel.common import datetime_format
 from aiaccel.config import load_config
 from aiaccel.manager.abstract_manager import AbstractManager
@@ -23,11 +25,38 @@ workspace: Path
 
 
 class PylocalManager(AbstractManager):
-    """A manager class running on a local computer."""
+    """A manager class running on a local computer.
+
+    Trials are submitted to the worker pool one by one with apply_async().
+    When a trial completes, the pool notifies the main loop, which writes
+    the result, generates new parameters and submits them to the freed
+    worker at once.
+
+    If generic.batch_function is enabled, the ready trials are submitted in
+    batches of up to generic.batch_size trials, and the user function is
+    called once per batch with the parameters as column arrays. Up to
+    num_workers batches run at once.
+
+    Attributes:
+        batch_size (int): The maximum number of trials in one call of the
+            user function.
+        pending (dict[int, AsyncResult]): The submitted trials by trial id.
+        completed (queue.SimpleQueue): The results of the completed trials
+            that are not written yet.
+    """
+
+    # Trials report their completion to `events` from the pool.
+    polls_jobs = False
+    supports_pruning = False
 
     def __init__(self, config: DictConfig, optimizer: AbstractOptimizer) -> None:
         super().__init__(config, optimizer)
+        self.batch_size = self.config.generic.batch_size if self.config.generic.batch_function else 1
+        if self.batch_size < 1:
+            raise ValueError(f"batch_size must be positive: {self.batch_size}")
         self.processes: list[Any] = []
+        self.pending: dict[int, AsyncResult[Any]] = {}
+        self.completed: queue.SimpleQueue[tuple[int, dict[str, Any], list[Any], str, str, str]] = queue.SimpleQueue()
 
         Pool_ = Pool if self.num_workers > 1 else ThreadPool  # noqa: N806
         try:
@@ -38,39 +67,140 @@ class PylocalManager(AbstractManager):
     def inner_loop_main_process(self) -> bool:
         """A main loop process. This process is repeated every main loop.
 
+        Writes the results of the completed trials, then generates
+        parameters for the free workers and submits them. It does not wait
+        for trials.
+
         Returns:
             bool: The process succeeds or not. The main loop exits if failed.
         """
+        if not self.write_completed_results():
+            return False
 
         num_ready, num_running, num_finished = self.storage.get_num_running_ready_finished()
         self.search_hyperparameters(num_ready, num_running, num_finished)
         if num_finished >= self.trial_number:
             return False
-        if num_finished >= self.config.optimize.trial_number:
-            return False
-        trial_ids = self.storage.trial.get_ready()
-        if trial_ids is None or len(trial_ids) == 0:
+        trial_ids = [trial_id for trial_id in self.storage.trial.get_ready() if trial_id not in self.pending]
+        if len(trial_ids) == 0:
             return True
 
         args = []
-        for trial_id in trial_ids:
-            self.storage.trial.set_any_trial_state(trial_id=trial_id, state="running")
-            args.append([trial_id, self.get_any_trial_xs(trial_id)])
-            self.serialize(trial_id)
-        for trial_id, _, ys, err, start_time, end_time in self.pool.imap_unordered(execute, args):
-            if err != "":
-                self.logger.error(err)
-                self.write_error(trial_id, err)
-                return False
-            write_results_to_database(
-                storage_file_path=self.workspace.storage_file_path,
-                trial_id=trial_id,
-                objective=ys,
-                returncode=None,
-                start_time=start_time,
-                end_time=end_time,
+        with self.storage.transaction():
+            for trial_id in trial_ids:
+                self.storage.trial.set_any_trial_state(trial_id=trial_id, state="running")
+                args.append([trial_id, self.get_any_trial_xs(trial_id)])
+                self.serialize(trial_id)
+        if self.config.generic.batch_function:
+            for i in range(0, len(args), self.batch_size):
+                batch = args[i : i + self.batch_size]
+                trial_ids = [arg[0] for arg in batch]
+                result = self.pool.apply_async(
+                    execute_batch,
+                    (batch,),
+                    callback=self.on_batch_completed,
+                    error_callback=partial(self.on_batch_error, trial_ids),
+                )
+                for trial_id in trial_ids:
+                    self.pending[trial_id] = result
+            return True
+        for arg in args:
+            self.pending[arg[0]] = self.pool.apply_async(
+                execute, (arg,), callback=self.on_trial_completed, error_callback=partial(self.on_trial_error, arg[0])
             )
-            self.storage.trial.set_any_trial_state(trial_id=trial_id, state="finished")
+        return True
+
+    def get_available_pool_size(self, num_ready: int, num_running: int, num_finished: int) -> int:
+        """Get the number of available pool size.
+
+        With generic.batch_function, each worker takes up to batch_size
+        trials.
+
+        Args:
+            num_ready (int): The number of ready jobs.
+            num_running (int): The number of running jobs.
+            num_finished (int): The number of finished jobs.
+
+        Returns:
+            int: The number of available pool size.
+        """
+        if not self.config.generic.batch_function:
+            return super().get_available_pool_size(num_ready, num_running, num_finished)
+        num_remaining = self.trial_number - num_ready - num_running - num_finished
+        num_free = self.num_workers * self.batch_size - num_running - num_ready
+        return max(0, min(num_remaining, num_free))
+
+    def on_trial_completed(self, result: tuple[int, dict[str, Any], list[Any], str, str, str]) -> None:
+        """Called from the pool when a trial has completed.
+
+        Args:
+            result (tuple): The return value of execute().
+
+        Returns:
+            None
+        """
+        self.completed.put(result)
+        self.events.notify(result[0])
+
+    def on_trial_error(self, trial_id: int, error: BaseException) -> None:
+        """Called from the pool when a trial could not be executed.
+
+        Args:
+            trial_id (int): Trial ID.
+            error (BaseException): The exception.
+
+        Returns:
+            None
+        """
+        self.on_trial_completed((trial_id, {}, [], str(error), "", ""))
+
+    def on_batch_completed(self, results: list[tuple[int, dict[str, Any], list[Any], str, str, str]]) -> None:
+        """Called from the pool when a batch of trials has completed.
+
+        Args:
+            results (list[tuple]): The return value of execute_batch().
+
+        Returns:
+            None
+        """
+        for result in results:
+            self.completed.put(result)
+        if len(results) > 0:
+            self.events.notify(results[0][0])
+
+    def on_batch_error(self, trial_ids: list[int], error: BaseException) -> None:
+        """Called from the pool when a batch of trials could not be executed.
+
+        Args:
+            trial_ids (list[int]): Trial IDs.
+            error (BaseException): The exception.
+
+        Returns:
+            None
+        """
+        self.on_batch_completed([(trial_id, {}, [], str(error), "", "") for trial_id in trial_ids])
+
+    def write_completed_results(self) -> bool:
+        """Writes the results of the completed trials in one commit.
+
+        Returns:
+            bool: False if a trial has failed.
+        """
+        results = []
+        while not self.completed.empty():
+            results.append(self.completed.get())
+        if len(results) == 0:
+            return True
+
+        with self.storage.transaction():
+            for trial_id, _, ys, err, start_time, end_time in results:
+                self.pending.pop(trial_id, None)
+                if err != "":
+                    self.logger.error(err)
+                    self.write_error(trial_id, err)
+                    return False
+                self.storage.set_any_trial_result(trial_id, ys, start_time=start_time, end_time=end_time)
+                self.storage.trial.set_any_trial_state(trial_id=trial_id, state="finished")
         return True
 
     def post_process(self) -> None:
@@ -129,6 +259,8 @@ class PylocalManager(AbstractManager):
         obj = super().__getstate__()
         del obj["pool"]
         del obj["processes"]
+        del obj["pending"]
+        del obj["completed"]
         return obj
 
 
@@ -182,3 +314,41 @@ def execute(args: Any) -> tuple[int, dict[str, Any], list[Any], str, str, str]:
         err = ""
     end_time = datetime.now().strftime(datetime_format)
     return trial_id, xs, ys, err, start_time, end_time
+
+
+def execute_batch(args: list[Any]) -> list[tuple[int, dict[str, Any], list[Any], str, str, str]]:
+    """Executes the specified function once for a batch of trials.
+
+    The function receives a dict of numpy arrays, one per parameter, whose
+    i-th elements are the parameters of the i-th trial. It returns the
+    objectives of the trials as an array of shape (N,), or (N, number of
+    objectives).
+
+    Args:
+        args (list): Pairs of a trial ID and arguments.
+
+    Returns:
+        list[tuple]: Trial ID, arguments, objective value, error string,
+        start time, end time of each trial.
+    """
+    trial_ids = [trial_id for trial_id, _ in args]
+    xs_list = [xs for _, xs in args]
+
+    start_time = datetime.now().strftime(datetime_format)
+    # The log of a batch goes to the file of its first trial.
+    set_logging_file_for_trial_id(workspace, trial_ids[0])
+    ys_list: list[list[Any]] = [[] for _ in trial_ids]
+    try:
+        columns = {name: np.asarray([xs[name] for xs in xs_list]) for name in xs_list[0]}
+        y = np.asarray(user_func(columns))
+        if y.ndim == 0 or y.shape[0] != len(trial_ids):
+            raise ValueError(f"The batch function returned {y.shape} objectives for {len(trial_ids)} trials.")
+        ys_list = [yi if isinstance(yi, list) else [yi] for yi in y.tolist()]
+    except BaseException as e:
+        err = str(e)
+    else:
+        err = ""
+    end_time = datetime.now().strftime(datetime_format)
+    return [
+        (trial_id, xs, ys, err, start_time, end_time) for trial_id, xs, ys in zip(trial_ids, xs_list, ys_list)
+    ]
@@ -8,7 +8,8 @@ from typing import Any
 import numpy as np
 from omegaconf.dictconfig import DictConfig
 
-from aiaccel.storage import Storage
+from aiaccel.common import resource_type_python_local
+from aiaccel.storage import StateStore, Storage
 from aiaccel.util import ColoredHandler, TrialId, str_to_logging_level
 from aiaccel.workspace import Workspace
 
@@ -58,7 +59,20 @@ class AbstractModule(object):
         self.ch_formatter: Any = None
         self.loop_count = 0
         self.seed = self.config.optimize.rand_seed
-        self.storage = Storage(self.workspace.storage_file_path)
+        if (
+            self.config.generic.storage_backend != "sqlite"
+            and self.config.resource.type.value.lower() != resource_type_python_local
+        ):
+            raise ValueError(
+                f"The {self.config.generic.storage_backend} storage backend requires the python_local resource type."
+            )
+        self.storage = Storage(
+            self.workspace.storage_file_path,
+            wal_mode=self.config.generic.enabled_sqlite_wal_mode,
+            busy_timeout=self.config.generic.sqlite_busy_timeout,
+            backend=self.config.generic.storage_backend,
+            flush_interval=self.config.generic.storage_flush_interval,
+        )
         self.trial_id = TrialId(self.config)
         # TODO: Separate the generator if don't want to affect randomness each other.
         self._rng = np.random.RandomState(self.seed)
@@ -67,6 +81,13 @@ class AbstractModule(object):
         self.storage.variable.register(
             process_name=self.module_name, labels=["native_random_state", "numpy_random_state", "state"]
         )
+        self.state_store = StateStore(
+            self.storage.checkpoint,
+            process_name=self.module_name,
+            label="state",
+            interval=self.config.generic.checkpoint_interval,
+            serializer=self.config.generic.checkpoint_serializer,
+        )
 
     def set_config(self, config: DictConfig) -> None:
         self.config = config
@@ -76,6 +97,8 @@ class AbstractModule(object):
         self.storage.variable.register(
             process_name=self.module_name, labels=["native_random_state", "numpy_random_state", "state"]
         )
+        self.state_store.checkpoint = self.storage.checkpoint
+        self.state_store.reset()
 
     def set_logger(self, logger_name: str, logfile: Path, file_level: str, stream_level: str) -> None:
         """Set a default logger options.
@@ -107,21 +130,35 @@ class AbstractModule(object):
     def serialize(self, trial_id: int) -> None:
         """Serialize this module.
 
+        The attributes are stored as a full snapshot every
+        generic.checkpoint_interval trials and as a delta from the previous
+        trial otherwise.
+
         Returns:
             None
         """
-        self.storage.variable.d["state"].set(trial_id, self)
+        with self.storage.transaction():
+            self.state_store.save(trial_id, self.__getstate__())
 
-        # random state
-        self.storage.variable.d["numpy_random_state"].set(trial_id, self.get_numpy_random_state())
+            # random state
+            self.storage.variable.d["numpy_random_state"].set(trial_id, self.get_numpy_random_state())
 
     def deserialize(self, trial_id: int) -> None:
         """Deserialize this module.
 
         Returns:
             None
+
+        Raises:
+            ValueError: Causes when the state of the trial is not stored.
         """
-        __dict__ = self.storage.variable.d["state"].get(trial_id).__dict__.copy()
+        __dict__ = self.state_store.load(trial_id)
+        if __dict__ is None:
+            # A workspace written before checkpoints were introduced.
+            legacy_state = self.storage.variable.d["state"].get(trial_id)
+            if legacy_state is None:
+                raise ValueError(f"No state of the {self.module_name} is stored for trial {trial_id}.")
+            __dict__ = legacy_state.__dict__.copy()
         self.logger.debug(f"deserialize {self.__class__.__name__} module:")
         self.logger.debug(f"  {__dict__}")
         self.__dict__.update(__dict__)
@@ -191,4 +228,5 @@ class AbstractModule(object):
         obj = self.__dict__.copy()
         del obj["storage"]
         del obj["config"]
+        del obj["state_store"]
         return obj
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import copy
+from datetime import datetime
 from typing import Any
 
 from numpy import isnan
 from omegaconf.dictconfig import DictConfig
 
+from aiaccel.common import datetime_format
 from aiaccel.config import is_multi_objective
 from aiaccel.converted_parameter import ConvertedIntParameter
 from aiaccel.module import AbstractModule
 from aiaccel.parameter import HyperParameterConfiguration, IntParameter, Parameter
+from aiaccel.storage import EvaluationCache
 from aiaccel.util import TrialId
 
 
@@ -28,6 +31,11 @@ class AbstractOptimizer(AbstractModule):
             object.
         trial_id (TrialId): A TrialId object.
         all_parameters_generated (bool): True if all parameters are generated.
+        evaluation_cache (EvaluationCache | None): The results measured
+            before, if generic.evaluation_cache is set.
+        trials_to_look_up (list[tuple[int, list[dict[str, Any]]]]): Trial
+            ids and parameters of the registered trials that have not been
+            looked up in the evaluation cache yet.
     """
 
     def __init__(self, config: DictConfig) -> None:
@@ -44,6 +52,12 @@ class AbstractOptimizer(AbstractModule):
         self.params = HyperParameterConfiguration(self.config.optimize.parameters)
         self.trial_id = TrialId(self.config)
         self.all_parameters_generated = False
+        self.evaluation_cache: EvaluationCache | None = None
+        if self.config.generic.evaluation_cache is not None:
+            self.evaluation_cache = EvaluationCache(
+                self.config.generic.evaluation_cache, self.config.generic.objective_version
+            )
+        self.trials_to_look_up: list[tuple[int, list[dict[str, Any]]]] = []
 
     def get_trial_id(self) -> int:
         """Get the current trial ID.
@@ -70,6 +84,9 @@ class AbstractOptimizer(AbstractModule):
     def register_new_parameters(self, params: list[dict[str, float | int | str]], state: str = "ready") -> None:
         """Create hyper parameter files.
 
+        If the evaluation cache is set, a ready trial is looked up in it by
+        the next `look_up_evaluation_cache()`.
+
         Args:
             params (list[dict[str, float | int | str]]): A list of hyper
                 parameter dictionaries.
@@ -87,11 +104,40 @@ class AbstractOptimizer(AbstractModule):
                 }
 
         """
-        self.storage.hp.set_any_trial_params(trial_id=self.trial_id.get(), params=params)
-        self.storage.trial.set_any_trial_state(trial_id=self.trial_id.get(), state=state)
+        trial_id = self.trial_id.get()
+        with self.storage.transaction():
+            self.storage.hp.set_any_trial_params(trial_id=trial_id, params=params)
+            self.storage.trial.set_any_trial_state(trial_id=trial_id, state=state)
+        if state == "ready" and self.evaluation_cache is not None:
+            self.trials_to_look_up.append((trial_id, params))
         self.num_of_generated_parameter += 1
         self.logger.debug(f"generated parameters: {params}")
 
+    def look_up_evaluation_cache(self) -> None:
+        """Finishes the registered trials whose results are in the
+        evaluation cache.
+
+        The trials registered since the last call are looked up together
+        before the storage is locked, and the results found are written in
+        one unit of work instead of running the trials.
+
+        Returns:
+            None
+        """
+        if self.evaluation_cache is None or len(self.trials_to_look_up) == 0:
+            return
+        trials, self.trials_to_look_up = self.trials_to_look_up, []
+        objectives = self.evaluation_cache.get_many([params for _, params in trials])
+        now = datetime.now().strftime(datetime_format)
+        with self.storage.transaction():
+            for (trial_id, _), objective in zip(trials, objectives):
+                if objective is None or len(objective) != len(self.config.optimize.goal):
+                    continue
+                self.storage.set_any_trial_result(trial_id, objective, returncode=0, start_time=now, end_time=now)
+                self.storage.jobstate.set_any_trial_jobstate(trial_id=trial_id, state="success")
+                self.storage.trial.set_any_trial_state(trial_id=trial_id, state="finished")
+                self.logger.info(f"trial {trial_id}: cached result {objective}")
+
     def generate_initial_parameter(self) -> Any:
         """Generate a list of initial parameters.
 
@@ -191,9 +237,10 @@ class AbstractOptimizer(AbstractModule):
 
     def run_optimizer(self) -> None:
         if new_params := self.generate_new_parameter():
-            self.register_new_parameters(self.convert_type_by_config(new_params))
-            self.trial_id.increment()
-            self.serialize(self.trial_id.integer)
+            with self.storage.transaction():
+                self.register_new_parameters(self.convert_type_by_config(new_params))
+                self.trial_id.increment()
+                self.serialize(self.trial_id.integer)
 
     def resume(self) -> None:
         """When in resume mode, load the previous optimization data in advance.
@@ -209,6 +256,12 @@ class AbstractOptimizer(AbstractModule):
         super().deserialize(self.config.resume)
         self.trial_number = self.config.optimize.trial_number
 
+    def __getstate__(self) -> dict[str, Any]:
+        obj = super().__getstate__()
+        del obj["evaluation_cache"]
+        del obj["trials_to_look_up"]
+        return obj
+
     def get_any_trial_objective(self, trial_id: int) -> Any:
         """Get any trial result.
 
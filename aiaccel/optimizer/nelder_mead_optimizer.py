@@ -154,19 +154,20 @@ class NelderMeadOptimizer(AbstractOptimizer):
             None
         """
         if new_params := self.generate_new_parameter():
-            if self.out_of_boundary(new_params):
-                self.logger.debug(f"out of boundary: {new_params}")
-                self.register_new_parameters(self.convert_type_by_config(new_params), state="finished")
-                objective = np.inf
-                if self.goals[0] == goal_maximize:
-                    objective = -np.inf
-                self.storage.result.set_any_trial_objective(trial_id=self.trial_id.integer, objective=[objective])
+            with self.storage.transaction():
+                if self.out_of_boundary(new_params):
+                    self.logger.debug(f"out of boundary: {new_params}")
+                    self.register_new_parameters(self.convert_type_by_config(new_params), state="finished")
+                    objective = np.inf
+                    if self.goals[0] == goal_maximize:
+                        objective = -np.inf
+                    self.storage.result.set_any_trial_objective(trial_id=self.trial_id.integer, objective=[objective])
+                    self.trial_id.increment()
+                    self.serialize(self.trial_id.integer)
+                    return
+                self.register_new_parameters(self.convert_type_by_config(new_params))
                 self.trial_id.increment()
                 self.serialize(self.trial_id.integer)
-                return
-            self.register_new_parameters(self.convert_type_by_config(new_params))
-            self.trial_id.increment()
-            self.serialize(self.trial_id.integer)
 
     def out_of_boundary(self, params: list[dict[str, float | int | str]]) -> bool:
         """Check if the parameters are out of boundary.
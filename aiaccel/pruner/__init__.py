@@ -0,0 +1,13 @@
+from aiaccel.pruner.abstract_pruner import AbstractPruner
+from aiaccel.pruner.create import create_pruner
+from aiaccel.pruner.percentile_pruner import MedianPruner, PercentilePruner
+from aiaccel.pruner.successive_halving_pruner import HyperbandPruner, SuccessiveHalvingPruner
+
+__all__ = [
+    "AbstractPruner",
+    "HyperbandPruner",
+    "MedianPruner",
+    "PercentilePruner",
+    "SuccessiveHalvingPruner",
+    "create_pruner",
+]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from omegaconf.dictconfig import DictConfig
+
+from aiaccel.storage import Storage
+
+
+class AbstractPruner:
+    """An abstract class for pruners, which stop unpromising trials early
+    based on the intermediate values the trials report.
+
+    Args:
+        config (DictConfig): A DictConfig object which contains optimization
+            settings specified by the configuration file and the command line
+            options.
+
+    Attributes:
+        goal (str): The goal of the single objective, "minimize" or
+            "maximize".
+        n_startup_trials (int): Trials are not pruned until this number of
+            trials have succeeded.
+        n_warmup_steps (int): Trials are not pruned before this step.
+    """
+
+    def __init__(self, config: DictConfig) -> None:
+        self.config = config
+        goal = config.optimize.goal[0]
+        self.goal = str(getattr(goal, "value", goal)).lower()
+        self.n_startup_trials = config.optimize.pruner.n_startup_trials
+        self.n_warmup_steps = config.optimize.pruner.n_warmup_steps
+
+    def prune(self, storage: Storage, trial_id: int) -> bool:
+        """Whether a running trial should be stopped.
+
+        Args:
+            storage (Storage): The storage of the intermediate values.
+            trial_id (int): The trial id.
+
+        Returns:
+            bool: True if the trial should be stopped.
+        """
+        raise NotImplementedError
+
+    def get_succeeded_trial_ids(self, storage: Storage, trial_ids: list[int]) -> set[int]:
+        """Get the trials that have run to completion successfully.
+
+        Pruned and failed trials are excluded.
+
+        Args:
+            storage (Storage): The storage.
+            trial_ids (list[int]): The trial ids to check.
+
+        Returns:
+            set[int]: The succeeded trial ids.
+        """
+        jobstates = storage.jobstate.get_trials_jobstate(trial_ids)
+        return {trial_id for trial_id, jobstate in jobstates.items() if jobstate == "success"}
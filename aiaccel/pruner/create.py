@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Type
+
+from aiaccel.pruner.abstract_pruner import AbstractPruner
+
+PrunerType = Type[AbstractPruner]
+
+
+def create_pruner(pruner: str) -> PrunerType:
+    """Creates a pruner class.
+
+    Args:
+        pruner (str): Pruner class name, e.g. aiaccel.pruner.MedianPruner
+
+    Returns:
+        type: Subclass of aiaccel.pruner.abstract_pruner.AbstractPruner.
+    """
+    module_name, attr_name = pruner.rsplit(".", 1)
+    module = import_module(module_name)
+    return getattr(module, attr_name)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from omegaconf.dictconfig import DictConfig
+
+from aiaccel.pruner.abstract_pruner import AbstractPruner
+from aiaccel.storage import Storage
+
+
+class PercentilePruner(AbstractPruner):
+    """Stops a trial whose best intermediate value is worse than a
+    percentile of the values of the succeeded trials at the same step.
+
+    Args:
+        config (DictConfig): A DictConfig object which contains optimization
+            settings specified by the configuration file and the command line
+            options.
+
+    Attributes:
+        percentile (float): The percentile in [0, 100]. With a lower value
+            more trials are stopped.
+    """
+
+    def __init__(self, config: DictConfig) -> None:
+        super().__init__(config)
+        self.percentile = float(config.optimize.pruner.percentile)
+        if not 0.0 <= self.percentile <= 100.0:
+            raise ValueError(f"percentile must be between 0 and 100: {self.percentile}")
+
+    def prune(self, storage: Storage, trial_id: int) -> bool:
+        """Whether a running trial should be stopped.
+
+        Args:
+            storage (Storage): The storage of the intermediate values.
+            trial_id (int): The trial id.
+
+        Returns:
+            bool: True if the trial should be stopped.
+        """
+        intermediates = storage.intermediate.get_any_trial_intermediates(trial_id)
+        if len(intermediates) == 0:
+            return False
+        step = max(intermediates.keys())
+        if step < self.n_warmup_steps:
+            return False
+
+        others = storage.intermediate.get_intermediates_at_step(step)
+        others.pop(trial_id, None)
+        succeeded = self.get_succeeded_trial_ids(storage, list(others.keys()))
+        values = [value for other, value in others.items() if other in succeeded and not math.isnan(value)]
+        if len(values) == 0 or len(succeeded) < self.n_startup_trials:
+            return False
+
+        own = [value for value in intermediates.values() if not math.isnan(value)]
+        if len(own) == 0:
+            return True
+        if self.goal == "maximize":
+            return max(own) < float(np.percentile(values, 100.0 - self.percentile))
+        return min(own) > float(np.percentile(values, self.percentile))
+
+
+class MedianPruner(PercentilePruner):
+    """Stops a trial whose best intermediate value is worse than the median
+    of the values of the succeeded trials at the same step.
+
+    Args:
+        config (DictConfig): A DictConfig object which contains optimization
+            settings specified by the configuration file and the command line
+            options.
+    """
+
+    def __init__(self, config: DictConfig) -> None:
+        AbstractPruner.__init__(self, config)
+        self.percentile = 50.0
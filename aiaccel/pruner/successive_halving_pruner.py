@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import math
+
+from omegaconf.dictconfig import DictConfig
+
+from aiaccel.pruner.abstract_pruner import AbstractPruner
+from aiaccel.storage import Storage
+
+
+class SuccessiveHalvingPruner(AbstractPruner):
+    """Stops trials by asynchronous successive halving (ASHA).
+
+    The budget of a trial is the step it reports intermediate values at,
+    such as the number of epochs. The rungs are at the steps
+    min_resource * reduction_factor ** k below max_resource. A trial that
+    reaches a rung goes on to the next rung only if its value is in the top
+    1 / reduction_factor of the values of all trials that have reached the
+    rung so far, and is stopped otherwise. The decision is made as soon as
+    the trial reaches the rung, so no trial waits for other trials and the
+    workers are kept busy.
+
+    The value of a trial at a rung is the first value it has reported at or
+    after the step of the rung. It is compared with the values the other
+    trials have reported at the step itself, which are read by the index on
+    the step, so a check does not read the values of all trials.
+
+    n_startup_trials and n_warmup_steps are not used; min_resource plays
+    the role of the warmup.
+
+    Args:
+        config (DictConfig): A DictConfig object which contains optimization
+            settings specified by the configuration file and the command line
+            options.
+
+    Attributes:
+        min_resource (int): The step of the first rung.
+        max_resource (int | None): The full budget. Trials are not stopped
+            at or after this step.
+        reduction_factor (int): The ratio of the steps of successive rungs.
+        rungs (dict[int, int]): The number of rungs each trial has passed, by
+            trial id.
+    """
+
+    def __init__(self, config: DictConfig) -> None:
+        super().__init__(config)
+        pruner = config.optimize.pruner
+        self.min_resource = int(pruner.min_resource)
+        self.max_resource = None if pruner.max_resource is None else int(pruner.max_resource)
+        self.reduction_factor = int(pruner.reduction_factor)
+        if self.min_resource < 1:
+            raise ValueError(f"min_resource must be positive: {self.min_resource}")
+        if self.reduction_factor < 2:
+            raise ValueError(f"reduction_factor must be at least 2: {self.reduction_factor}")
+        if self.max_resource is not None and self.max_resource < self.min_resource:
+            raise ValueError(f"max_resource must not be less than min_resource: {self.max_resource}")
+        self.rungs: dict[int, int] = {}
+
+    def get_early_stopping_rate(self, trial_id: int) -> int:  # noqa: U100
+        """Get the number of rungs skipped by a trial.
+
+        Args:
+            trial_id (int): The trial id.
+
+        Returns:
+            int: The first rung of the trial is at
+            min_resource * reduction_factor ** (the returned value).
+        """
+        return 0
+
+    def is_competing(self, trial_id: int, other_trial_id: int) -> bool:  # noqa: U100
+        """Whether two trials are compared with each other at the rungs.
+
+        Args:
+            trial_id (int): The trial id.
+            other_trial_id (int): The trial id of another trial.
+
+        Returns:
+            bool: True if the trials are compared.
+        """
+        return True
+
+    def get_rung_step(self, trial_id: int, rung: int) -> int:
+        """Get the step of a rung of a trial.
+
+        Args:
+            trial_id (int): The trial id.
+            rung (int): The rung, starting from 0.
+
+        Returns:
+            int: The step.
+        """
+        return self.min_resource * self.reduction_factor ** (self.get_early_stopping_rate(trial_id) + rung)
+
+    def prune(self, storage: Storage, trial_id: int) -> bool:
+        """Whether a running trial should be stopped.
+
+        The rungs the trial has reached since the last check are checked in
+        order.
+
+        Args:
+            storage (Storage): The storage of the intermediate values.
+            trial_id (int): The trial id.
+
+        Returns:
+            bool: True if the trial should be stopped.
+        """
+        intermediates = storage.intermediate.get_any_trial_intermediates(trial_id)
+        if len(intermediates) == 0:
+            return False
+        step = max(intermediates.keys())
+
+        rung = self.rungs.get(trial_id, 0)
+        while True:
+            rung_step = self.get_rung_step(trial_id, rung)
+            if step < rung_step or (self.max_resource is not None and rung_step >= self.max_resource):
+                return False
+            value = next(value for value_step, value in intermediates.items() if value_step >= rung_step)
+            values = storage.intermediate.get_intermediates_at_step(rung_step)
+            values.pop(trial_id, None)
+            competing = [
+                other_value
+                for other, other_value in values.items()
+                if self.is_competing(trial_id, other) and not math.isnan(other_value)
+            ]
+            if not self.is_promotable(value, competing):
+                return True
+            rung += 1
+            self.rungs[trial_id] = rung
+
+    def is_promotable(self, value: float, competing: list[float]) -> bool:
+        """Whether a value is in the top 1 / reduction_factor of the values at
+        a rung.
+
+        The best value so far is always promoted.
+
+        Args:
+            value (float): The value of the trial.
+            competing (list[float]): The values of the other trials.
+
+        Returns:
+            bool: True if the trial goes on to the next rung.
+        """
+        if math.isnan(value):
+            return False
+        values = sorted([value, *competing], reverse=self.goal == "maximize")
+        num_promoted = max(len(values) // self.reduction_factor, 1)
+        if self.goal == "maximize":
+            return value >= values[num_promoted - 1]
+        return value <= values[num_promoted - 1]
+
+
+class HyperbandPruner(SuccessiveHalvingPruner):
+    """Stops trials by successive halving in Hyperband brackets.
+
+    The brackets differ in the first rung, from min_resource (the most
+    aggressive) up to max_resource. Each trial is assigned to a bracket by a
+    hash of its trial id, in the proportion Hyperband gives to the brackets,
+    and is compared only with the trials of the same bracket. It is less
+    sensitive to the choice of min_resource than successive halving.
+
+    Args:
+        config (DictConfig): A DictConfig object which contains optimization
+            settings specified by the configuration file and the command line
+            options.
+
+    Attributes:
+        num_brackets (int): The number of brackets.
+        bracket_weights (list[int]): The relative number of trials of each
+            bracket.
+    """
+
+    def __init__(self, config: DictConfig) -> None:
+        super().__init__(config)
+        if self.max_resource is None:
+            raise ValueError("HyperbandPruner needs max_resource.")
+        num_brackets = 1
+        while self.min_resource * self.reduction_factor**num_brackets <= self.max_resource:
+            num_brackets += 1
+        self.num_brackets = num_brackets
+        # The bracket with the early stopping rate s runs
+        # n / (n - s) * reduction_factor ** (n - 1 - s) trials per round.
+        self.bracket_weights = [
+            math.ceil(num_brackets / (num_brackets - s) * self.reduction_factor ** (num_brackets - 1 - s))
+            for s in range(num_brackets)
+        ]
+
+    def get_bracket(self, trial_id: int) -> int:
+        """Get the bracket of a trial.
+
+        Args:
+            trial_id (int): The trial id.
+
+        Returns:
+            int: The bracket, which is the early stopping rate of the trial.
+        """
+        # A multiplicative hash spreads consecutive trial ids over the
+        # brackets.
+        position = (trial_id * 2654435761) % 2**32 % sum(self.bracket_weights)
+        for bracket, weight in enumerate(self.bracket_weights):
+            if position < weight:
+                return bracket
+            position -= weight
+        return self.num_brackets - 1
+
+    def get_early_stopping_rate(self, trial_id: int) -> int:
+        """Get the number of rungs skipped by a trial.
+
+        Args:
+            trial_id (int): The trial id.
+
+        Returns:
+            int: The bracket of the trial.
+        """
+        return self.get_bracket(trial_id)
+
+    def is_competing(self, trial_id: int, other_trial_id: int) -> bool:
+        """Whether two trials are in the same bracket.
+
+        Args:
+            trial_id (int): The trial id.
+            other_trial_id (int): The trial id of another trial.
+
+        Returns:
+            bool: True if the trials are in the same bracket.
+        """
+        return self.get_bracket(trial_id) == self.get_bracket(other_trial_id)
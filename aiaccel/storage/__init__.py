@@ -1,11 +1,18 @@
-from aiaccel.storage.abstract import Abstract
+from aiaccel.storage.abstract import Abstract, TransactionRolledBackError
+from aiaccel.storage.backend import JournalBackend, MemoryBackend, SqliteBackend
+from aiaccel.storage.checkpoint import Checkpoint, StateStore
 from aiaccel.storage.error import Error
+from aiaccel.storage.evaluation_cache import EvaluationCache, EvaluationCacheTable
 from aiaccel.storage.hp import Hp
+from aiaccel.storage.intermediate import Intermediate
 from aiaccel.storage.jobstate import JobState
 from aiaccel.storage.model import (
     Base,
+    BestValueTable,
+    CheckpointTable,
     ErrorTable,
     HpTable,
+    IntermediateTable,
     JobStateTable,
     ResultTable,
     ReturnCodeTable,
@@ -22,21 +29,33 @@ from aiaccel.storage.variable import Serializer, Value, Variable
 __all__ = [
     "Abstract",
     "Base",
+    "BestValueTable",
+    "Checkpoint",
+    "CheckpointTable",
     "Error",
     "ErrorTable",
+    "EvaluationCache",
+    "EvaluationCacheTable",
     "Hp",
     "HpTable",
+    "Intermediate",
+    "IntermediateTable",
     "JobState",
     "JobStateTable",
+    "JournalBackend",
+    "MemoryBackend",
     "Result",
     "ResultTable",
     "ReturnCodeTable",
     "Serializer",
+    "SqliteBackend",
+    "StateStore",
     "Storage",
     "TimeStamp",
     "TimestampTable",
     "Trial",
     "TrialTable",
+    "TransactionRolledBackError",
     "Variable",
     "VariableTable",
     "Value",
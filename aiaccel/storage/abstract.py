@@ -1,18 +1,288 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator
+from typing import Any, Callable, Generator
 
-from sqlalchemy import MetaData, create_engine
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
-from sqlalchemy.pool import NullPool
 
-from aiaccel.storage.model import Base
+from aiaccel.storage.backend import SqliteBackend
+from aiaccel.storage.migration import upgrade_schema
+from aiaccel.storage.trial_index import TrialStateIndex
 from aiaccel.util import retry
+from aiaccel.util.retry import NonRetryableError
+
+_TRANSACTION_DEPTH = "transaction_depth"
+_TRANSACTION_ROLLED_BACK = "transaction_rolled_back"
+_ON_COMMIT = "on_commit"
+
+
+class TransactionRolledBackError(NonRetryableError, RuntimeError):
+    """A failed operation has rolled back the open unit of work.
+
+    The operation is not retried, because the writes made before it in the
+    unit of work have been discarded.
+    """
+
+
+class _StorageSession(Session):
+    """A session that joins the unit of work opened by Abstract.transaction().
+
+    While a unit of work is open, commit() only flushes the pending changes so
+    that they become visible to later queries in the same unit of work, and
+    the changes are committed when the outermost transaction() exits.
+    """
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Registers a callback that is called after the pending changes are
+        committed. The callback is discarded if they are rolled back.
+
+        Args:
+            callback (Callable[[], None]): A callable without arguments.
+
+        Returns:
+            None
+        """
+        self.info.setdefault(_ON_COMMIT, []).append(callback)
+
+    def has_pending_callbacks(self) -> bool:
+        """Whether callbacks are waiting for the pending changes to be committed."""
+        return bool(self.info.get(_ON_COMMIT))
+
+    def commit(self) -> None:
+        if self.info.get(_TRANSACTION_DEPTH, 0) > 0:
+            self.flush()
+            return
+        super().commit()
+        for callback in self.info.pop(_ON_COMMIT, []):
+            callback()
+
+    def rollback(self) -> None:
+        self.info.pop(_ON_COMMIT, None)
+        super().rollback()
+        if self.info.get(_TRANSACTION_DEPTH, 0) > 0:
+            # Everything written so far in the unit of work is discarded.
+            self.info[_TRANSACTION_ROLLED_BACK] = True
+            raise TransactionRolledBackError("The storage transaction was rolled back by a failed operation.")
+
+    def close(self) -> None:
+        if self.info.get(_TRANSACTION_DEPTH, 0) > 0:
+            return
+        self.info.pop(_ON_COMMIT, None)
+        super().close()
+
+
+class _SharedEngine:
+    """An engine and a session factory shared by all accessors of one database file.
+
+    Args:
+        file_name (Path): Path to the storage file.
+        backend (SqliteBackend | None, optional): Where the data is kept.
+            Defaults to None (the SQLite file).
+
+    Attributes:
+        key (str): Resolved path to the storage file.
+        backend (SqliteBackend): The storage backend.
+        url (str): URL to the storage file.
+        engine (Engine): Engine to the storage file.
+        session (scoped_session): Thread-local session factory bound to the engine.
+        file_id (tuple[int, int] | None): Device and inode numbers of the storage file.
+        ref_count (int): The number of accessors using this engine.
+        wal_mode (bool): Whether the file uses write-ahead logging with
+            synchronous=NORMAL.
+        busy_timeout (float): Seconds that SQLite waits for a lock before it
+            reports the database as busy.
+        state_index (TrialStateIndex | None): In-memory index of trial
+            states, maintained once enabled by Trial.enable_state_index().
+    """
+
+    def __init__(self, file_name: Path, backend: SqliteBackend | None = None) -> None:
+        self.key = str(file_name)
+        self.backend = backend or SqliteBackend()
+        self.url = f"sqlite:///{file_name}"
+        self.wal_mode = False
+        self.busy_timeout = 60.0
+        self.engine: Engine = self.backend.create_engine(file_name)
+        if not self.backend.in_memory:
+            event.listen(self.engine, "connect", self._on_connect)
+            event.listen(self.engine, "checkout", self._on_checkout)
+        self.backend.load(self.engine, file_name)
+        upgrade_schema(self.engine)
+        self.backend.open(self.engine, file_name)
+        # Objects read in a unit of work stay usable after it is committed.
+        session_factory = sessionmaker(
+            class_=_StorageSession, autocommit=False, autoflush=True, expire_on_commit=False, bind=self.engine
+        )
+        event.listen(session_factory, "after_commit", self._after_commit)
+        self.session: scoped_session[_StorageSession] = scoped_session(session_factory)
+        # An in-memory storage does not follow the file, which it may replace
+        # when it is flushed.
+        self.file_id = None if self.backend.in_memory else _get_file_id(file_name)
+        self.ref_count = 0
+        self.state_index: TrialStateIndex | None = None
+
+    def _on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        if self.wal_mode:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+        connection_record.info["file_id"] = _get_file_id(Path(self.key))
+
+    def _on_checkout(self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:  # noqa: U100
+        # A pooled connection keeps the file open even if the file has been
+        # deleted or replaced, so it is discarded in that case and the pool
+        # reconnects to the current file.
+        if connection_record.info.get("file_id") != _get_file_id(Path(self.key)):
+            raise DisconnectionError("The storage file has been deleted or replaced.")
+
+    def _after_commit(self, session: Session) -> None:  # noqa: U100
+        self.backend.after_commit(self.engine)
+
+    def configure(self, wal_mode: bool = False, busy_timeout: float | None = None) -> None:
+        """Changes the connection options and reconnects if they differ.
+
+        WAL mode is never turned off here once enabled, because the journal
+        mode is persistent in the file and other processes may rely on it.
+        The options do not apply to an in-memory storage.
+
+        Args:
+            wal_mode (bool, optional): Enable write-ahead logging with
+                synchronous=NORMAL. Defaults to False.
+            busy_timeout (float | None, optional): Seconds to wait for a lock.
+                Defaults to None (unchanged).
+
+        Returns:
+            None
+        """
+        if self.backend.in_memory:
+            return
+        changed = False
+        if wal_mode and not self.wal_mode:
+            self.wal_mode = True
+            changed = True
+        if busy_timeout is not None and busy_timeout != self.busy_timeout:
+            self.busy_timeout = float(busy_timeout)
+            changed = True
+        if changed:
+            self.dispose()
+            with self.engine.connect():
+                pass
+
+    def dispose(self, close: bool = True) -> None:
+        """Releases all pooled connections.
+
+        Args:
+            close (bool, optional): Close the connections. Set False in a
+                forked child so that the parent's connections are left as is.
+                Defaults to True.
+
+        Returns:
+            None
+        """
+        self.session.remove()
+        if close:
+            self.backend.close(self.engine)
+        self.engine.dispose(close=close)
+
+
+_engines: dict[str, _SharedEngine] = {}
+# Reentrant because a garbage-collected accessor may release its engine while
+# the lock is held by the same thread.
+_engines_lock = threading.RLock()
+
+
+def _get_file_id(file_name: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(file_name)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def acquire_engine(file_name: Path, backend: SqliteBackend | None = None) -> _SharedEngine:
+    """Returns the process-wide engine of the storage file and increments its
+    reference count.
+
+    A new engine is created when no engine exists for the file, or when the
+    file has been deleted or replaced since the engine was created (e.g. the
+    workspace was cleaned).
+
+    Args:
+        file_name (Path): Path to the storage file.
+        backend (SqliteBackend | None, optional): The backend of a new engine.
+            Defaults to None (the backend of the existing engine, or the
+            SQLite file).
+
+    Returns:
+        _SharedEngine: The shared engine.
+
+    Raises:
+        ValueError: Causes when the storage is already open in this process
+            with another backend.
+    """
+    key = str(Path(file_name).resolve())
+    with _engines_lock:
+        shared = _engines.get(key)
+        if shared is not None and not shared.backend.in_memory and shared.file_id != _get_file_id(Path(key)):
+            # The index describes the old file, so accessors still holding
+            # the engine fall back to querying the database.
+            shared.state_index = None
+            shared.dispose()
+            shared = None
+        if shared is None:
+            shared = _SharedEngine(Path(key), backend)
+            _engines[key] = shared
+        elif backend is not None and backend.name != shared.backend.name:
+            raise ValueError(f"The storage is already open with the {shared.backend.name} backend.")
+        shared.ref_count += 1
+        return shared
+
+
+def release_engine(shared: _SharedEngine) -> None:
+    """Decrements the reference count of the engine and disposes it when it
+    is no longer used.
+
+    Args:
+        shared (_SharedEngine): The shared engine returned by acquire_engine().
+
+    Returns:
+        None
+    """
+    with _engines_lock:
+        shared.ref_count -= 1
+        if shared.ref_count > 0:
+            return
+        if _engines.get(shared.key) is shared:
+            del _engines[shared.key]
+        shared.dispose()
+
+
+def _dispose_engines_after_fork() -> None:
+    # Pooled connections must not be shared with the parent process. An
+    # in-memory storage is left as is; the child has its own copy of it.
+    for shared in _engines.values():
+        if not shared.backend.in_memory:
+            shared.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
 
 
 class Abstract:
     """Abstract class for storage.
 
+    All instances for the same storage file share one engine, connection pool
+    and session factory, which are disposed when the last instance is closed.
+
     Args:
         file_name (Path): Path to the storage file.
 
@@ -26,16 +296,139 @@ class Abstract:
 
     @retry(_MAX_NUM=6, _DELAY=1.0)
     def __init__(self, file_name: Path) -> None:
-        self.url = f"sqlite:///{file_name}"
-        self.engine = create_engine(self.url, echo=False, poolclass=NullPool, connect_args={"timeout": 60})
+        self._shared = acquire_engine(file_name)
+        self._finalizer = weakref.finalize(self, release_engine, self._shared)
+        self.url = self._shared.url
+        self.engine = self._shared.engine
         self.metadata = MetaData()
         self.metadata.bind = self.engine
-        Base.metadata.create_all(self.engine)
-        self.session = scoped_session(sessionmaker(autocommit=False, autoflush=True, bind=self.engine))
+        self.session = self._shared.session
         self.lock_file = Path(file_name).resolve().parent / "db_lock"
 
     @contextmanager
-    def create_session(self) -> Generator[Session, None, None]:
+    def create_session(self) -> Generator[_StorageSession, None, None]:
         session = self.session()
         yield session
         session.close()
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def _begin(self, session: _StorageSession) -> None:
+        # The write lock is taken when the unit of work is opened, so a busy
+        # database is retried here before anything has been written. A
+        # deferred transaction would fail at its first write instead, and
+        # the unit of work could not be retried as a whole.
+        if self._shared.backend.in_memory:
+            return
+        try:
+            connection = session.connection()
+            if not connection.connection.driver_connection.in_transaction:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+        except BaseException:
+            session.rollback()
+            session.close()
+            raise
+
+    @contextmanager
+    def transaction(self) -> Generator[_StorageSession, None, None]:
+        """Groups the writes of all accessors of the storage file made in the
+        current thread into one atomic commit.
+
+        The accessors share a thread-local session, so every method called in
+        the block joins the unit of work. Nested blocks join the outermost
+        one, which commits on exit or rolls back if an exception is raised.
+
+        The outermost block takes the write lock of the file when it is
+        entered, waiting and retrying while another process holds it, and
+        keeps it until it exits. Keep the block free of slow work such as
+        starting processes.
+
+        Args:
+            None
+
+        Yields:
+            Session: The session of the unit of work.
+
+        Raises:
+            TransactionRolledBackError: Causes when an operation in the block
+                failed and rolled back the unit of work. The operation is not
+                retried, and the error is raised on exit even if it was
+                caught in the block.
+        """
+        session = self.session()
+        depth = session.info.get(_TRANSACTION_DEPTH, 0)
+        if depth == 0:
+            self._begin(session)
+            session.info[_TRANSACTION_ROLLED_BACK] = False
+        session.info[_TRANSACTION_DEPTH] = depth + 1
+        try:
+            yield session
+        except BaseException:
+            session.info[_TRANSACTION_DEPTH] = depth
+            if depth == 0:
+                session.rollback()
+                session.close()
+            raise
+        session.info[_TRANSACTION_DEPTH] = depth
+        if depth > 0:
+            return
+        try:
+            if session.info.pop(_TRANSACTION_ROLLED_BACK, False):
+                session.rollback()
+                raise TransactionRolledBackError("The storage transaction was rolled back by a failed operation.")
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def call_after_commit(self, callback: Callable[[], None]) -> None:
+        """Calls the callback once the writes made so far are committed.
+
+        Outside a unit of work the writes are already committed, so the
+        callback is called immediately. Inside one it is called when the
+        unit of work is committed, and discarded if it is rolled back.
+
+        Args:
+            callback (Callable[[], None]): A callable without arguments.
+
+        Returns:
+            None
+        """
+        session = self.session()
+        if session.info.get(_TRANSACTION_DEPTH, 0) > 0:
+            session.on_commit(callback)
+        else:
+            callback()
+
+    def configure(self, wal_mode: bool = False, busy_timeout: float | None = None) -> None:
+        """Changes the connection options of the shared engine.
+
+        Args:
+            wal_mode (bool, optional): Enable write-ahead logging with
+                synchronous=NORMAL. Defaults to False.
+            busy_timeout (float | None, optional): Seconds to wait for a lock.
+                Defaults to None (unchanged).
+
+        Returns:
+            None
+        """
+        with _engines_lock:
+            self._shared.configure(wal_mode=wal_mode, busy_timeout=busy_timeout)
+
+    def flush(self) -> None:
+        """Writes the data the backend keeps outside the storage file, such
+        as an in-memory database, to the file.
+
+        Returns:
+            None
+        """
+        self._shared.backend.flush(self.engine)
+
+    def close(self) -> None:
+        """Releases the reference to the shared engine.
+
+        Returns:
+            None
+        """
+        self._finalizer()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from aiaccel.storage.model import SCHEMA_VERSION
+
+BACKENDS = ("sqlite", "memory", "journal")
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def _is_write(statement: str) -> bool:
+    return statement.lstrip()[:7].upper().startswith(_WRITE_STATEMENTS)
+
+
+class SqliteBackend:
+    """Keeps the storage in the SQLite file itself.
+
+    Every process opening the file sees the writes of the others, so this is
+    the backend for resource types that run trials in separate processes.
+    """
+
+    name = "sqlite"
+    in_memory = False
+
+    def create_engine(self, file_name: Path) -> Engine:
+        """Creates the engine of the storage.
+
+        Args:
+            file_name (Path): Path to the storage file.
+
+        Returns:
+            Engine: The engine.
+        """
+        return create_engine(
+            f"sqlite:///{file_name}",
+            echo=False,
+            poolclass=QueuePool,
+            connect_args={"check_same_thread": False},
+        )
+
+    def load(self, engine: Engine, file_name: Path) -> None:  # noqa: U100
+        """Restores the stored data before the schema is upgraded.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+            file_name (Path): Path to the storage file.
+
+        Returns:
+            None
+        """
+        return None
+
+    def open(self, engine: Engine, file_name: Path) -> None:  # noqa: U100
+        """Prepares the backend after the schema is upgraded.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+            file_name (Path): Path to the storage file.
+
+        Returns:
+            None
+        """
+        return None
+
+    def after_commit(self, engine: Engine) -> None:  # noqa: U100
+        """Called after a session of the storage is committed.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+
+        Returns:
+            None
+        """
+        return None
+
+    def close(self, engine: Engine) -> None:  # noqa: U100
+        """Called before the engine is disposed.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+
+        Returns:
+            None
+        """
+        return None
+
+    def flush(self, engine: Engine) -> None:  # noqa: U100
+        """Writes the data kept outside the storage file to the file.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+
+        Returns:
+            None
+        """
+        return None
+
+
+class MemoryBackend(SqliteBackend):
+    """Keeps the storage in an in-memory SQLite database of this process.
+
+    The data in the storage file, if any, is loaded when the storage is
+    opened, and the database is written back to the storage file when the
+    storage is flushed or closed, so that the file can be read by other
+    processes and used to resume. flush_interval only controls the writes
+    while the storage is in use. Writes made by other processes are not
+    seen, so this backend is only for trials run in the process that owns
+    the storage (the python_local resource type) and for tests.
+
+    Args:
+        flush_interval (float | None, optional): Seconds between writes of
+            the database to the storage file after commits. 0 writes after
+            every commit. Defaults to None (written only when flushed or
+            closed).
+        read_only (bool, optional): Never write the database to the storage
+            file, for processes that only read a storage owned by another
+            process. Defaults to False.
+    """
+
+    name = "memory"
+    in_memory = True
+
+    def __init__(self, flush_interval: float | None = None, read_only: bool = False) -> None:
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+        self.file_name: Path | None = None
+        self._dirty = False
+        self._last_flush_time = time.monotonic()
+        self._lock = threading.Lock()
+        # A forked child has a copy of the database, which must not replace
+        # the file written by this process.
+        self._pid = os.getpid()
+
+    def create_engine(self, file_name: Path) -> Engine:
+        # One connection shared by all threads, because every connection to
+        # "sqlite://" would be a separate empty database.
+        engine = create_engine(
+            "sqlite://",
+            echo=False,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        return engine
+
+    def load(self, engine: Engine, file_name: Path) -> None:
+        self.file_name = file_name
+        if not file_name.exists():
+            return
+        source = sqlite3.connect(file_name)
+        raw = engine.raw_connection()
+        try:
+            source.backup(raw.driver_connection)
+        finally:
+            raw.close()
+            source.close()
+
+    def _after_cursor_execute(
+        self,
+        conn: Any,  # noqa: U100
+        cursor: Any,  # noqa: U100
+        statement: str,
+        parameters: Any,  # noqa: U100
+        context: Any,  # noqa: U100
+        executemany: bool,  # noqa: U100
+    ) -> None:
+        if _is_write(statement):
+            self._dirty = True
+
+    def after_commit(self, engine: Engine) -> None:
+        if self.flush_interval is None or not self._dirty:
+            return
+        if time.monotonic() - self._last_flush_time >= self.flush_interval:
+            self.flush(engine)
+
+    def close(self, engine: Engine) -> None:
+        if self._dirty:
+            self.flush(engine)
+
+    def flush(self, engine: Engine) -> None:
+        """Writes the database to the storage file.
+
+        The file is replaced atomically, so readers see either the previous
+        or the new contents.
+
+        Args:
+            engine (Engine): The engine returned by create_engine().
+
+        Returns:
+            None
+        """
+        if self.file_name is None or self.read_only or os.getpid() != self._pid:
+            return
+        with self._lock:
+            tmp_file_name = self.file_name.with_name(f"{self.file_name.name}.{os.getpid()}.tmp")
+            destination = sqlite3.connect(tmp_file_name)
+            raw = engine.raw_connection()
+            try:
+                raw.driver_connection.backup(destination)
+            finally:
+                raw.close()
+                destination.close()
+            os.replace(tmp_file_name, self.file_name)
+            self._dirty = False
+            self._last_flush_time = time.monotonic()
+
+
+class JournalBackend(MemoryBackend):
+    """Keeps the storage in memory and appends every committed write to a
+    journal file.
+
+    The journal (the storage file name with the suffix ".journal") is
+    replayed when the storage is opened, so a run can be resumed from it.
+    Each commit is appended as one record; a record truncated by a crash is
+    discarded on replay. Only one process may write to the journal, and
+    other processes open it read-only: they replay the journal without
+    opening it for writing, so a record being appended by the writer is
+    left as it is.
+
+    Args:
+        sync (bool, optional): Call fsync after each commit so that the
+            records survive a power failure as well. Defaults to False.
+        read_only (bool, optional): Only replay the journal. Defaults to
+            False.
+    """
+
+    name = "journal"
+
+    def __init__(self, sync: bool = False, read_only: bool = False) -> None:
+        super().__init__(flush_interval=None, read_only=read_only)
+        self.sync = sync
+        self.journal_file_name: Path | None = None
+        self._file: Any = None
+        self._pending: list[tuple[str, Any, bool]] = []
+
+    def create_engine(self, file_name: Path) -> Engine:
+        engine = super().create_engine(file_name)
+        event.listen(engine, "rollback", self._on_rollback)
+        return engine
+
+    def load(self, engine: Engine, file_name: Path) -> None:
+        self.file_name = file_name
+        self.journal_file_name = get_journal_file_path(file_name)
+
+    def open(self, engine: Engine, file_name: Path) -> None:
+        assert self.journal_file_name is not None
+        records = []
+        size = 0
+        if self.journal_file_name.exists():
+            records, size = read_journal(self.journal_file_name)
+        if len(records) > 0:
+            version = records[0].get("schema_version") if isinstance(records[0], dict) else None
+            if version != SCHEMA_VERSION:
+                raise RuntimeError(f"The journal has schema version {version}, which is not {SCHEMA_VERSION}.")
+            raw = engine.raw_connection()
+            try:
+                cursor = raw.driver_connection.cursor()
+                for record in records[1:]:
+                    for statement, parameters, executemany in record:
+                        if executemany:
+                            cursor.executemany(statement, parameters)
+                        else:
+                            cursor.execute(statement, parameters)
+                raw.driver_connection.commit()
+            finally:
+                raw.close()
+
+        if self.read_only:
+            return
+        self._file = open(self.journal_file_name, "ab")
+        # Drops a record truncated by a crash before appending.
+        self._file.truncate(size)
+        if size == 0:
+            self._append({"schema_version": SCHEMA_VERSION})
+
+    def _append(self, record: Any) -> None:
+        self._file.write(pickle.dumps(record, protocol=5))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def _after_cursor_execute(
+        self,
+        conn: Any,  # noqa: U100
+        cursor: Any,  # noqa: U100
+        statement: str,
+        parameters: Any,
+        context: Any,  # noqa: U100
+        executemany: bool,
+    ) -> None:
+        if _is_write(statement):
+            self._pending.append((statement, parameters, executemany))
+
+    def _on_rollback(self, conn: Any) -> None:  # noqa: U100
+        self._pending.clear()
+
+    def after_commit(self, engine: Engine) -> None:  # noqa: U100
+        record, self._pending = self._pending, []
+        if len(record) == 0 or self._file is None:
+            return
+        self._append(record)
+
+    def flush(self, engine: Engine) -> None:
+        # Every commit is already in the journal.
+        self.after_commit(engine)
+
+    def close(self, engine: Engine) -> None:
+        self.after_commit(engine)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def get_journal_file_path(file_name: Path) -> Path:
+    """Returns the path to the journal of a storage file.
+
+    Args:
+        file_name (Path): Path to the storage file.
+
+    Returns:
+        Path: Path to the journal file.
+    """
+    return Path(file_name).with_suffix(".journal")
+
+
+def read_journal(journal_file_name: Path) -> tuple[list[Any], int]:
+    """Reads the records of a journal file.
+
+    Args:
+        journal_file_name (Path): Path to the journal file.
+
+    Returns:
+        tuple[list[Any], int]: The records, and the size in bytes of the part
+        of the file holding complete records.
+    """
+    records = []
+    size = 0
+    with open(journal_file_name, "rb") as f:
+        while True:
+            try:
+                records.append(pickle.load(f))
+            except Exception:
+                # The end of the file, or a record truncated by a crash.
+                break
+            size = f.tell()
+    return records, size
+
+
+def create_backend(
+    name: str | None = None, flush_interval: float | None = None, read_only: bool = False
+) -> SqliteBackend:
+    """Creates a storage backend by name.
+
+    Args:
+        name (str | None, optional): 'sqlite', 'memory' or 'journal'.
+            Defaults to None ('sqlite').
+        flush_interval (float | None, optional): Seconds between writes of the
+            in-memory database to the storage file after commits. Only used
+            by 'memory'. Defaults to None (written only when flushed or
+            closed).
+        read_only (bool, optional): Never write the storage file or the
+            journal. Only used by 'memory' and 'journal', because the SQLite
+            file is shared by the processes anyway. Defaults to False.
+
+    Returns:
+        SqliteBackend: The backend.
+
+    Raises:
+        ValueError: Causes when the name is unknown.
+    """
+    if name is None or name == "sqlite":
+        return SqliteBackend()
+    if name == "memory":
+        return MemoryBackend(flush_interval=flush_interval, read_only=read_only)
+    if name == "journal":
+        return JournalBackend(read_only=read_only)
+    raise ValueError(f"Unknown storage backend: {name}")
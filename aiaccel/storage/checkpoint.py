@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import pickle
+from itertools import islice
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from aiaccel.storage.abstract import Abstract
+from aiaccel.storage.model import CheckpointTable
+from aiaccel.util import retry
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+SERIALIZERS = ("pickle", "msgpack")
+
+_PICKLE_PROTOCOL = 5
+# msgpack extension type of a value that msgpack cannot represent natively
+# (tuples, numpy arrays, arbitrary objects). It holds the pickled value.
+_MSGPACK_PICKLE_EXT = 1
+
+# Types whose values cannot change in place, so a change is found by
+# comparing with a copy instead of serializing.
+_ATOMIC_TYPES = frozenset({int, float, str, bytes, bool, type(None)})
+
+
+def _msgpack_default(obj: Any) -> Any:
+    return msgpack.ExtType(_MSGPACK_PICKLE_EXT, pickle.dumps(obj, protocol=_PICKLE_PROTOCOL))
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _MSGPACK_PICKLE_EXT:
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)  # pragma: no cover
+
+
+def dumps(obj: Any, serializer: str) -> bytes:
+    """Serializes an object.
+
+    Args:
+        obj (Any): An object.
+        serializer (str): 'pickle' (protocol 5) or 'msgpack'.
+
+    Returns:
+        bytes: The serialized object.
+
+    Raises:
+        ValueError: Causes when the serializer is unknown.
+        ImportError: Causes when 'msgpack' is requested but not installed.
+    """
+    if serializer == "pickle":
+        return pickle.dumps(obj, protocol=_PICKLE_PROTOCOL)
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise ImportError("The msgpack serializer requires the msgpack package.")
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True, strict_types=True)
+    raise ValueError(f"Unknown serializer: {serializer}")
+
+
+def loads(data: bytes, serializer: str) -> Any:
+    """Deserializes an object serialized by dumps().
+
+    Args:
+        data (bytes): The serialized object.
+        serializer (str): The serializer used by dumps().
+
+    Returns:
+        Any: The object.
+    """
+    if serializer == "pickle":
+        return pickle.loads(data)
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise ImportError("The msgpack serializer requires the msgpack package.")
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    raise ValueError(f"Unknown serializer: {serializer}")
+
+
+class Checkpoint(Abstract):
+    def __init__(self, file_name: Path) -> None:
+        super().__init__(file_name)
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def set_any_trial_checkpoint(
+        self,
+        trial_id: int,
+        process_name: str,
+        label: str,
+        kind: str,
+        base_trial_id: int | None,
+        serializer: str,
+        data: bytes,
+    ) -> None:
+        """Set the checkpoint of any trial, replacing an existing one.
+
+        Args:
+            trial_id (int): Any trial id
+            process_name (str): Any process name
+            label (str): Any label
+            kind (str): 'snapshot' or 'delta'
+            base_trial_id (int | None): Trial id of the checkpoint that a delta
+                applies to. None for a snapshot.
+            serializer (str): The serializer of data.
+            data (bytes): The serialized snapshot or delta.
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                (
+                    session.query(CheckpointTable)
+                    .filter(CheckpointTable.trial_id == trial_id)
+                    .filter(CheckpointTable.process_name == process_name)
+                    .filter(CheckpointTable.label == label)
+                    .delete()
+                )
+                session.add(
+                    CheckpointTable(
+                        trial_id=trial_id,
+                        process_name=process_name,
+                        label=label,
+                        kind=kind,
+                        base_trial_id=base_trial_id,
+                        serializer=serializer,
+                        data=data,
+                    )
+                )
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_checkpoint_chain(self, trial_id: int, process_name: str, label: str) -> list[CheckpointTable]:
+        """Get the checkpoints needed to restore the state of any trial.
+
+        Args:
+            trial_id (int): Any trial id
+            process_name (str): Any process name
+            label (str): Any label
+
+        Returns:
+            list[CheckpointTable]: A snapshot followed by the deltas to apply
+            in order. Empty if the checkpoint of the trial does not exist or
+            its chain is incomplete.
+        """
+        with self.create_session() as session:
+            query = (
+                session.query(CheckpointTable)
+                .filter(CheckpointTable.process_name == process_name)
+                .filter(CheckpointTable.label == label)
+            )
+            snapshot_trial_id = (
+                query.filter(CheckpointTable.kind == "snapshot")
+                .filter(CheckpointTable.trial_id <= trial_id)
+                .with_entities(CheckpointTable.trial_id)
+                .order_by(CheckpointTable.trial_id.desc())
+                .limit(1)
+                .scalar()
+            )
+            if snapshot_trial_id is None:
+                return []
+            rows = (
+                query.filter(CheckpointTable.trial_id >= snapshot_trial_id)
+                .filter(CheckpointTable.trial_id <= trial_id)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        by_trial_id = {row.trial_id: row for row in rows}
+        chain = []
+        row = by_trial_id.get(trial_id)
+        while row is not None:
+            chain.append(row)
+            if row.kind == "snapshot":
+                return chain[::-1]
+            row = by_trial_id.get(row.base_trial_id)
+        return []
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def all_delete(self) -> None:
+        """Clear table
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                session.query(CheckpointTable).with_for_update(read=True).delete()
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def delete_any_trial_checkpoint(self, trial_id: int) -> None:
+        """Delete the checkpoints of any trial of all processes.
+
+        Args:
+            trial_id (int): Any trial id
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                session.query(CheckpointTable).filter(CheckpointTable.trial_id == trial_id).delete()
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+
+def _is_atomic(value: Any) -> bool:
+    if type(value) in _ATOMIC_TYPES:
+        return True
+    return type(value) is tuple and all(map(_is_atomic, value))
+
+
+class _Tracked(NamedTuple):
+    """What the last checkpoint remembers of an attribute.
+
+    kind is 'value' for an atomic value, 'list' or 'dict' for a container of
+    atomic items and 'data' for any other value, which is kept serialized.
+    The copy of a container is kept with the types of its items, and only
+    its first `length` items belong to the checkpoint; the copy is extended
+    in place by the next checkpoint.
+    """
+
+    kind: str
+    value: Any
+    types: Any
+    length: int | None
+
+
+class StateStore:
+    """Stores the state dict of a module with snapshot-plus-delta compaction.
+
+    A full snapshot is written every `interval` checkpoints, and in between
+    only the attributes that changed since the previous checkpoint are
+    written. A list or a dict that only grew is stored as the appended items.
+    Restoring a trial replays the deltas from the nearest snapshot up to
+    that trial only.
+
+    Numbers, strings, and lists and dicts of them are compared with a copy
+    kept from the previous checkpoint, so only their new items are
+    serialized. Other attributes are serialized at every checkpoint to find
+    their changes, and a snapshot is written when one of them has changed,
+    so that the references shared between attributes are kept.
+
+    Args:
+        checkpoint (Checkpoint): The checkpoint table accessor.
+        process_name (str): Process name
+        label (str): Label
+        interval (int, optional): The number of checkpoints from one snapshot
+            to the next. 1 writes a snapshot every time. Defaults to 100.
+        serializer (str, optional): 'pickle' (protocol 5) or 'msgpack'.
+            Defaults to 'pickle'.
+
+    Raises:
+        ValueError: Causes when the interval or the serializer is invalid.
+    """
+
+    def __init__(
+        self, checkpoint: Checkpoint, process_name: str, label: str, interval: int = 100, serializer: str = "pickle"
+    ) -> None:
+        if interval < 1:
+            raise ValueError(f"Invalid checkpoint interval: {interval}")
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer: {serializer}")
+        self.checkpoint = checkpoint
+        self.process_name = process_name
+        self.label = label
+        self.interval = interval
+        self.serializer = serializer
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the last checkpoint so that the next one is a snapshot.
+
+        Returns:
+            None
+        """
+        # The attributes of the last committed checkpoint.
+        self._last: dict[str, _Tracked] = {}
+        self._last_trial_id: int | None = None
+        self._num_deltas = 0
+
+    def _track(self, value: Any) -> _Tracked:
+        if _is_atomic(value):
+            return _Tracked("value", value, type(value), None)
+        if type(value) is list and all(map(_is_atomic, value)):
+            return _Tracked("list", list(value), list(map(type, value)), len(value))
+        if type(value) is dict and all(map(_is_atomic, value)) and all(map(_is_atomic, value.values())):
+            values = list(value.values())
+            return _Tracked("dict", (list(value), values), list(map(type, values)), len(value))
+        return _Tracked("data", dumps(value, self.serializer), None, None)
+
+    def _diff_appended(self, last: _Tracked, value: Any) -> tuple[tuple[str, bytes] | None, _Tracked] | None:
+        # Compares with the copy of an atomic value or container. Returns
+        # None if the value has changed other than by appending.
+        if last.kind == "value":
+            if type(value) is last.types and _is_atomic(value) and (value is last.value or value == last.value):
+                return None, last
+            return None
+        assert last.length is not None
+        num_items = last.length
+        copies = [last.value] if last.kind == "list" else list(last.value)
+        # Drops the items appended by a checkpoint that was rolled back.
+        for copy in (*copies, last.types):
+            del copy[num_items:]
+        if type(value) is not (list if last.kind == "list" else dict) or len(value) < num_items:
+            return None
+        if last.kind == "list":
+            heads = [value if len(value) == num_items else value[:num_items]]
+        else:
+            heads = [list(islice(value, num_items)), list(islice(value.values(), num_items))]
+        if heads != copies or list(map(type, heads[-1])) != last.types:
+            return None
+        if len(value) == num_items:
+            return None, last
+
+        if last.kind == "list":
+            new_items = value[num_items:]
+            if not all(map(_is_atomic, new_items)):
+                return None
+            op = ("extend", dumps(new_items, self.serializer))
+            last.value.extend(new_items)
+            last.types.extend(map(type, new_items))
+        else:
+            new_keys = list(islice(value, num_items, None))
+            new_values = [value[key] for key in new_keys]
+            if not all(map(_is_atomic, new_keys)) or not all(map(_is_atomic, new_values)):
+                return None
+            op = ("update", dumps(dict(zip(new_keys, new_values)), self.serializer))
+            last.value[0].extend(new_keys)
+            last.value[1].extend(new_values)
+            last.types.extend(map(type, new_values))
+        return op, last._replace(length=len(value))
+
+    def _diff(self, state: dict[str, Any]) -> tuple[dict[str, Any], dict[str, _Tracked]] | None:
+        # Returns the operations of a delta and the tracked attributes, or
+        # None if a snapshot has to be written instead.
+        ops: dict[str, Any] = {"set": {}, "extend": {}, "update": {}, "delete": []}
+        tracked: dict[str, _Tracked] = {}
+        for name, value in state.items():
+            last = self._last.get(name)
+            if last is not None and last.kind != "data":
+                appended = self._diff_appended(last, value)
+                if appended is not None:
+                    op, tracked[name] = appended
+                    if op is not None:
+                        ops[op[0]][name] = op[1]
+                    continue
+            tracked[name] = self._track(value)
+            if tracked[name].kind != "data":
+                # An atomic value shares no references with other attributes.
+                ops["set"][name] = dumps(value, self.serializer)
+            elif last is None or last.kind != "data" or tracked[name].value != last.value:
+                # Restored alone, the value would not share the objects it
+                # shares with the other attributes.
+                return None
+        ops["delete"] = [name for name in self._last if name not in state]
+        return ops, tracked
+
+    def save(self, trial_id: int, state: dict[str, Any]) -> None:
+        """Writes the checkpoint of a trial.
+
+        Args:
+            trial_id (int): Trial id
+            state (dict[str, Any]): The attributes of the module.
+
+        Returns:
+            None
+        """
+        is_snapshot = (
+            self._last_trial_id is None or trial_id <= self._last_trial_id or self._num_deltas + 1 >= self.interval
+        )
+        delta = None if is_snapshot else self._diff(state)
+        if delta is None:
+            kind, base_trial_id, num_deltas = "snapshot", None, 0
+            # Attributes are serialized together so that shared references
+            # between them are kept.
+            data = dumps(state, self.serializer)
+            tracked = {name: self._track(value) for name, value in state.items()}
+        else:
+            kind, base_trial_id, num_deltas = "delta", self._last_trial_id, self._num_deltas + 1
+            ops, tracked = delta
+            data = dumps(ops, self.serializer)
+
+        self.checkpoint.set_any_trial_checkpoint(
+            trial_id=trial_id,
+            process_name=self.process_name,
+            label=self.label,
+            kind=kind,
+            base_trial_id=base_trial_id,
+            serializer=self.serializer,
+            data=data,
+        )
+
+        def advance() -> None:
+            self._last = tracked
+            self._last_trial_id = trial_id
+            self._num_deltas = num_deltas
+
+        # The next delta must be based on a checkpoint that was committed.
+        self.checkpoint.call_after_commit(advance)
+
+    def load(self, trial_id: int) -> dict[str, Any] | None:
+        """Restores the state of a trial.
+
+        Args:
+            trial_id (int): Trial id
+
+        Returns:
+            dict[str, Any] | None: The attributes of the module, or None if no
+            checkpoint of the trial exists.
+        """
+        chain = self.checkpoint.get_checkpoint_chain(trial_id, self.process_name, self.label)
+        if len(chain) == 0:
+            return None
+
+        state: dict[str, Any] = loads(chain[0].data, chain[0].serializer)
+        for row in chain[1:]:
+            ops = loads(row.data, row.serializer)
+            for name, value_data in ops["set"].items():
+                state[name] = loads(value_data, row.serializer)
+            for name, value_data in ops["extend"].items():
+                state[name].extend(loads(value_data, row.serializer))
+            for name, value_data in ops["update"].items():
+                state[name].update(loads(value_data, row.serializer))
+            for name in ops["delete"]:
+                del state[name]
+
+        # Checkpoints after this trial are written again from a snapshot.
+        self.reset()
+        return state
@@ -14,7 +14,7 @@ class Error(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_error(self, trial_id: int, error_message: str) -> None:
         """Set any error message for any trial.
 
@@ -45,7 +45,7 @@ class Error(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_error(self, trial_id: int) -> str | None:
         """Get error messages for any trial.
 
@@ -67,7 +67,22 @@ class Error(Abstract):
             return None
         return data.error
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_error(self, trial_ids: list[int]) -> dict[int, str | None]:
+        """Get error messages of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, str | None]: The error message of each trial that has one.
+        """
+        with self.create_session() as session:
+            data = session.query(ErrorTable).filter(ErrorTable.trial_id.in_(trial_ids)).with_for_update(read=True).all()
+
+        return {d.trial_id: d.error for d in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_exitcode(self, trial_id: int, exitcode: int) -> None:
         """Set any error message for any trial.
 
@@ -98,7 +113,7 @@ class Error(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_exitcode(self, trial_id: int) -> str | None:
         """Get error messages for any trial.
 
@@ -120,7 +135,7 @@ class Error(Abstract):
             return None
         return data.exitcode
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_error_trial_id(self) -> list[Any]:
         """Obtain a list of trial ids in which an error occurred.
 
@@ -138,7 +153,7 @@ class Error(Abstract):
 
         return [d.trial_id for d in data]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_failed_exitcode_trial_id(self) -> list[Any]:
         """Obtain a list of trial ids in which an error occurred.
 
@@ -156,7 +171,7 @@ class Error(Abstract):
 
         return [d.trial_id for d in data]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -174,7 +189,7 @@ class Error(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_error(self, trial_id: int) -> None:
         """Delete any trial error.
 
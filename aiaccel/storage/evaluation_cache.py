@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import numbers
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.declarative import DeclarativeMeta
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.schema import Column
+from sqlalchemy.types import String, Text
+
+from aiaccel.util import retry
+
+_CacheBase: DeclarativeMeta = declarative_base()
+
+# The number of keys looked up in one query, below the limit of SQLite on
+# the number of host parameters.
+_NUM_KEYS_PER_QUERY = 500
+
+
+class EvaluationCacheTable(_CacheBase):
+    __tablename__ = "evaluation_cache"
+    key = Column(String(64), primary_key=True)
+    objective_version = Column(Text, nullable=False)
+    parameters = Column(Text, nullable=False)
+    objective = Column(Text, nullable=False)
+
+
+def _canonical_value(value: Any) -> Any:
+    # 1 and numpy.int64(1) have the same key, and so do 0.5 and
+    # numpy.float64(0.5).
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return str(value)
+
+
+def canonical_parameters(params: list[dict[str, Any]]) -> dict[str, Any]:
+    """Get the parameter values of a trial by parameter name.
+
+    Args:
+        params (list[dict[str, Any]]): The parameters of a trial, with the
+            keys "parameter_name", "type" and "value".
+
+    Returns:
+        dict[str, Any]: The values by parameter name.
+    """
+    return {str(param["parameter_name"]): _canonical_value(param["value"]) for param in params}
+
+
+class EvaluationCache:
+    """The results of trials by their parameters, kept across studies.
+
+    The key of a result is a hash of the parameter values and the objective
+    version, so a study looks up the results measured by any study that
+    used the same cache file and the same objective version. The cache file
+    is a SQLite database separate from the workspace, and may be shared by
+    studies running at the same time.
+
+    Args:
+        file_name (Path | str): Path to the cache file.
+        objective_version (str, optional): Identifies the objective function.
+            Change it when the objective function changes, so the results of
+            the old function are not used. Defaults to "".
+    """
+
+    def __init__(self, file_name: Path | str, objective_version: str = "") -> None:
+        self.file_name = Path(file_name)
+        self.objective_version = objective_version
+        self.file_name.parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{self.file_name}", connect_args={"timeout": 60})
+        self.create_session = sessionmaker(bind=self.engine)
+        _CacheBase.metadata.create_all(self.engine)
+
+    def make_key(self, params: list[dict[str, Any]]) -> str:
+        """Get the key of the parameters of a trial.
+
+        Args:
+            params (list[dict[str, Any]]): The parameters of a trial.
+
+        Returns:
+            str: A hex digest of SHA-256.
+        """
+        content = json.dumps(
+            {"objective_version": self.objective_version, "parameters": canonical_parameters(params)},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, params: list[dict[str, Any]]) -> list[Any] | None:
+        """Get the objective values measured with the parameters.
+
+        Args:
+            params (list[dict[str, Any]]): The parameters of a trial.
+
+        Returns:
+            list[Any] | None: The objective values. None if they have not
+            been measured.
+        """
+        return self.get_many([params])[0]
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_many(self, params_list: list[list[dict[str, Any]]]) -> list[list[Any] | None]:
+        """Get the objective values measured with the parameters of trials.
+
+        Args:
+            params_list (list[list[dict[str, Any]]]): The parameters of the
+                trials.
+
+        Returns:
+            list[list[Any] | None]: The objective values of each trial. None
+            if they have not been measured.
+        """
+        keys = [self.make_key(params) for params in params_list]
+        objectives: dict[str, list[Any]] = {}
+        with self.create_session() as session:
+            for i in range(0, len(keys), _NUM_KEYS_PER_QUERY):
+                statement = select(EvaluationCacheTable.key, EvaluationCacheTable.objective).where(
+                    EvaluationCacheTable.key.in_(keys[i : i + _NUM_KEYS_PER_QUERY])
+                )
+                for key, objective in session.execute(statement):
+                    objectives[key] = list(json.loads(objective))
+        return [objectives.get(key) for key in keys]
+
+    def set(self, params: list[dict[str, Any]], objective: list[Any]) -> None:  # noqa: A003
+        """Add the objective values measured with the parameters.
+
+        A result already in the cache is kept.
+
+        Args:
+            params (list[dict[str, Any]]): The parameters of a trial.
+            objective (list[Any]): The objective values.
+
+        Returns:
+            None
+        """
+        self.set_many([(params, objective)])
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def set_many(self, results: list[tuple[list[dict[str, Any]], list[Any]]]) -> None:
+        """Add the objective values measured with the parameters of trials.
+
+        All results are added in one transaction. A result already in the
+        cache is kept.
+
+        Args:
+            results (list[tuple[list[dict[str, Any]], list[Any]]]): The
+                parameters and the objective values of each trial.
+
+        Returns:
+            None
+        """
+        if len(results) == 0:
+            return
+        rows = [
+            {
+                "key": self.make_key(params),
+                "objective_version": self.objective_version,
+                "parameters": json.dumps(canonical_parameters(params), sort_keys=True),
+                "objective": json.dumps([_canonical_value(value) for value in objective]),
+            }
+            for params, objective in results
+        ]
+        statement = insert(EvaluationCacheTable).on_conflict_do_nothing(index_elements=["key"])
+        with self.create_session() as session:
+            try:
+                session.execute(statement, rows)
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+    def close(self) -> None:
+        """Closes the connections to the cache file.
+
+        Returns:
+            None
+        """
+        self.engine.dispose()
@@ -14,7 +14,7 @@ class Hp(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_param(self, trial_id: int, param_name: str, param_value: Any, param_type: str) -> None:
         """Set the specified parameter information for an any trial.
 
@@ -36,7 +36,7 @@ class Hp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_params(self, trial_id: int, params: list[dict[str, Any]]) -> None:
         with self.create_session() as session:
             try:
@@ -52,7 +52,7 @@ class Hp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_params(self, trial_id: Any) -> list[HpTable] | None:
         """Obtain the set parameter information for any given trial.
 
@@ -84,7 +84,31 @@ class Hp(Abstract):
 
         return {p.param_name: p.param_value for p in params}
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_params(self, trial_ids: list[int]) -> dict[int, list[HpTable]]:
+        """Obtain the parameters of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, list[HpTable]]: Parameters of each trial that has any.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(HpTable)
+                .filter(HpTable.trial_id.in_(trial_ids))
+                .order_by(HpTable.trial_id, HpTable.param_id)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        params: dict[int, list[HpTable]] = {}
+        for d in data:
+            params.setdefault(d.trial_id, []).append(d)
+        return params
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_num_params(self) -> int:
         """Get number of generated parameters.
 
@@ -95,11 +119,11 @@ class Hp(Abstract):
             int: Number of generated parameters.
         """
         with self.create_session() as session:
-            hp = session.query(HpTable).with_for_update(read=True).all()
+            num_params = session.query(HpTable).with_for_update(read=True).count()
 
-        return len(hp)
+        return num_params
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -117,7 +141,7 @@ class Hp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_params(self, trial_id: int) -> None:
         """
 
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from aiaccel.storage.abstract import Abstract
+from aiaccel.storage.model import IntermediateTable
+from aiaccel.util import retry
+
+
+def _to_float(value: float | None) -> float:
+    # SQLite stores NaN as NULL.
+    return math.nan if value is None else value
+
+
+class Intermediate(Abstract):
+    def __init__(self, file_name: Path) -> None:
+        super().__init__(file_name)
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def set_any_trial_intermediate(self, trial_id: int, step: int, value: float) -> None:
+        """Set an intermediate value of any trial at a step.
+
+        Args:
+            trial_id (int): Any trial id
+            step (int): The step, such as an epoch.
+            value (float): The intermediate objective value.
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                data = (
+                    session.query(IntermediateTable)
+                    .filter(IntermediateTable.trial_id == trial_id, IntermediateTable.step == step)
+                    .with_for_update(read=True)
+                    .one_or_none()
+                )
+                if data is None:
+                    session.add(IntermediateTable(trial_id=trial_id, step=step, value=value))
+                else:
+                    data.value = value
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_any_trial_intermediates(self, trial_id: int) -> dict[int, float]:
+        """Get the intermediate values of any trial.
+
+        Args:
+            trial_id (int): Any trial id
+
+        Returns:
+            dict[int, float]: The intermediate values by step, in ascending
+            order of step.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(IntermediateTable)
+                .filter(IntermediateTable.trial_id == trial_id)
+                .order_by(IntermediateTable.step)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return {d.step: _to_float(d.value) for d in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_intermediates_at_step(self, step: int) -> dict[int, float]:
+        """Get the intermediate values of all trials at a step.
+
+        Only the rows of the step are read, through the index on the step.
+
+        Args:
+            step (int): The step.
+
+        Returns:
+            dict[int, float]: The intermediate values by trial id.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(IntermediateTable)
+                .filter(IntermediateTable.step == step)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return {d.trial_id: _to_float(d.value) for d in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def all_delete(self) -> None:
+        """Clear table
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                session.query(IntermediateTable).with_for_update(read=True).delete()
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def delete_any_trial_intermediate(self, trial_id: int) -> None:
+        """Delete the intermediate values of any trial.
+
+        Args:
+            trial_id (int): Any trial id
+
+        Returns:
+            None
+        """
+        with self.create_session() as session:
+            try:
+                session.query(IntermediateTable).filter(IntermediateTable.trial_id == trial_id).delete()
+                session.commit()
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise e
@@ -14,7 +14,7 @@ class JobState(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_jobstate(self, trial_id: int, state: str) -> None:
         """Set the specified jobstate to the specified trial.
 
@@ -43,7 +43,7 @@ class JobState(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_jobstates(self, states: Any) -> None:
         """Set the specified jobstate to the specified trial.
 
@@ -70,7 +70,7 @@ class JobState(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_jobstate(self, trial_id: int) -> str | None:
         """Get the job status of any trial.
 
@@ -92,7 +92,27 @@ class JobState(Abstract):
             return None
         return data.state
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_jobstate(self, trial_ids: list[int]) -> dict[int, str | None]:
+        """Get the job status of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, str | None]: The jobstate of each trial that has one.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(JobStateTable)
+                .filter(JobStateTable.trial_id.in_(trial_ids))
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return {d.trial_id: d.state for d in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_all_trial_jobstate(self) -> list[Any]:
         """Get the job status of all trials.
 
@@ -111,7 +131,7 @@ class JobState(Abstract):
         jobstates = [{"trial_id": d.trial_id, "jobstate": d.state} for d in data]
         return jobstates
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_jobstate(self, trial_id: int) -> None:
         """Delete the jobstate of the specified trial.
 
@@ -129,7 +149,7 @@ class JobState(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def is_failure(self, trial_id: int) -> bool:
         """Whether the jobstate of the specified trial is Failuer or not.
 
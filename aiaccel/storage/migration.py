@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import pickle
+from typing import Any
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from aiaccel.storage.model import SCHEMA_VERSION, Base, typed_value_columns
+
+# The schema before versioning (user_version 0) stored parameters and
+# objectives as pickles in these columns.
+_LEGACY_COLUMNS = {"trial_params": "param_value", "result": "objective"}
+
+# Recomputes the best_value table from the result table. Ties are resolved
+# to the smallest trial id.
+REBUILD_BEST_VALUE_SQL = [
+    'DELETE FROM "best_value"',
+    'INSERT INTO "best_value" (objective_index, num_trials, num_invalid, min_value, max_value) '
+    "SELECT objective_index, COUNT(*), SUM(value_type NOT IN ('int', 'float')), "
+    "MIN(COALESCE(value_int, value_float)), MAX(COALESCE(value_int, value_float)) "
+    'FROM "result" WHERE NOT pruned GROUP BY objective_index',
+    'UPDATE "best_value" SET '
+    'min_trial_id = (SELECT MIN(trial_id) FROM "result" AS r WHERE r.objective_index = best_value.objective_index '
+    "AND NOT r.pruned AND COALESCE(r.value_int, r.value_float) = best_value.min_value), "
+    'max_trial_id = (SELECT MIN(trial_id) FROM "result" AS r WHERE r.objective_index = best_value.objective_index '
+    "AND NOT r.pruned AND COALESCE(r.value_int, r.value_float) = best_value.max_value)",
+]
+
+
+def get_schema_version(cursor: Any) -> int:
+    """Returns the schema version recorded in the database file.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor of the database.
+
+    Returns:
+        int: The schema version. 0 for a new or unversioned file.
+    """
+    return int(cursor.execute("PRAGMA user_version").fetchone()[0])
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Creates the tables and indexes, and migrates an existing database file
+    to the current schema in place.
+
+    The upgrade runs in one exclusive transaction, so concurrent processes
+    opening the same file see either the old or the fully upgraded schema.
+
+    Args:
+        engine (Engine): An engine to the storage file.
+
+    Returns:
+        None
+    """
+    raw = engine.raw_connection()
+    dbapi_connection = raw.driver_connection
+    isolation_level = dbapi_connection.isolation_level
+    dbapi_connection.isolation_level = None
+    try:
+        cursor = dbapi_connection.cursor()
+        if get_schema_version(cursor) == SCHEMA_VERSION:
+            return
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(cursor)
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"The storage file has schema version {version}, which is newer than {SCHEMA_VERSION}."
+                )
+            if version < SCHEMA_VERSION:
+                legacy_tables = [name for name in _LEGACY_COLUMNS if _is_legacy_table(cursor, name)]
+                for name in legacy_tables:
+                    cursor.execute(f'ALTER TABLE "{name}" RENAME TO "{name}_v1"')
+                _create_all(cursor, engine)
+                if "trial_params" in legacy_tables:
+                    _migrate_trial_params(cursor)
+                if "result" in legacy_tables:
+                    _migrate_result(cursor)
+                if not _has_column(cursor, "result", "pruned"):
+                    cursor.execute('ALTER TABLE "result" ADD COLUMN pruned BOOLEAN NOT NULL DEFAULT 0')
+                if version < 6:
+                    cursor.execute(
+                        'UPDATE "result" SET pruned = 1 WHERE trial_id IN '
+                        "(SELECT trial_id FROM \"job_status\" WHERE state = 'pruned')"
+                    )
+                    for sql in REBUILD_BEST_VALUE_SQL:
+                        cursor.execute(sql)
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        dbapi_connection.isolation_level = isolation_level
+        raw.close()
+
+
+def _has_column(cursor: Any, table_name: str, column_name: str) -> bool:
+    return column_name in [row[1] for row in cursor.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+
+
+def _is_legacy_table(cursor: Any, name: str) -> bool:
+    return _has_column(cursor, name, _LEGACY_COLUMNS[name])
+
+
+def _create_all(cursor: Any, engine: Engine) -> None:
+    for table in Base.metadata.sorted_tables:
+        cursor.execute(str(CreateTable(table, if_not_exists=True).compile(dialect=engine.dialect)))
+        for index in table.indexes:
+            cursor.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect)))
+
+
+def _unpickle(data: bytes | None) -> Any:
+    return None if data is None else pickle.loads(data)
+
+
+def _migrate_trial_params(cursor: Any) -> None:
+    rows = cursor.execute(
+        'SELECT param_id, trial_id, param_name, param_value, param_type FROM "trial_params_v1"'
+    ).fetchall()
+    new_rows = []
+    for param_id, trial_id, param_name, param_value, param_type in rows:
+        columns = typed_value_columns(_unpickle(param_value))
+        new_rows.append(
+            (
+                param_id,
+                trial_id,
+                param_name,
+                param_type,
+                columns["value_type"],
+                columns["value_int"],
+                columns["value_float"],
+                columns["value_str"],
+            )
+        )
+    cursor.executemany(
+        'INSERT INTO "trial_params" (param_id, trial_id, param_name, param_type, '
+        "value_type, value_int, value_float, value_str) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        new_rows,
+    )
+    cursor.execute('DROP TABLE "trial_params_v1"')
+
+
+def _migrate_result(cursor: Any) -> None:
+    rows = cursor.execute('SELECT trial_id, data_type, objective FROM "result_v1"').fetchall()
+    new_rows = []
+    for trial_id, data_type, objective in rows:
+        value = _unpickle(objective)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for objective_index, v in enumerate(values):
+            columns = typed_value_columns(v)
+            new_rows.append(
+                (
+                    trial_id,
+                    objective_index,
+                    data_type,
+                    columns["value_type"],
+                    columns["value_int"],
+                    columns["value_float"],
+                    columns["value_str"],
+                )
+            )
+    cursor.executemany(
+        'INSERT INTO "result" (trial_id, objective_index, data_type, '
+        "value_type, value_int, value_float, value_str) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        new_rows,
+    )
+    cursor.execute('DROP TABLE "result_v1"')
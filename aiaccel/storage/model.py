@@ -1,16 +1,82 @@
+from __future__ import annotations
+
+import numbers
+from typing import Any
+
 from sqlalchemy.ext.declarative import DeclarativeMeta
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.schema import Column
-from sqlalchemy.types import Integer, PickleType, String, Text
+from sqlalchemy.schema import Column, Index
+from sqlalchemy.types import Boolean, Float, Integer, LargeBinary, PickleType, String, Text
 
 Base: DeclarativeMeta = declarative_base()
 
+# Version of the schema below. It is stored in the SQLite user_version of the
+# database file and checked by aiaccel.storage.migration.
+SCHEMA_VERSION = 6
+
+
+def typed_value_columns(value: Any) -> dict[str, Any]:
+    """Returns the column values of TypedValueMixin that represent a value.
+
+    Args:
+        value (Any): None, an integer, a real number or a string.
+
+    Returns:
+        dict[str, Any]: value_type, value_int, value_float and value_str.
+
+    Raises:
+        TypeError: Causes when the value is not one of the supported types.
+    """
+    columns: dict[str, Any] = {"value_type": "none", "value_int": None, "value_float": None, "value_str": None}
+    if value is None:
+        pass
+    elif isinstance(value, numbers.Integral):
+        columns["value_type"] = "int"
+        columns["value_int"] = int(value)
+    elif isinstance(value, numbers.Real):
+        columns["value_type"] = "float"
+        columns["value_float"] = float(value)
+    elif isinstance(value, str):
+        columns["value_type"] = "str"
+        columns["value_str"] = value
+    else:
+        raise TypeError(f"Unsupported value type: {type(value)}")
+    return columns
+
+
+class TypedValueMixin:
+    """Stores a scalar value in a native INTEGER, REAL or TEXT column.
+
+    SQLite stores NaN as NULL, so a NULL value_float of type 'float' is read
+    back as NaN.
+    """
+
+    value_type = Column(String(length=8), nullable=False, default="none")
+    value_int = Column(Integer, nullable=True)
+    value_float = Column(Float, nullable=True)
+    value_str = Column(Text, nullable=True)
+
+    @property
+    def value(self) -> Any:
+        if self.value_type == "int":
+            return self.value_int
+        if self.value_type == "float":
+            return float("nan") if self.value_float is None else self.value_float
+        if self.value_type == "str":
+            return self.value_str
+        return None
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        for key, column_value in typed_value_columns(value).items():
+            setattr(self, key, column_value)
+
 
 # models
 class TrialTable(Base):
     __tablename__ = "Trial"
     trial_id = Column(Integer, primary_key=True, nullable=False)
-    state = Column(Text, nullable=True)
+    state = Column(Text, nullable=True, index=True)
 
 
 class ErrorTable(Base):
@@ -27,20 +93,66 @@ class TimestampTable(Base):
     end_time = Column(String, nullable=True)
 
 
-class HpTable(Base):
+class HpTable(TypedValueMixin, Base):
     __tablename__ = "trial_params"
     param_id = Column(Integer, primary_key=True)
-    trial_id = Column(Integer, nullable=False)
+    trial_id = Column(Integer, nullable=False, index=True)
     param_name = Column(String(length=512), nullable=True)
-    param_value = Column(PickleType, nullable=True)
     param_type = Column(String(length=512), nullable=True)
 
+    @property
+    def param_value(self) -> Any:
+        return self.value
+
+    @param_value.setter
+    def param_value(self, value: Any) -> None:
+        self.value = value
+
+
+class ResultTable(TypedValueMixin, Base):
+    """One row per objective of a trial.
+
+    data_type is the type of the objective as it was set (a list, or a scalar
+    for a single objective) so that it is returned in the same shape. pruned
+    is set for the last intermediate value of a pruned trial, which is not a
+    result of the full budget and is left out of the best values.
+    """
 
-class ResultTable(Base):
     __tablename__ = "result"
     trial_id = Column(Integer, primary_key=True, nullable=False)
+    objective_index = Column(Integer, primary_key=True, nullable=False, default=0)
     data_type = Column(String(length=128), nullable=True)
-    objective = Column(PickleType, nullable=True)
+    pruned = Column(Boolean, nullable=False, default=False, server_default="0")
+
+
+class BestValueTable(Base):
+    """Running minimum and maximum of one objective over all results.
+
+    It is updated in the same transaction as the result table. num_trials is
+    the number of trials with the objective, and num_invalid the number of
+    them whose value is not a number. NaN values and the results of pruned
+    trials are ignored.
+    """
+
+    __tablename__ = "best_value"
+    objective_index = Column(Integer, primary_key=True, nullable=False)
+    num_trials = Column(Integer, nullable=False, default=0)
+    num_invalid = Column(Integer, nullable=False, default=0)
+    min_value = Column(Float, nullable=True)
+    min_trial_id = Column(Integer, nullable=True)
+    max_value = Column(Float, nullable=True)
+    max_trial_id = Column(Integer, nullable=True)
+
+
+class IntermediateTable(Base):
+    """Intermediate objective values reported by a running trial, one row
+    per step.
+    """
+
+    __tablename__ = "intermediate"
+    trial_id = Column(Integer, primary_key=True, nullable=False)
+    step = Column(Integer, primary_key=True, nullable=False, index=True)
+    value = Column(Float, nullable=True)
 
 
 class ReturnCodeTable(Base):
@@ -57,8 +169,28 @@ class JobStateTable(Base):
 
 class VariableTable(Base):
     __tablename__ = "variable"
+    __table_args__ = (Index("ix_variable_trial_id_process_name_label", "trial_id", "process_name", "label"),)
     data_id = Column(Integer, primary_key=True)
     trial_id = Column(Integer, nullable=False)
     process_name = Column(String(length=128), nullable=False)
     label = Column(String(length=128), nullable=False)
     value = Column(PickleType, nullable=False)
+
+
+class CheckpointTable(Base):
+    """Serialized module state, as a full snapshot or as a delta from the
+    checkpoint of base_trial_id.
+    """
+
+    __tablename__ = "checkpoint"
+    __table_args__ = (
+        Index("ix_checkpoint_process_name_label_trial_id", "process_name", "label", "trial_id", unique=True),
+    )
+    checkpoint_id = Column(Integer, primary_key=True)
+    trial_id = Column(Integer, nullable=False)
+    process_name = Column(String(length=128), nullable=False)
+    label = Column(String(length=128), nullable=False)
+    kind = Column(String(length=16), nullable=False)
+    base_trial_id = Column(Integer, nullable=True)
+    serializer = Column(String(length=16), nullable=False)
+    data = Column(LargeBinary, nullable=False)
@@ -4,46 +4,150 @@ from pathlib import Path
 from typing import Any
 
 import numpy as np
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
-from aiaccel.storage import Abstract, ResultTable
+from aiaccel.storage import Abstract, BestValueTable, ResultTable
+from aiaccel.storage.migration import REBUILD_BEST_VALUE_SQL
 from aiaccel.util import retry
 
+_SEQUENCE_TYPES = (list, tuple, np.ndarray)
+_SEQUENCE_DATA_TYPES = {str(t) for t in _SEQUENCE_TYPES}
+
+
+def _to_objective(rows: list[ResultTable]) -> Any:
+    """Returns the objective of one trial in the shape it was set.
+
+    Args:
+        rows (list[ResultTable]): The rows of a trial ordered by objective_index.
+
+    Returns:
+        Any: A list of objective values, or a single value.
+    """
+    values = [row.value for row in rows]
+    if rows[0].data_type in _SEQUENCE_DATA_TYPES:
+        return values
+    return values[0]
+
+
+def best_trajectory(objectives: list[Any], goals: list[str]) -> np.ndarray:
+    """Returns the best-so-far values of each goal in the order of the
+    objectives. NaN values do not update the best value.
+
+    Args:
+        objectives (list[Any]): Objectives of the trials in trial id order.
+        goals (list[str]): minimize | maximize for each objective.
+
+    Returns:
+        np.ndarray: An array of shape (len(objectives), len(goals)).
+
+    Raises:
+        ValueError: Causes when a goal is invalid.
+    """
+    values = np.array(objectives, dtype=float).reshape(len(objectives), len(goals))
+    trajectory = np.empty_like(values)
+    for i, goal in enumerate(goals):
+        if goal.lower() == "maximize":
+            trajectory[:, i] = np.fmax.accumulate(values[:, i])
+        elif goal.lower() == "minimize":
+            trajectory[:, i] = np.fmin.accumulate(values[:, i])
+        else:
+            raise ValueError("Invalid goal value.")
+    return trajectory
+
+
+def _numeric_value(row: ResultTable) -> float | None:
+    # None for a value that is not a number or NaN.
+    if row.value_type == "int":
+        return float(row.value_int)
+    if row.value_type == "float":
+        return row.value_float
+    return None
+
+
+def _get_best_value(session: Session, objective_index: int) -> BestValueTable:
+    best = session.get(BestValueTable, objective_index, populate_existing=True)
+    if best is None:
+        best = BestValueTable(objective_index=objective_index, num_trials=0, num_invalid=0)
+        session.add(best)
+    return best
+
+
+def _add_to_best_values(session: Session, rows: list[ResultTable]) -> None:
+    for row in rows:
+        if row.pruned:
+            continue
+        best = _get_best_value(session, row.objective_index)
+        best.num_trials += 1
+        if row.value_type not in ("int", "float"):
+            best.num_invalid += 1
+        value = _numeric_value(row)
+        if value is None:
+            continue
+        if best.min_value is None or (value, row.trial_id) < (best.min_value, best.min_trial_id):
+            best.min_value, best.min_trial_id = value, row.trial_id
+        if best.max_value is None or (value, -row.trial_id) > (best.max_value, -best.max_trial_id):
+            best.max_value, best.max_trial_id = value, row.trial_id
+
+
+def _remove_from_best_values(session: Session, rows: list[ResultTable]) -> None:
+    rows = [row for row in rows if not row.pruned]
+    bests = [_get_best_value(session, row.objective_index) for row in rows]
+    if any(row.trial_id in (best.min_trial_id, best.max_trial_id) for row, best in zip(rows, bests)):
+        # The next best value is unknown, so the table is recomputed.
+        session.flush()
+        for sql in REBUILD_BEST_VALUE_SQL:
+            session.execute(text(sql))
+        session.expire_all()
+        return
+    for row, best in zip(rows, bests):
+        best.num_trials -= 1
+        if row.value_type not in ("int", "float"):
+            best.num_invalid -= 1
+        if best.num_trials <= 0:
+            session.delete(best)
+
 
 class Result(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
-    def set_any_trial_objective(self, trial_id: int, objective: Any) -> None:
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def set_any_trial_objective(self, trial_id: int, objective: Any, pruned: bool = False) -> None:
         """Set any trial result value.
 
         Args:
             trial_id (int): Any trial id
-            objective(Any): ready, running, finished
+            objective(Any): A list of objective values, or a single value.
+            pruned (bool, optional): Whether the objective is the last
+                intermediate value of a pruned trial. Such a result is
+                returned as the objective of the trial, but is left out of
+                the best values. Defaults to False.
 
         Returns:
             None
         """
+        values = list(objective) if isinstance(objective, _SEQUENCE_TYPES) else [objective]
+        data_type = str(type(objective))
         with self.create_session() as session:
             try:
-                data = (
-                    session.query(ResultTable)
-                    .filter(ResultTable.trial_id == trial_id)
-                    .with_for_update(read=True)
-                    .one_or_none()
-                )
-                if data is None:
-                    new_row = ResultTable(trial_id=trial_id, data_type=str(type(objective)), objective=objective)
-                    session.add(new_row)
-                else:
-                    data.objective = objective
+                old_rows = session.query(ResultTable).filter(ResultTable.trial_id == trial_id).all()
+                if len(old_rows) > 0:
+                    session.query(ResultTable).filter(ResultTable.trial_id == trial_id).delete()
+                    _remove_from_best_values(session, old_rows)
+                rows = [
+                    ResultTable(trial_id=trial_id, objective_index=i, data_type=data_type, pruned=pruned, value=value)
+                    for i, value in enumerate(values)
+                ]
+                session.add_all(rows)
+                _add_to_best_values(session, rows)
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_objective(self, trial_id: int) -> list[int | float | str] | None:
         """Obtain the results of an arbitrary trial.
 
@@ -57,16 +161,41 @@ class Result(Abstract):
             data = (
                 session.query(ResultTable)
                 .filter(ResultTable.trial_id == trial_id)
+                .order_by(ResultTable.objective_index)
                 .with_for_update(read=True)
-                .one_or_none()
+                .all()
             )
 
-        if data is None:
+        if len(data) == 0:
             return None
 
-        return data.objective
+        return _to_objective(data)
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_objective(self, trial_ids: list[int]) -> dict[int, Any]:
+        """Obtain the objectives of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, Any]: The objective of each trial that has a result.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(ResultTable)
+                .filter(ResultTable.trial_id.in_(trial_ids))
+                .order_by(ResultTable.trial_id, ResultTable.objective_index)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        rows: dict[int, list[ResultTable]] = {}
+        for d in data:
+            rows.setdefault(d.trial_id, []).append(d)
+        return {trial_id: _to_objective(rows[trial_id]) for trial_id in rows.keys()}
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_all_result(self) -> dict[int, list[Any]]:
         """Get all results
 
@@ -77,10 +206,17 @@ class Result(Abstract):
             dict[int, list[Any]]: trial_id and result values
         """
         with self.create_session() as session:
-            data = session.query(ResultTable).with_for_update(read=True)
+            data = (
+                session.query(ResultTable)
+                .order_by(ResultTable.trial_id, ResultTable.objective_index)
+                .with_for_update(read=True)
+                .all()
+            )
 
-        return {d.trial_id: d.objective for d in data}
-        # return data
+        rows: dict[int, list[ResultTable]] = {}
+        for d in data:
+            rows.setdefault(d.trial_id, []).append(d)
+        return {trial_id: _to_objective(rows[trial_id]) for trial_id in rows.keys()}
 
     def get_objectives(self) -> list[Any]:
         """Get all results in list.
@@ -95,29 +231,84 @@ class Result(Abstract):
 
         return [data[trial_id] for trial_id in data.keys()]
 
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_best_values(self) -> dict[int, BestValueTable]:
+        """Get the running minimum and maximum of each objective.
+
+        Args:
+            None
+
+        Returns:
+            dict[int, BestValueTable]: objective_index and its best values
+        """
+        with self.create_session() as session:
+            data = session.query(BestValueTable).order_by(BestValueTable.objective_index).all()
+
+        return {d.objective_index: d for d in data}
+
     def get_bests(self, goals: list[str]) -> list[Any]:
-        """Obtains the sorted result.
+        """Obtains the best value of each goal without scanning the results.
 
         Args:
             goals (list[str]): goals
 
         Returns:
-            list: result values
+            list: The best values. inf (minimize) or -inf (maximize) for an
+            objective without numeric values.
         """
-        objectives = np.array(self.get_objectives())
-        bests = np.zeros((len(goals), len(objectives[0])))
-
-        for i in range(len(goals)):
-            if goals[i].lower() == "maximize":
-                bests[i, :] = np.max(objectives[:, i], axis=0)
-            elif goals[i].lower() == "minimize":
-                bests[i, :] = np.min(objectives[:, i], axis=0)
+        best_values = self.get_best_values()
+        bests = []
+        for i, goal in enumerate(goals):
+            best = best_values.get(i)
+            if goal.lower() == "maximize":
+                bests.append(float("-inf") if best is None or best.max_value is None else best.max_value)
+            elif goal.lower() == "minimize":
+                bests.append(float("inf") if best is None or best.min_value is None else best.min_value)
             else:
                 raise ValueError("Invalid goal value.")
+        return bests
 
-        return [row[0] for row in bests.tolist()]
+    def get_best_trajectory(self, goals: list[str]) -> np.ndarray:
+        """Obtains the best-so-far value of each goal for every trial with a
+        result, in trial id order, e.g. for plotting. The results of pruned
+        trials do not update the best value.
+
+        Args:
+            goals (list[str]): goals
+
+        Returns:
+            np.ndarray: An array of shape (number of results, len(goals)).
+        """
+        data = self.get_all_result()
+        pruned_trial_ids = set(self.get_pruned_trial_ids())
+        objectives = [
+            [float("nan")] * len(goals) if trial_id in pruned_trial_ids else data[trial_id] for trial_id in data.keys()
+        ]
+        return best_trajectory(objectives, goals)
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_pruned_trial_ids(self) -> list[int]:
+        """Obtains the ids of the trials whose result is the last intermediate
+        value of a pruned trial.
+
+        Args:
+            None
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+        Returns:
+            list[int]: Sorted trial ids.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(ResultTable.trial_id)
+                .filter(ResultTable.objective_index == 0, ResultTable.pruned.is_(True))
+                .order_by(ResultTable.trial_id)
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return [d.trial_id for d in data]
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_result_trial_id_list(self) -> list[Any] | None:
         """Obtains the sorted result.
 
@@ -128,14 +319,20 @@ class Result(Abstract):
             list | None: result values
         """
         with self.create_session() as session:
-            data = session.query(ResultTable).with_for_update(read=True).all()
+            data = (
+                session.query(ResultTable.trial_id)
+                .filter(ResultTable.objective_index == 0)
+                .order_by(ResultTable.trial_id)
+                .with_for_update(read=True)
+                .all()
+            )
 
         if data is None or len(data) == 0:
             return None
 
         return [d.trial_id for d in data]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_objective_and_best_value(self, trial_id: int, goals: list[str]) -> tuple[list[Any], list[Any]]:
         """Obtain the results of an arbitrary trial.
 
@@ -154,7 +351,7 @@ class Result(Abstract):
 
         return objectives, best_values
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -167,12 +364,13 @@ class Result(Abstract):
         with self.create_session() as session:
             try:
                 session.query(ResultTable).with_for_update(read=True).delete()
+                session.query(BestValueTable).delete()
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_objective(self, trial_id: int) -> None:
         """_summary_
 
@@ -184,7 +382,9 @@ class Result(Abstract):
         """
         with self.create_session() as session:
             try:
+                old_rows = session.query(ResultTable).filter(ResultTable.trial_id == trial_id).all()
                 session.query(ResultTable).filter(ResultTable.trial_id == trial_id).delete()
+                _remove_from_best_values(session, old_rows)
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
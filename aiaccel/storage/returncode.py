@@ -12,7 +12,7 @@ class ReturnCode(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_returncode(self, trial_id: int, returncode: int) -> None:
         """Set any returncode for any trial.
 
@@ -41,7 +41,7 @@ class ReturnCode(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_returncode(self, trial_id: int) -> list[int | float | str] | None:
         """Obtain the results of an arbitrary trial.
 
@@ -64,7 +64,7 @@ class ReturnCode(Abstract):
 
         return data.returncode
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_all_trial_returncode(self) -> list[int | float | str] | None:
         """Obtain the results of all trials.
 
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import copy
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Generator, Iterable, Iterator
 
+from aiaccel.storage.abstract import acquire_engine, release_engine
+from aiaccel.storage.backend import create_backend
+from aiaccel.storage.checkpoint import Checkpoint
 from aiaccel.storage.error import Error
 from aiaccel.storage.hp import Hp
+from aiaccel.storage.intermediate import Intermediate
 from aiaccel.storage.jobstate import JobState
+from aiaccel.storage.model import HpTable
 from aiaccel.storage.result import Result
 from aiaccel.storage.returncode import ReturnCode
 from aiaccel.storage.timestamp import TimeStamp
@@ -13,11 +21,70 @@ from aiaccel.storage.trial import Trial
 from aiaccel.storage.variable import Serializer
 
 
-class Storage:
-    """Database"""
+def _param_to_dict(d: HpTable) -> dict[str, Any]:
+    dtype = d.param_type  # str
+    value = d.param_value
+
+    if dtype.lower() == "float":
+        value = float(d.param_value)
+    elif dtype.lower() == "int":
+        value = int(float(d.param_value))
+    elif dtype.lower() == "categorical":
+        value == str(d.param_value)
+    else:  # pragma: no cover
+        pass  # not reached
+
+    return {"parameter_name": d.param_name, "type": dtype, "value": value}
+
 
-    def __init__(self, _db_path: Path | str) -> None:
+class Storage:
+    """Database
+
+    All Storage objects for the same database file in a process share one
+    engine and connection pool.
+
+    Args:
+        _db_path (Path | str): Path to the database file.
+        wal_mode (bool, optional): Switch the database file to write-ahead
+            logging with synchronous=NORMAL. The journal mode persists in the
+            file, so other processes opening it use WAL as well. Defaults to
+            False.
+        busy_timeout (float | None, optional): Seconds to wait for a lock
+            held by another connection. Defaults to None (60 seconds).
+        backend (str | None, optional): Where the data is kept: 'sqlite' (the
+            database file), 'memory' (an in-memory database of this process)
+            or 'journal' (in memory, with an append-only journal file that is
+            replayed on open). Defaults to None, which uses the backend the
+            storage is already open with in this process, or 'sqlite'.
+        flush_interval (float | None, optional): Seconds between writes of an
+            in-memory database to the database file after commits. It is
+            always written when the storage is flushed or closed. Defaults
+            to None (written only then).
+        read_only (bool, optional): Open the storage only to read it while
+            another process owns it, such as a running study. An in-memory
+            backend then never writes the database file or the journal.
+            Defaults to False.
+
+    Raises:
+        ValueError: Causes when the storage is already open in this process
+            with another backend.
+    """
+
+    def __init__(
+        self,
+        _db_path: Path | str,
+        wal_mode: bool = False,
+        busy_timeout: float | None = None,
+        backend: str | None = None,
+        flush_interval: float | None = None,
+        read_only: bool = False,
+    ) -> None:
         self.db_path = Path(_db_path)
+        self._finalizer: weakref.finalize | None = None
+        if backend is not None:
+            # Opens the engine with the backend before the accessors share it.
+            shared = acquire_engine(self.db_path, create_backend(backend, flush_interval, read_only))
+            self._finalizer = weakref.finalize(self, release_engine, shared)
         self.trial = Trial(self.db_path)
         self.hp = Hp(self.db_path)
         self.result = Result(self.db_path)
@@ -26,6 +93,69 @@ class Storage:
         self.error = Error(self.db_path)
         self.timestamp = TimeStamp(self.db_path)
         self.variable = Serializer(self.db_path)
+        self.checkpoint = Checkpoint(self.db_path)
+        self.intermediate = Intermediate(self.db_path)
+        if wal_mode or busy_timeout is not None:
+            self.trial.configure(wal_mode=wal_mode, busy_timeout=busy_timeout)
+
+    def flush(self) -> None:
+        """Write an in-memory storage to the database file.
+
+        Does nothing if the data is kept in the database file.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.trial.flush()
+
+    def close(self) -> None:
+        """Release the shared engine held by every table accessor.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for table in (
+            self.trial,
+            self.hp,
+            self.result,
+            self.returncode,
+            self.jobstate,
+            self.error,
+            self.timestamp,
+            self.checkpoint,
+            self.intermediate,
+        ):
+            table.close()
+        self.variable.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """Group the writes made in the block into one atomic commit.
+
+        The unit of work covers every Storage object of the same database file
+        in the current thread, and nested blocks join the outermost one.
+
+        Example:
+            with storage.transaction():
+                storage.hp.set_any_trial_params(trial_id, params)
+                storage.trial.set_any_trial_state(trial_id, "ready")
+
+        Args:
+            None
+
+        Yields:
+            None
+        """
+        with self.trial.transaction():
+            yield
 
     def current_max_trial_number(self) -> int | None:
         """Get the current maximum number of trials.
@@ -162,101 +292,140 @@ class Storage:
         Returns:
             dict | None: Any trials information
         """
-
-        data = self.hp.get_any_trial_params(trial_id=trial_id)
-        if data is None:
+        content = self.get_trial_records([int(trial_id)])[int(trial_id)]
+        if len(content["parameters"]) == 0:
             return None
-
-        hp = []
-        for d in data:
-            param_name = d.param_name
-            dtype = d.param_type  # str
-            value = d.param_value
-
-            if dtype.lower() == "float":
-                value = float(d.param_value)
-            elif dtype.lower() == "int":
-                value = int(float(d.param_value))
-            elif dtype.lower() == "categorical":
-                value == str(d.param_value)
-            else:  # pragma: no cover
-                pass  # not reached
-
-            hp.append({"parameter_name": param_name, "type": dtype, "value": value})
-        result = self.result.get_any_trial_objective(trial_id=trial_id)
-        start_time = self.timestamp.get_any_trial_start_time(trial_id=trial_id)
-        end_time = self.timestamp.get_any_trial_end_time(trial_id=trial_id)
-        error = self.error.get_any_trial_error(trial_id=trial_id)
-
-        content: dict[str, str | int | float | list[Any]] = {}
         content["trial_id"] = trial_id
-        content["parameters"] = hp
-        content["result"] = result
-        content["start_time"] = start_time
-        content["end_time"] = end_time
-
-        if error is not None and len(error) > 0:
-            content["error"] = error
-
         return content
 
-    def get_best_trial(self, goals: list[str]) -> tuple[list[int] | None, list[float] | None]:
-        """Get best trial number and best value.
+    def get_trial_records(self, trial_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """Obtain information on several trials in dict with one query per
+        table.
 
         Args:
-            goals(list[str]): minimize | maximize
+            trial_ids (list[int]): Trial ids.
 
         Returns:
-            best(tuple): (trial_id, value)
+            dict[int, dict[str, Any]]: The information of each trial in the
+            format of get_hp_dict(). 'parameters' is empty for a trial without
+            parameters.
         """
+        params = self.hp.get_trials_params(trial_ids)
+        results = self.result.get_trials_objective(trial_ids)
+        timestamps = self.timestamp.get_trials_timestamp(trial_ids)
+        errors = self.error.get_trials_error(trial_ids)
+
+        records: dict[int, dict[str, Any]] = {}
+        for trial_id in trial_ids:
+            start_time, end_time = timestamps.get(trial_id, (None, None))
+            content: dict[str, Any] = {}
+            content["trial_id"] = trial_id
+            content["parameters"] = [_param_to_dict(d) for d in params.get(trial_id, [])]
+            content["result"] = results.get(trial_id)
+            content["start_time"] = start_time
+            content["end_time"] = end_time
+
+            error = errors.get(trial_id)
+            if error is not None and len(error) > 0:
+                content["error"] = error
+
+            records[trial_id] = content
+        return records
+
+    def get_trials(
+        self, trial_ids: Iterable[int] | None = None, state: str | None = None, batch_size: int = 500
+    ) -> Iterator[dict[str, Any]]:
+        """Iterate over the information of trials, fetching them in batches.
+
+        Each record has the keys of get_hp_dict() plus 'state' and
+        'jobstate'. Only trials that have a state are returned. Batches are
+        read separately, so trials written during the iteration may or may
+        not be included.
 
-        best_values = []
-        for i in range(len(goals)):
-            if goals[i].lower() == "maximize":
-                best_values.append(float("-inf"))
-            elif goals[i].lower() == "minimize":
-                best_values.append(float("inf"))
-            else:
-                return None, None
-
-        best_trial_id = 0
-        best_trial_ids = [0] * len(goals)
+        Args:
+            trial_ids (Iterable[int] | None, optional): Trial ids, or a range
+                of trial ids with step 1. Defaults to None (all trials).
+            state (str | None, optional): Only trials in this state. Defaults
+                to None (any state).
+            batch_size (int, optional): The number of trials fetched at once.
+                Defaults to 500.
+
+        Yields:
+            dict[str, Any]: The information of a trial. The trials are in
+            ascending order of trial id unless trial_ids is a list.
+        """
+        for batch in self._iter_trial_id_batches(trial_ids, state, batch_size):
+            records = self.get_trial_records(batch)
+            states = self.trial.get_trials_state(batch)
+            jobstates = self.jobstate.get_trials_jobstate(batch)
+            for trial_id in batch:
+                if trial_id not in states or (state is not None and states[trial_id] != state):
+                    continue
+                record = records[trial_id]
+                record["state"] = states[trial_id]
+                record["jobstate"] = jobstates.get(trial_id)
+                yield record
+
+    def _iter_trial_id_batches(
+        self, trial_ids: Iterable[int] | None, state: str | None, batch_size: int
+    ) -> Iterator[list[int]]:
+        if trial_ids is None or (isinstance(trial_ids, range) and trial_ids.step == 1):
+            start = stop = None
+            if isinstance(trial_ids, range):
+                start, stop = trial_ids.start - 1, trial_ids.stop
+            while batch := self.trial.get_trial_ids_after(start, batch_size, state=state, stop=stop):
+                yield batch
+                start = batch[-1]
+            return
 
-        results_d = self.result.get_all_result()
-        for trial_id in results_d.keys():
-            value = results_d[trial_id]
+        batch = []
+        for trial_id in trial_ids:
+            batch.append(int(trial_id))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
 
-            if isinstance(value, float):
-                values = [value]
-            else:
-                values = value
+    def get_best_trial(self, goals: list[str]) -> tuple[list[int] | None, list[float] | None]:
+        """Get best trial number and best value.
 
-            if len(values) != len(goals):
-                return None, None
+        The best values are maintained when results are written, so this does
+        not scan the results.
 
-            for i, val in enumerate(values):
-                try:
-                    float(val)
-                except (ValueError, TypeError):
-                    return None, None
+        Args:
+            goals(list[str]): minimize | maximize
 
-                best_value = best_values[i]
-                best_trial_id = best_trial_ids[i]
+        Returns:
+            best(tuple): (trial_id, value)
+        """
 
-                if goals[i].lower() == "maximize":
-                    if best_value < val:
-                        best_value = val
-                        best_trial_id = trial_id
+        if any(goal.lower() not in ("maximize", "minimize") for goal in goals):
+            return None, None
 
-                elif goals[i].lower() == "minimize":
-                    if best_value > val:
-                        best_value = val
-                        best_trial_id = trial_id
+        best_values = self.result.get_best_values()
+        if len(best_values) > 0:
+            # Every trial must have one numeric value per goal.
+            if sorted(best_values.keys()) != list(range(len(goals))):
+                return None, None
+            if len({best.num_trials for best in best_values.values()}) != 1:
+                return None, None
+            if any(best.num_invalid > 0 for best in best_values.values()):
+                return None, None
 
-                best_values[i] = best_value
-                best_trial_ids[i] = best_trial_id
+        best_trial_ids = []
+        best_values_ = []
+        for i, goal in enumerate(goals):
+            best = best_values.get(i)
+            if goal.lower() == "maximize":
+                trial_id, value = (None, None) if best is None else (best.max_trial_id, best.max_value)
+                best_values_.append(float("-inf") if value is None else value)
+            else:
+                trial_id, value = (None, None) if best is None else (best.min_trial_id, best.min_value)
+                best_values_.append(float("inf") if value is None else value)
+            best_trial_ids.append(0 if trial_id is None else trial_id)
 
-        return best_trial_ids, best_values
+        return best_trial_ids, best_values_
 
     def get_best_trial_dict(self, goals: list[str]) -> list[Any] | None:
         """Get best trial information in dict format.
@@ -271,11 +440,46 @@ class Storage:
         if best_trial_ids is None:
             return None
 
+        records = self.get_trial_records(list(set(best_trial_ids)))
         hps = []
         for trial_id in best_trial_ids:
-            hps.append(self.get_hp_dict(trial_id))
+            # A trial can be the best for several goals; each entry is a copy.
+            content = copy.deepcopy(records[trial_id])
+            hps.append(content if len(content["parameters"]) > 0 else None)
         return hps
 
+    def set_any_trial_result(
+        self,
+        trial_id: int,
+        objective: Any,
+        returncode: int | None = None,
+        start_time: str | None = None,
+        end_time: str | None = None,
+    ) -> None:
+        """Set the result of any trial in one commit.
+
+        Args:
+            trial_id (int): Any trial id
+            objective (Any): A list of objective values, or a single value.
+            returncode (int | None, optional): The return code of the trial.
+                Defaults to None (not set).
+            start_time (str | None, optional): The start time. Defaults to
+                None (not set).
+            end_time (str | None, optional): The end time. Defaults to None
+                (not set).
+
+        Returns:
+            None
+        """
+        with self.transaction():
+            self.result.set_any_trial_objective(trial_id, objective)
+            if returncode is not None:
+                self.returncode.set_any_trial_returncode(trial_id, returncode)
+            if start_time is not None:
+                self.timestamp.set_any_trial_start_time(trial_id, start_time)
+            if end_time is not None:
+                self.timestamp.set_any_trial_end_time(trial_id, end_time)
+
     def get_result_and_error(self, trial_id: int) -> tuple[Any, Any]:
         """Get results and errors for a given trial number.
 
@@ -315,7 +519,9 @@ class Storage:
         self.error.delete_any_trial_error(trial_id)
         self.jobstate.delete_any_trial_jobstate(trial_id)
         self.result.delete_any_trial_objective(trial_id)
+        self.intermediate.delete_any_trial_intermediate(trial_id)
         self.variable.delete_any_trial_variable(trial_id)
+        self.checkpoint.delete_any_trial_checkpoint(trial_id)
         self.timestamp.delete_any_trial_timestamp(trial_id)
         self.trial.delete_any_trial_state(trial_id)
         self.hp.delete_any_trial_params(trial_id)
@@ -335,5 +541,6 @@ class Storage:
         self.error.delete_any_trial_error(trial_id)
         self.jobstate.delete_any_trial_jobstate(trial_id)
         self.result.delete_any_trial_objective(trial_id)
+        self.intermediate.delete_any_trial_intermediate(trial_id)
         self.hp.delete_any_trial_params(trial_id)
         self.trial.delete_any_trial_state(trial_id)
@@ -13,7 +13,7 @@ class TimeStamp(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_start_time(self, trial_id: int, start_time: str) -> None:
         """Set the specified start time for the specified trial.
 
@@ -42,7 +42,7 @@ class TimeStamp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_end_time(self, trial_id: int, end_time: str) -> None:
         """Set the specified end time for the specified trial.
 
@@ -69,7 +69,7 @@ class TimeStamp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_start_time_and_end_time(self, trial_id: int, start_time: str, end_time: str) -> None:
         """Set the specified start time and end time for the specified trial.
 
@@ -100,7 +100,7 @@ class TimeStamp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_start_time(self, trial_id: int) -> str | None:
         """Obtains the start time of the specified trial.
 
@@ -125,7 +125,7 @@ class TimeStamp(Abstract):
 
         return data.start_time
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_end_time(self, trial_id: int) -> str | None:
         """Obtains the end time of the specified trial.
 
@@ -150,7 +150,28 @@ class TimeStamp(Abstract):
 
         return data.end_time
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_timestamp(self, trial_ids: list[int]) -> dict[int, tuple[str | None, str | None]]:
+        """Obtains the start and end times of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, tuple[str | None, str | None]]: (start_time, end_time) of
+            each trial that has a timestamp.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(TimestampTable)
+                .filter(TimestampTable.trial_id.in_(trial_ids))
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return {d.trial_id: (d.start_time or None, d.end_time or None) for d in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -168,7 +189,7 @@ class TimeStamp(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_timestamp(self, trial_id: Any) -> None:
         """Delete the specified trial.
 
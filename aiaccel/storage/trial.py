@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+from functools import partial
 from pathlib import Path
 from typing import Any, Literal
 
 from sqlalchemy.exc import SQLAlchemyError
 
 from aiaccel.storage import Abstract, TrialTable
+from aiaccel.storage.abstract import _engines_lock
+from aiaccel.storage.trial_index import TrialStateIndex
 from aiaccel.util import retry
 
 
@@ -13,7 +16,43 @@ class Trial(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @property
+    def state_index(self) -> TrialStateIndex | None:
+        """The in-memory index of trial states, or None if it is not enabled."""
+        return self._shared.state_index
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def enable_state_index(self) -> TrialStateIndex:
+        """Loads the trial states into an in-memory index shared by all Trial
+        accessors of the storage file in this process.
+
+        Once enabled, state queries are answered from the index, and the
+        index is updated whenever a state change is committed through a Trial
+        accessor. It must only be enabled in the process that makes all state
+        changes, such as the manager.
+
+        Args:
+            None
+
+        Returns:
+            TrialStateIndex: The index.
+        """
+        with _engines_lock:
+            if self._shared.state_index is None:
+                with self.create_session() as session:
+                    rows = session.query(TrialTable.trial_id, TrialTable.state).all()
+                self._shared.state_index = TrialStateIndex((trial_id, state) for trial_id, state in rows)
+            return self._shared.state_index
+
+    def _get_state_index(self) -> TrialStateIndex | None:
+        # Uncommitted changes of the current unit of work are not in the index
+        # yet, so the database is queried until they are committed.
+        index = self._shared.state_index
+        if index is None or self.session().has_pending_callbacks():
+            return None
+        return index
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_state(self, trial_id: int) -> Literal["ready", "running", "finished"] | None:
         """Get any trials state.
 
@@ -23,6 +62,9 @@ class Trial(Abstract):
         Returns:
             Literal['ready', 'running', 'finished'] | None: Trial state.
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_state(trial_id)  # type: ignore[return-value]
+
         with self.create_session() as session:
             trials = (
                 session.query(TrialTable)
@@ -36,7 +78,58 @@ class Trial(Abstract):
 
         return trials.state
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trials_state(self, trial_ids: list[int]) -> dict[int, str | None]:
+        """Get the states of several trials in one query.
+
+        Args:
+            trial_ids (list[int]): Trial ids.
+
+        Returns:
+            dict[int, str | None]: The state of each existing trial.
+        """
+        with self.create_session() as session:
+            data = (
+                session.query(TrialTable.trial_id, TrialTable.state)
+                .filter(TrialTable.trial_id.in_(trial_ids))
+                .with_for_update(read=True)
+                .all()
+            )
+
+        return {trial_id: state for trial_id, state in data}
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
+    def get_trial_ids_after(
+        self, trial_id: int | None, limit: int, state: str | None = None, stop: int | None = None
+    ) -> list[int]:
+        """Get the next trial ids in ascending order, for paging through the
+        trials without loading all of them.
+
+        Args:
+            trial_id (int | None): Only trial ids greater than this are
+                returned. None starts from the first trial.
+            limit (int): The maximum number of trial ids.
+            state (str | None, optional): Only trials in this state. Defaults
+                to None (any state).
+            stop (int | None, optional): Only trial ids less than this.
+                Defaults to None (no upper bound).
+
+        Returns:
+            list[int]: Trial ids.
+        """
+        with self.create_session() as session:
+            query = session.query(TrialTable.trial_id)
+            if trial_id is not None:
+                query = query.filter(TrialTable.trial_id > trial_id)
+            if stop is not None:
+                query = query.filter(TrialTable.trial_id < stop)
+            if state is not None:
+                query = query.filter(TrialTable.state == state)
+            data = query.order_by(TrialTable.trial_id).limit(limit).with_for_update(read=True).all()
+
+        return [d.trial_id for d in data]
+
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_state_list(self, state: Literal["ready", "running", "finished"]) -> list[int] | None:
         """Get any trials numbers.
 
@@ -47,6 +140,9 @@ class Trial(Abstract):
             list[int] | None: A list of trial ids. None if no trials match the
             specified state.
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_trial_ids(state) or None
+
         with self.create_session() as session:
             trials = session.query(TrialTable).filter(TrialTable.state == state).with_for_update(read=True).all()
 
@@ -55,7 +151,7 @@ class Trial(Abstract):
 
         return [d.trial_id for d in trials]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_state(self, trial_id: int, state: Literal["ready", "running", "finished"]) -> None:
         """Set any trials numbers.
 
@@ -79,12 +175,14 @@ class Trial(Abstract):
                     session.add(new_row)
                 else:
                     trials.state = state
+                if (index := self.state_index) is not None:
+                    session.on_commit(partial(index.update, trial_id, state))
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -97,12 +195,14 @@ class Trial(Abstract):
         with self.create_session() as session:
             try:
                 session.query(TrialTable).with_for_update(read=True).delete()
+                if (index := self.state_index) is not None:
+                    session.on_commit(index.clear)
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_state(self, trial_id: int) -> None:
         """Delete any trials numbers.
 
@@ -115,12 +215,14 @@ class Trial(Abstract):
         with self.create_session() as session:
             try:
                 session.query(TrialTable).filter(TrialTable.trial_id == trial_id).delete()
+                if (index := self.state_index) is not None:
+                    session.on_commit(partial(index.update, trial_id, None))
                 session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_ready(self) -> list[int]:
         """Get the trial id whose status is ready.
 
@@ -130,12 +232,15 @@ class Trial(Abstract):
         Returns:
             trial ids(list[int])
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_trial_ids("ready")
+
         with self.create_session() as session:
             trials = session.query(TrialTable).filter(TrialTable.state == "ready").with_for_update(read=True).all()
 
         return [trial.trial_id for trial in trials]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_running(self) -> list[int]:
         """Get the trial id whose status is running.
 
@@ -145,12 +250,15 @@ class Trial(Abstract):
         Returns:
             trial ids(list[int])
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_trial_ids("running")
+
         with self.create_session() as session:
             trials = session.query(TrialTable).filter(TrialTable.state == "running").with_for_update(read=True).all()
 
         return [trial.trial_id for trial in trials]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_finished(self) -> list[Any]:
         """Get the trial id whose status is finished.
 
@@ -160,12 +268,15 @@ class Trial(Abstract):
         Returns:
             trial ids(list[int])
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_trial_ids("finished")
+
         with self.create_session() as session:
             trials = session.query(TrialTable).filter(TrialTable.state == "finished").with_for_update(read=True).all()
 
         return [trial.trial_id for trial in trials]
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_num_running_ready_finished(self) -> tuple[int, int, int]:
         """Get num_of_ready, num_of_running, num_of_finished.
 
@@ -175,6 +286,9 @@ class Trial(Abstract):
         Returns:
             tuple(int, int, int): num_of_ready, num_of_running, num_of_finished
         """
+        if (index := self._get_state_index()) is not None:
+            return (index.count("ready"), index.count("running"), index.count("finished"))
+
         with self.create_session() as session:
             num_of_ready = (
                 session.query(TrialTable).filter(TrialTable.state == "ready").with_for_update(read=True).count()
@@ -187,7 +301,7 @@ class Trial(Abstract):
             )
         return (num_of_ready, num_of_running, num_of_finished)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_all_trial_id(self) -> list[int] | None:
         """Get all trial id.
 
@@ -197,6 +311,9 @@ class Trial(Abstract):
         Returns:
             list[int] | None: A list of trial ids.
         """
+        if (index := self._get_state_index()) is not None:
+            return index.get_all_trial_ids() or None
+
         with self.create_session() as session:
             trials = session.query(TrialTable).with_for_update(read=True).all()
 
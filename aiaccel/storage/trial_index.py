@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, Optional
+
+TrialStateListener = Callable[[int, Optional[str], Optional[str]], None]
+
+
+class TrialStateIndex:
+    """In-memory index of trial states of a storage file.
+
+    The index is updated by the Trial accessors after their changes are
+    committed, so in the process that owns the index it answers state
+    queries without accessing the database. Changes made by other processes
+    are not reflected.
+
+    Listeners are called with (trial_id, old_state, new_state) for every
+    committed transition. A state of None means that the trial does not
+    exist.
+
+    Args:
+        states (Iterable[tuple[int, str | None]]): Initial pairs of trial id
+            and state, typically read from the database.
+    """
+
+    def __init__(self, states: Iterable[tuple[int, str | None]] = ()) -> None:
+        self._lock = threading.Lock()
+        self._states: dict[int, str | None] = {}
+        self._trial_ids_by_state: dict[str | None, set[int]] = {}
+        self._listeners: list[TrialStateListener] = []
+        for trial_id, state in states:
+            self._set(trial_id, state)
+
+    def _set(self, trial_id: int, state: str | None) -> None:
+        if trial_id in self._states:
+            self._trial_ids_by_state[self._states[trial_id]].discard(trial_id)
+        self._states[trial_id] = state
+        self._trial_ids_by_state.setdefault(state, set()).add(trial_id)
+
+    def subscribe(self, listener: TrialStateListener) -> Callable[[], None]:
+        """Registers a listener of state transitions.
+
+        Args:
+            listener (TrialStateListener): A callable that receives trial_id,
+                old_state and new_state.
+
+        Returns:
+            Callable[[], None]: A function that unregisters the listener.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def update(self, trial_id: int, state: str | None) -> None:
+        """Sets the state of a trial and notifies the listeners if it changed.
+
+        Args:
+            trial_id (int): Any trial id.
+            state (str | None): The new state. None removes the trial.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            old_state = self._states.get(trial_id)
+            if old_state == state:
+                return
+            if state is None:
+                self._trial_ids_by_state[old_state].discard(trial_id)
+                del self._states[trial_id]
+            else:
+                self._set(trial_id, state)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(trial_id, old_state, state)
+
+    def clear(self) -> None:
+        """Removes all trials, notifying the listeners of each removal.
+
+        Returns:
+            None
+        """
+        for trial_id in self.get_all_trial_ids():
+            self.update(trial_id, None)
+
+    def get_state(self, trial_id: int) -> str | None:
+        """Returns the state of a trial, or None if it does not exist.
+
+        Args:
+            trial_id (int): Any trial id.
+
+        Returns:
+            str | None: The state of the trial.
+        """
+        with self._lock:
+            return self._states.get(trial_id)
+
+    def get_trial_ids(self, state: str | None) -> list[int]:
+        """Returns the sorted ids of the trials in a state.
+
+        Args:
+            state (str | None): A trial state.
+
+        Returns:
+            list[int]: Trial ids.
+        """
+        with self._lock:
+            return sorted(self._trial_ids_by_state.get(state, ()))
+
+    def count(self, state: str | None) -> int:
+        """Returns the number of trials in a state.
+
+        Args:
+            state (str | None): A trial state.
+
+        Returns:
+            int: The number of trials.
+        """
+        with self._lock:
+            return len(self._trial_ids_by_state.get(state, ()))
+
+    def get_all_trial_ids(self) -> list[int]:
+        """Returns the sorted ids of all trials.
+
+        Returns:
+            list[int]: Trial ids.
+        """
+        with self._lock:
+            return sorted(self._states)
@@ -13,7 +13,7 @@ class Variable(Abstract):
     def __init__(self, file_name: Path) -> None:
         super().__init__(file_name)
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def set_any_trial_variable(
         self, trial_id: int, process_name: str, label: str, value: Any, update_allow: bool
     ) -> None:
@@ -49,7 +49,7 @@ class Variable(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def get_any_trial_variable(self, trial_id: int, process_name: str, label: str) -> Any:
         """Get any trial result value.
 
@@ -74,7 +74,7 @@ class Variable(Abstract):
                 return None
             return data.value
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def all_delete(self) -> None:
         """Clear table
 
@@ -92,7 +92,7 @@ class Variable(Abstract):
                 session.rollback()
                 raise e
 
-    @retry(_MAX_NUM=60, _DELAY=1.0)
+    @retry(_MAX_NUM=60, _DELAY=0.01, _MAX_DELAY=1.0, _BACKOFF=2.0, _JITTER=0.5)
     def delete_any_trial_variable(self, trial_id: int, process_name: str, label: str) -> None:
         """Delete any trial result value.
 
@@ -224,6 +224,18 @@ class Serializer:
         for key in self.d.keys():
             self.d[key].delete(trial_id)
 
+    def close(self) -> None:
+        """Close all registered values.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for key in self.d.keys():
+            self.d[key].close()
+
 
 # if __name__ == "__main__":
 #     from pathlib import Path
@@ -46,13 +46,14 @@ class TensorBoard(AbstractModule):
             trial_ids = list(set(self.buff.d["finished"].Now) - set(self.buff.d["finished"].Pre))
 
         self.writer = SummaryWriter(str(self.workspace.tensorboard))
-        for trial_id in trial_ids:
-            objective_ys, best_values = self.storage.result.get_any_trial_objective_and_best_value(
-                trial_id, goals=self.goals
-            )
-
-            if objective_ys is None or best_values is None:
+        best_values = None
+        for record in self.storage.get_trials(sorted(trial_ids)):
+            trial_id = record["trial_id"]
+            objective_ys = record["result"]
+            if objective_ys is None:
                 continue
+            if best_values is None:
+                best_values = self.storage.result.get_bests(self.goals)
 
             objectives = {}
             for goal_id, (goal, objective_y, best_value) in enumerate(zip(self.goals, objective_ys, best_values)):
@@ -68,7 +69,7 @@ class TensorBoard(AbstractModule):
                 objectives[tag_objective] = objective_y
 
             # hyperparameters
-            params = self.storage.hp.get_any_trial_params_dict(trial_id)
+            params = {param["parameter_name"]: param["value"] for param in record["parameters"]}
             _trial_id = TrialId(self.config).zero_padding_any_trial_id(trial_id)
             self.writer.add_hparams(params, objectives, name=_trial_id)
 
@@ -1,6 +1,7 @@
 from aiaccel.parameter import CategoricalParameter, FloatParameter, IntParameter, OrdinalParameter, Parameter
 from aiaccel.util.buffer import Buffer
 from aiaccel.util.cast import cast_y
+from aiaccel.util.core_allocator import CoreAllocator, get_numa_nodes, get_thread_environment, pin_process
 from aiaccel.util.easy_visualizer import EasyVisualizer
 from aiaccel.util.filesystem import (
     create_yaml,
@@ -15,20 +16,29 @@ from aiaccel.util.filesystem import (
 from aiaccel.util.job_script_preamble import create_job_script_preamble
 from aiaccel.util.logger import ColoredHandler, str_to_logging_level
 from aiaccel.util.name import generate_random_name
-from aiaccel.util.process import OutputHandler, ps2joblist
+from aiaccel.util.output_multiplexer import OutputMultiplexer, OutputReader, get_output_multiplexer
+from aiaccel.util.process import OutputHandler, notify_on_exit, ps2joblist
+from aiaccel.util.process_registry import ProcessRegistry
 from aiaccel.util.retry import retry
 from aiaccel.util.suffix import Suffix
 from aiaccel.util.time import get_now_str, get_timestamp
 from aiaccel.util.trialid import TrialId
+from aiaccel.util.warm_worker import WarmWorkerJob, WarmWorkerPool
 
 __all__ = [
     "Buffer",
     "ColoredHandler",
+    "CoreAllocator",
     "EasyVisualizer",
     "OutputHandler",
+    "OutputMultiplexer",
+    "OutputReader",
+    "ProcessRegistry",
     # 'Run',
     "Suffix",
     "TrialId",
+    "WarmWorkerJob",
+    "WarmWorkerPool",
     "cast_y",
     "create_job_script_preamble",
     "create_yaml",
@@ -36,10 +46,15 @@ __all__ = [
     "file_delete",
     "file_read",
     "generate_random_name",
+    "get_numa_nodes",
+    "get_output_multiplexer",
+    "get_thread_environment",
     "interprocess_lock_file",
     "load_yaml",
     "make_directories",
     "make_directory",
+    "notify_on_exit",
+    "pin_process",
     "ps2joblist",
     "retry",
     "str_to_logging_level",
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import os
 import sys
 import traceback
 from argparse import ArgumentParser
@@ -18,8 +19,10 @@ from aiaccel.parameter import (
     IntParameter,
     OrdinalParameter,
 )
+from aiaccel.storage import Storage
 from aiaccel.util import cast_y
 from aiaccel.util.data_type import str_or_float_or_int
+from aiaccel.util.warm_worker import WARM_WORKER_FD_ENV, format_report, serve
 from aiaccel.workspace import Workspace
 
 
@@ -135,6 +138,7 @@ class Run:
     def __init__(self, config_path: str | Path | None = None) -> None:
         self.config = None
         self.workspace = None
+        self.storage: Storage | None = None
         self.args = CommandLineArgs()
         self.config_path = self.args.config_path or config_path
         self.config = self.args.config
@@ -185,6 +189,10 @@ class Run:
     ) -> None:
         """Executes the target function and report the results.
 
+        When the program runs as a warm worker (generic.warm_workers), it
+        does not return until the manager closes the connection, and runs the
+        function for each trial the manager sends.
+
         Args:
             func (Callable[[dict[str, float | int | str]], float]):
                 User-defined python function.
@@ -206,12 +214,49 @@ class Run:
                 run.execute_and_report(func)
         """
 
+        if WARM_WORKER_FD_ENV in os.environ:
+            # Started by a WarmWorkerPool: the parameters of the trials come
+            # from the manager. The variable is not passed to the processes
+            # the trials start.
+            serve(self, func, y_data_type, int(os.environ.pop(WARM_WORKER_FD_ENV)))
+            return
+
         xs = self.args.get_xs_from_args()
         ys: Any = None
         _, ys, err, _, _ = self.execute(func, xs, y_data_type)
 
         self.report(ys, err)
 
+    def report_intermediate(self, step: int, value: float) -> None:
+        """Report an intermediate objective value of the running trial.
+
+        The value is written to the storage, where the pruner of the
+        manager reads it to stop unpromising trials early. Does nothing if
+        the program is not run by aiaccel.
+
+        Args:
+            step (int): The step, such as an epoch.
+            value (float): The intermediate objective value.
+
+        Examples:
+         ::
+
+            def func(p: dict[str, Any]) -> float:
+                for epoch in range(100):
+                    loss = train_one_epoch(p)
+                    run.report_intermediate(epoch, loss)
+                return loss
+
+            if __name__ == "__main__":
+                run = aiaccel.Run()
+                run.execute_and_report(func)
+        """
+        if self.workspace is None or self.args.trial_id is None:
+            return
+        if self.storage is None:
+            self.storage = Storage(self.workspace.storage_file_path)
+        self.storage.intermediate.set_any_trial_intermediate(self.args.trial_id, int(step), float(value))
+
     def report(self, ys: Any, err: str) -> None:
         """Save the results to a text file.
 
@@ -221,16 +266,8 @@ class Run:
         """
 
         if ys is not None:
-            if isinstance(ys, str):
-                ys = ys.replace(" ", "")
-                ys = ys.split(",")
-                for y in ys:
-                    sys.stdout.write(f"{y}\n")
-            elif isinstance(ys, (list, tuple)):
-                for y in ys:
-                    sys.stdout.write(f"{y}\n")
-            else:
-                sys.stdout.write(f"{ys}\n")
+            for y in format_report(ys):
+                sys.stdout.write(f"{y}\n")
             sys.stdout.flush()
         if err != "":
             sys.stderr.write(f"{err}\n")
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+
+_NODE_DIR = Path("/sys/devices/system/node")
+
+
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    """Parse a CPU list in the format of the Linux sysfs, such as "0-3,8".
+
+    Args:
+        cpu_list (str): A CPU list.
+
+    Returns:
+        list[int]: The CPU numbers.
+    """
+    cpus: list[int] = []
+    for item in cpu_list.strip().split(","):
+        if item == "":
+            continue
+        if "-" in item:
+            first, last = item.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(item))
+    return cpus
+
+
+def get_numa_nodes(cpus: set[int] | None = None) -> list[list[int]]:
+    """Get the CPUs of each NUMA node.
+
+    Args:
+        cpus (set[int] | None, optional): The CPUs to include. Defaults to
+            None (the CPUs this process may run on).
+
+    Returns:
+        list[list[int]]: The CPUs of each NUMA node. One node with all CPUs
+        if the NUMA topology is not available.
+    """
+    if cpus is None:
+        cpus = os.sched_getaffinity(0)
+    nodes: list[list[int]] = []
+    node_dirs = [d for d in _NODE_DIR.glob("node*") if re.fullmatch(r"node\d+", d.name)]
+    for node_dir in sorted(node_dirs, key=lambda d: int(d.name[4:])):
+        try:
+            node_cpus = [cpu for cpu in parse_cpu_list((node_dir / "cpulist").read_text()) if cpu in cpus]
+        except OSError:
+            continue
+        if len(node_cpus) > 0:
+            nodes.append(node_cpus)
+    covered = {cpu for node in nodes for cpu in node}
+    if covered != cpus:
+        return [sorted(cpus)]
+    return nodes
+
+
+class CoreAllocator:
+    """Packs trials onto the CPU cores and the memory of the machine.
+
+    Each trial gets `cores_per_trial` cores of its own. The cores of a trial
+    are taken from one NUMA node if possible, choosing the node with the
+    fewest free cores that fit, so large requests still find a whole node
+    later.
+
+    Args:
+        cores_per_trial (int): The number of cores of a trial.
+        memory_per_trial (float | None, optional): The memory of a trial in
+            GB. Defaults to None (not limited).
+        numa_nodes (list[list[int]] | None, optional): The cores of each NUMA
+            node. Defaults to None (the nodes of this machine).
+        total_memory (float | None, optional): The memory of the machine in
+            GB. Defaults to None (the physical memory of this machine).
+
+    Raises:
+        ValueError: Causes when a trial needs more cores or memory than the
+            machine has.
+    """
+
+    def __init__(
+        self,
+        cores_per_trial: int,
+        memory_per_trial: float | None = None,
+        numa_nodes: list[list[int]] | None = None,
+        total_memory: float | None = None,
+    ) -> None:
+        self.cores_per_trial = cores_per_trial
+        self.memory_per_trial = memory_per_trial
+        self.numa_nodes = numa_nodes if numa_nodes is not None else get_numa_nodes()
+        if total_memory is None:
+            total_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+        self.total_memory = total_memory
+        self._free: list[list[int]] = [list(node) for node in self.numa_nodes]
+        self._allocated: dict[int, list[int]] = {}
+        num_cores = sum(len(node) for node in self.numa_nodes)
+        if cores_per_trial < 1 or cores_per_trial > num_cores:
+            raise ValueError(f"cores_per_trial must be between 1 and {num_cores}: {cores_per_trial}")
+        if memory_per_trial is not None and memory_per_trial > total_memory:
+            raise ValueError(f"memory_per_trial exceeds the memory of the machine: {memory_per_trial} > {total_memory}")
+
+    @property
+    def num_slots(self) -> int:
+        """The number of trials that can run at once."""
+        return len(self._allocated) + self.num_free_slots
+
+    @property
+    def num_free_slots(self) -> int:
+        """The number of trials that can be started now."""
+        num_free = sum(len(node) for node in self._free) // self.cores_per_trial
+        if self.memory_per_trial is not None and self.memory_per_trial > 0:
+            free_memory = self.total_memory - len(self._allocated) * self.memory_per_trial
+            num_free = min(num_free, int(free_memory // self.memory_per_trial))
+        return num_free
+
+    def allocate(self, trial_id: int) -> list[int] | None:
+        """Allocates cores to a trial.
+
+        Args:
+            trial_id (int): Trial ID.
+
+        Returns:
+            list[int] | None: The cores of the trial. None if no slot is free.
+        """
+        if trial_id in self._allocated:
+            return self._allocated[trial_id]
+        if self.num_free_slots == 0:
+            return None
+        n = self.cores_per_trial
+        fitting = [node for node in self._free if len(node) >= n]
+        if len(fitting) > 0:
+            node = min(fitting, key=len)
+            cores, node[:] = node[:n], node[n:]
+        else:
+            # The trial spans nodes, taking the fullest nodes first.
+            cores = []
+            for node in sorted(self._free, key=len, reverse=True):
+                taken, node[:] = node[: n - len(cores)], node[n - len(cores) :]
+                cores.extend(taken)
+                if len(cores) == n:
+                    break
+        self._allocated[trial_id] = cores
+        return cores
+
+    def release(self, trial_id: int) -> None:
+        """Releases the cores of a trial. Does nothing if the trial has no
+        cores.
+
+        Args:
+            trial_id (int): Trial ID.
+
+        Returns:
+            None
+        """
+        cores = self._allocated.pop(trial_id, None)
+        if cores is None:
+            return
+        for node, free in zip(self.numa_nodes, self._free):
+            members = set(node)
+            free.extend(core for core in cores if core in members)
+            free.sort()
+
+
+def pin_process(pid: int, cores: list[int]) -> None:
+    """Restricts a process to the given cores.
+
+    Threads the process starts afterwards, such as those of OpenMP, inherit
+    the affinity.
+
+    Args:
+        pid (int): The process ID. 0 for this process.
+        cores (list[int]): The cores.
+
+    Returns:
+        None
+    """
+    try:
+        os.sched_setaffinity(pid, cores)
+    except ProcessLookupError:
+        # The process has already exited.
+        pass
+
+
+def get_thread_environment(cores: list[int]) -> dict[str, str]:
+    """Get the environment variables limiting the threads of a trial to its
+    cores.
+
+    Args:
+        cores (list[int]): The cores of the trial.
+
+    Returns:
+        dict[str, str]: The environment variables.
+    """
+    return {"OMP_NUM_THREADS": str(len(cores))}
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import selectors
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import IO, Any, Callable
+
+from aiaccel.common import datetime_format
+
+# The number of the last lines of stdout and stderr kept in memory.
+DEFAULT_TAIL_LINES = 100
+# Seconds between checks of processes that closed their output but have not
+# exited yet.
+_EXIT_POLL_INTERVAL = 0.005
+_READ_SIZE = 65536
+
+# The multiplexer reads the output of the jobs of the manager.
+_logger = logging.getLogger("root.manager.output_multiplexer")
+
+
+class OutputReader:
+    """Collects the output of a subprocess through an OutputMultiplexer.
+
+    It has the interface of OutputHandler, but does not start a thread: the
+    output of all readers is read by the single thread of the multiplexer.
+    Only the last `tail_lines` lines of stdout and stderr are kept. If
+    `stderr_file` is given, the whole stderr is written to it as well.
+
+    Args:
+        proc (Popen): A reference for subprocess.Popen.
+        on_exit (Callable[[], None] | None, optional): Called from the
+            multiplexer thread after the subprocess has finished and its
+            output has been read. Defaults to None.
+        tail_lines (int, optional): The number of the last lines of stdout
+            and stderr to keep. Defaults to DEFAULT_TAIL_LINES.
+        stderr_file (Path | str | None, optional): A file the stderr is
+            written to. It is created when the first output arrives. Defaults
+            to None.
+        multiplexer (OutputMultiplexer | None, optional): Defaults to None
+            (the multiplexer shared in this process).
+    """
+
+    def __init__(
+        self,
+        proc: subprocess.Popen[bytes],
+        on_exit: Callable[[], None] | None = None,
+        tail_lines: int = DEFAULT_TAIL_LINES,
+        stderr_file: Path | str | None = None,
+        multiplexer: OutputMultiplexer | None = None,
+    ) -> None:
+        self._proc = proc
+        self._on_exit = on_exit
+        self._stderr_file_path = stderr_file
+        self._stderr_file: IO[bytes] | None = None
+        self._multiplexer = multiplexer
+        self._stdouts: deque[str] = deque(maxlen=tail_lines)
+        self._stderrs: deque[str] = deque(maxlen=tail_lines)
+        self._partial: dict[str, bytes] = {"stdout": b"", "stderr": b""}
+        self._open_streams: set[str] = set()
+        self._start_time: datetime.datetime | None = None
+        self._end_time: datetime.datetime | None = None
+        self._finished = threading.Event()
+
+    def start(self) -> None:
+        """Starts reading the output.
+
+        Returns:
+            None
+        """
+        self._start_time = datetime.datetime.now()
+        if self._multiplexer is None:
+            self._multiplexer = get_output_multiplexer()
+        self._multiplexer.register(self)
+
+    def is_alive(self) -> bool:
+        """Whether the output is still being read.
+
+        Returns:
+            bool: False after the subprocess has finished and its output has
+            been read.
+        """
+        return self._start_time is not None and not self._finished.is_set()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Waits until the output has been read.
+
+        Args:
+            timeout (float | None, optional): The maximum seconds to wait.
+                Defaults to None.
+
+        Returns:
+            None
+        """
+        self._finished.wait(timeout)
+
+    def _feed(self, name: str, data: bytes) -> None:
+        if name == "stderr" and self._stderr_file_path is not None:
+            try:
+                if self._stderr_file is None:
+                    self._stderr_file = open(self._stderr_file_path, "ab")
+                self._stderr_file.write(data)
+            except OSError:
+                # The tail in memory is still kept.
+                self._stderr_file_path = None
+        lines = (self._partial[name] + data).split(b"\n")
+        self._partial[name] = lines.pop()
+        self._append_lines(name, lines)
+
+    def _append_lines(self, name: str, lines: list[bytes]) -> None:
+        tail = self._stdouts if name == "stdout" else self._stderrs
+        # Only the lines that stay in the tail are decoded.
+        for line in lines[-(tail.maxlen or len(lines)) :]:
+            tail.append(line.decode(errors="replace").strip())
+
+    def _close_stream(self, name: str) -> None:
+        self._open_streams.discard(name)
+        if self._partial[name]:
+            self._append_lines(name, [self._partial[name]])
+            self._partial[name] = b""
+
+    def _finish(self) -> None:
+        if self._stderr_file is not None:
+            try:
+                self._stderr_file.close()
+            except OSError:
+                pass
+            self._stderr_file = None
+        self._end_time = datetime.datetime.now()
+        self._finished.set()
+        if self._on_exit is not None:
+            self._on_exit()
+
+    def get_stdouts(self) -> list[str]:
+        """Get the last lines of stdout.
+
+        Returns:
+            list[str]: A list of stdout.
+        """
+        return list(self._stdouts)
+
+    def get_stderrs(self) -> list[str]:
+        """Get the last lines of stderr.
+
+        Returns:
+            list[str]: A list of stderr.
+        """
+        return list(self._stderrs)
+
+    def get_start_time(self) -> str:
+        """Get a start time of the subprocess.
+
+        Returns:
+            str: A start time of the subprocess.
+        """
+        if self._start_time is None:
+            return ""
+        return self._start_time.strftime(datetime_format)
+
+    def get_end_time(self) -> str:
+        """Get an end time of the subprocess.
+
+        Returns:
+            str: An end time of the subprocess.
+        """
+        if self._end_time is None:
+            return ""
+        return self._end_time.strftime(datetime_format)
+
+    def get_returncode(self) -> int | None:
+        return self._proc.poll()
+
+    def raise_exception_if_error(self) -> None:
+        """Raise an exception if an error is detected.
+
+        Returns:
+            None
+        """
+        if self._proc.returncode != 0:
+            raise RuntimeError(
+                f"An error occurred in the subprocess.\n"
+                f"stdout: {self.get_stdouts()}\n"
+                f"stderr: {self.get_stderrs()}"
+            )
+
+    def enforce_kill(self) -> None:
+        """Enforce killing the subprocess.
+
+        Returns:
+            None
+        """
+        self._proc.kill()
+        raise RuntimeError(
+            f"An error occurred in the subprocess.\n" f"stdout: {self.get_stdouts()}\n" f"stderr: {self.get_stderrs()}"
+        )
+
+
+class OutputMultiplexer:
+    """Reads the output of many subprocesses in one thread.
+
+    The stdout and stderr pipes of the registered readers are watched by a
+    selector, so a running subprocess costs its file descriptors and no
+    thread. The thread starts with the first registration. An error while
+    reading the output of a reader, or raised by its on_exit, is logged and
+    finishes only that reader.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: list[OutputReader] = []
+        self._exiting: set[OutputReader] = set()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_read_fd, self._wakeup_write_fd = os.pipe()
+        os.set_blocking(self._wakeup_read_fd, False)
+        os.set_blocking(self._wakeup_write_fd, False)
+        self._selector.register(self._wakeup_read_fd, selectors.EVENT_READ)
+        self._thread: threading.Thread | None = None
+
+    def register(self, reader: OutputReader) -> None:
+        """Starts reading the output of a reader. Safe to call from any
+        thread.
+
+        Args:
+            reader (OutputReader): The reader.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pending.append(reader)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="OutputMultiplexer", daemon=True)
+                self._thread.start()
+        try:
+            os.write(self._wakeup_write_fd, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _add_pending(self) -> None:
+        with self._lock:
+            readers, self._pending = self._pending, []
+        for reader in readers:
+            for name in ("stdout", "stderr"):
+                stream: Any = getattr(reader._proc, name)
+                if stream is None:
+                    continue
+                os.set_blocking(stream.fileno(), False)
+                self._selector.register(stream.fileno(), selectors.EVENT_READ, (reader, name))
+                reader._open_streams.add(name)
+            if len(reader._open_streams) == 0:
+                self._exiting.add(reader)
+
+    def _run(self) -> None:
+        while True:
+            timeout = _EXIT_POLL_INTERVAL if len(self._exiting) > 0 else None
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while os.read(self._wakeup_read_fd, _READ_SIZE):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                reader, name = key.data
+                try:
+                    data = os.read(key.fd, _READ_SIZE)
+                    if data:
+                        reader._feed(name, data)
+                        continue
+                    self._close_stream(reader, name)
+                    if len(reader._open_streams) == 0:
+                        self._exiting.add(reader)
+                except BlockingIOError:
+                    continue
+                except Exception:
+                    _logger.exception(f"Failed to read the {name} of the process {reader._proc.pid}.")
+                    self._abort(reader)
+            # A subprocess closes its output just before it exits.
+            for reader in list(self._exiting):
+                if reader._proc.poll() is not None:
+                    self._exiting.discard(reader)
+                    self._finish(reader)
+            self._add_pending()
+
+    def _close_stream(self, reader: OutputReader, name: str) -> None:
+        stream: Any = getattr(reader._proc, name)
+        self._selector.unregister(stream.fileno())
+        reader._close_stream(name)
+        stream.close()
+
+    def _abort(self, reader: OutputReader) -> None:
+        # Stops reading the output of a reader that failed and finishes it
+        # without waiting for the subprocess.
+        for name in list(reader._open_streams):
+            try:
+                self._close_stream(reader, name)
+            except Exception:
+                reader._open_streams.discard(name)
+        self._exiting.discard(reader)
+        self._finish(reader)
+
+    def _finish(self, reader: OutputReader) -> None:
+        try:
+            reader._finish()
+        except Exception:
+            _logger.exception(f"Failed to finish the output of the process {reader._proc.pid}.")
+
+
+_multiplexer: OutputMultiplexer | None = None
+_multiplexer_lock = threading.Lock()
+
+
+def get_output_multiplexer() -> OutputMultiplexer:
+    """Returns the OutputMultiplexer shared in this process.
+
+    Returns:
+        OutputMultiplexer: The multiplexer.
+    """
+    global _multiplexer
+    with _multiplexer_lock:
+        if _multiplexer is None:
+            _multiplexer = OutputMultiplexer()
+        return _multiplexer
+
+
+def _reset_after_fork() -> None:
+    # The thread of the multiplexer does not exist in a forked child.
+    global _multiplexer, _multiplexer_lock
+    _multiplexer = None
+    _multiplexer_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -6,7 +6,7 @@ import select
 import subprocess
 import sys
 import threading
-from typing import Any
+from typing import Any, Callable
 
 import psutil
 
@@ -50,12 +50,39 @@ def ps2joblist() -> list[dict[str, Any]]:
     return job_list
 
 
+def notify_on_exit(proc: subprocess.Popen[bytes], callback: Callable[[], None]) -> threading.Thread:
+    """Calls a function when a subprocess has finished.
+
+    The subprocess is waited for in a daemon thread, so the caller does not
+    have to poll it.
+
+    Args:
+        proc (Popen): A reference for subprocess.Popen.
+        callback (Callable[[], None]): Called from the thread after the
+            subprocess has finished.
+
+    Returns:
+        threading.Thread: The thread waiting for the subprocess.
+    """
+
+    def wait() -> None:
+        proc.wait()
+        callback()
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    return thread
+
+
 class OutputHandler(threading.Thread):
     """A class to print subprocess outputs.
 
     Args:
         proc (Popen): A reference for subprocess.Popen.
             For example, 'Optimizer'.
+        on_exit (Callable[[], None] | None, optional): Called from the
+            thread after the subprocess has finished and its output has been
+            read. Defaults to None.
 
     Attributes:
         _proc (Popen): A reference for subprocess.Popen.
@@ -69,9 +96,10 @@ class OutputHandler(threading.Thread):
         _end_time (datetime): An end time of the subprocess.
     """
 
-    def __init__(self, proc: subprocess.Popen[bytes]) -> None:
+    def __init__(self, proc: subprocess.Popen[bytes], on_exit: Callable[[], None] | None = None) -> None:
         super(OutputHandler, self).__init__()
         self._proc = proc
+        self._on_exit = on_exit
         self._sleep_time = 1
         self._abort = False
 
@@ -124,6 +152,8 @@ class OutputHandler(threading.Thread):
         self._end_time = datetime.datetime.now()
         sys.stdout.flush()
         sys.stderr.flush()
+        if self._on_exit is not None:
+            self._on_exit()
 
     def get_stdouts(self) -> list[str]:
         """Get stdout.
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import datetime
+import threading
+from pathlib import Path
+from typing import Any
+
+import psutil
+
+_PROC_DIR = Path("/proc")
+
+
+def get_child_pids(pid: int) -> list[int]:
+    """Get the child processes of a process without scanning all processes.
+
+    It reads /proc/<pid>/task/<tid>/children, which is available on Linux.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        list[int]: The process ids of the children. Empty if they are not
+        available.
+    """
+    children: list[int] = []
+    try:
+        for task in (_PROC_DIR / str(pid) / "task").iterdir():
+            children.extend(int(child) for child in (task / "children").read_text().split())
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def get_peak_rss(pid: int) -> int:
+    """Get the peak resident set size of a process from /proc.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        int: The peak resident set size in bytes. 0 if it is not available.
+    """
+    try:
+        with open(_PROC_DIR / str(pid) / "status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+class _TrialProcess:
+    def __init__(self, process: psutil.Process) -> None:
+        self.process = process
+        self.descendants: dict[int, psutil.Process] = {}
+        self.peak_rss = 0
+
+
+class ProcessRegistry:
+    """The processes the manager has spawned for the running trials.
+
+    Only the registered processes and their descendants are sampled, so the
+    cost does not depend on the number of processes on the host. The CPU
+    time includes the descendants, whether they are running or have been
+    reaped, and the peak resident set size is kept over the samples.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._processes: dict[int, _TrialProcess] = {}
+
+    def register(self, trial_id: int, pid: int) -> None:
+        """Starts tracking the process of a trial.
+
+        Args:
+            trial_id (int): The trial id.
+            pid (int): The process id.
+
+        Returns:
+            None
+        """
+        try:
+            process = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return
+        with self._lock:
+            self._processes[trial_id] = _TrialProcess(process)
+
+    def unregister(self, trial_id: int) -> None:
+        """Stops tracking the process of a trial.
+
+        Args:
+            trial_id (int): The trial id.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._processes.pop(trial_id, None)
+
+    def get_trial_ids(self) -> list[int]:
+        """Get the trials whose processes are tracked.
+
+        Returns:
+            list[int]: The trial ids.
+        """
+        with self._lock:
+            return list(self._processes.keys())
+
+    def sample(self) -> list[dict[str, Any]]:
+        """Get the status and the resource usage of the tracked processes.
+
+        Returns:
+            list[dict[str, Any]]: One entry per running trial, with the keys
+            of ps2joblist() and "trial_id", "cpu_time" (seconds), "rss",
+            "peak_rss" (bytes) and "num_processes".
+        """
+        with self._lock:
+            processes = list(self._processes.items())
+        stats = []
+        for trial_id, trial_process in processes:
+            stat = self._sample(trial_id, trial_process)
+            if stat is not None:
+                stats.append(stat)
+        return stats
+
+    def _sample(self, trial_id: int, trial_process: _TrialProcess) -> dict[str, Any] | None:
+        process = trial_process.process
+        try:
+            # The process id may have been reused after the trial exited.
+            if not process.is_running():
+                return None
+            info = process.as_dict(["username", "status", "create_time", "cmdline", "cpu_times", "memory_info"])
+        except psutil.Error:
+            return None
+
+        cpu_time = _get_cpu_time(info["cpu_times"])
+        rss = info["memory_info"].rss if info["memory_info"] is not None else 0
+        num_processes = 1
+        descendants: dict[int, psutil.Process] = {}
+        pids = get_child_pids(process.pid)
+        while len(pids) > 0:
+            pid = pids.pop()
+            descendant = trial_process.descendants.get(pid)
+            try:
+                if descendant is None or not descendant.is_running():
+                    descendant = psutil.Process(pid)
+                with descendant.oneshot():
+                    cpu_time += _get_cpu_time(descendant.cpu_times())
+                    rss += descendant.memory_info().rss
+            except psutil.Error:
+                continue
+            descendants[pid] = descendant
+            num_processes += 1
+            pids.extend(get_child_pids(pid))
+        trial_process.descendants = descendants
+        trial_process.peak_rss = max(trial_process.peak_rss, rss, get_peak_rss(process.pid))
+
+        return {
+            "job-ID": process.pid,
+            "prior": None,
+            "user": info["username"],
+            "state": info["status"],
+            "queue": None,
+            "jclass": None,
+            "slots": None,
+            "ja-task-ID": None,
+            "name": " ".join(info["cmdline"] or []),
+            "submit/start at": datetime.datetime.fromtimestamp(info["create_time"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "trial_id": trial_id,
+            "cpu_time": cpu_time,
+            "rss": rss,
+            "peak_rss": trial_process.peak_rss,
+            "num_processes": num_processes,
+        }
+
+
+def _get_cpu_time(cpu_times: Any) -> float:
+    # The children times are those of the reaped children.
+    if cpu_times is None:
+        return 0.0
+    return float(
+        cpu_times.user
+        + cpu_times.system
+        + getattr(cpu_times, "children_user", 0.0)
+        + getattr(cpu_times, "children_system", 0.0)
+    )
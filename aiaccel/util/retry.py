@@ -1,29 +1,68 @@
 from __future__ import annotations
 
+import random
 import time
+from collections import Counter
 from collections.abc import Callable
 from functools import wraps
 from typing import Any
 
+retry_counts: Counter[str] = Counter()
 
-def retry(_MAX_NUM: int = 60, _DELAY: float = 1.0) -> Callable[[Any], Any]:
+
+class NonRetryableError(Exception):
+    """An error that is raised at once by a function decorated with retry().
+
+    It is raised when running the function again would not help, such as
+    when the failure has already discarded the work of the caller.
+    """
+
+
+def retry(
+    _MAX_NUM: int = 60,
+    _DELAY: float = 1.0,
+    _MAX_DELAY: float | None = None,
+    _BACKOFF: float = 1.0,
+    _JITTER: float = 0.0,
+) -> Callable[[Any], Any]:
     """Decorator to retry function.
 
+    The n-th retry waits ``min(_DELAY * _BACKOFF ** n, _MAX_DELAY)`` seconds,
+    shortened by a random fraction of at most ``_JITTER`` so that concurrent
+    callers do not retry in lockstep. Every retried failure is counted in
+    ``retry_counts`` under the qualified name of the function.
+
+    Only ``Exception`` is retried; ``KeyboardInterrupt``, ``SystemExit`` and
+    ``NonRetryableError`` propagate immediately.
+
     Args:
         _MAX_NUM (int, optional): Maximum number of retries. Defaults to 60.
-        _DELAY (float, optional): Retry interval in seconds. Defaults to 1.0.
+        _DELAY (float, optional): Initial retry interval in seconds. Defaults to 1.0.
+        _MAX_DELAY (float | None, optional): Upper bound of the retry interval
+            in seconds. Defaults to None (unbounded).
+        _BACKOFF (float, optional): Multiplier applied to the retry interval
+            after each failure. Defaults to 1.0 (constant interval).
+        _JITTER (float, optional): Maximum fraction, in [0, 1], by which each
+            retry interval is randomly shortened. Defaults to 0.0.
     """
 
     def _retry(func: Callable[[Any], Any]) -> Any:
         @wraps(func)
         def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            delay = _DELAY
             for i in range(_MAX_NUM):
                 try:
                     return func(*args, **kwargs)
-                except BaseException as e:
+                except NonRetryableError:
+                    raise
+                except Exception as e:
                     if i == _MAX_NUM - 1:
                         raise e
-                    time.sleep(_DELAY)
+                    retry_counts[func.__qualname__] += 1
+                    time.sleep(delay * (1.0 - _JITTER * random.random()))
+                    delay *= _BACKOFF
+                    if _MAX_DELAY is not None:
+                        delay = min(delay, _MAX_DELAY)
                     continue
 
         return _wrapper
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import datetime
+import os
+import signal
+import subprocess
+import sys
+import threading
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from aiaccel.common import datetime_format
+from aiaccel.util.core_allocator import pin_process
+
+if TYPE_CHECKING:
+    from aiaccel.util.aiaccel import Run
+
+# The environment variable telling aiaccel.Run that the user program runs as
+# a warm worker. The value is the file descriptor of the connection to the
+# manager.
+WARM_WORKER_FD_ENV = "AIACCEL_WARM_WORKER_FD"
+
+
+def format_report(ys: Any) -> list[str]:
+    """Format objective values as the lines aiaccel.Run reports.
+
+    Args:
+        ys (Any): Objective values.
+
+    Returns:
+        list[str]: The lines written to the standard output.
+    """
+    if ys is None:
+        return []
+    if isinstance(ys, str):
+        return ys.replace(" ", "").split(",")
+    if isinstance(ys, (list, tuple)):
+        return [f"{y}" for y in ys]
+    return [f"{ys}"]
+
+
+def serve(run: Run, func: Callable[[dict[str, Any]], Any], y_data_type: str | None, fd: int) -> None:
+    """Runs trials requested by a WarmWorkerPool until the connection closes.
+
+    The user program has been imported once when this is called. Each trial
+    runs in a child forked from this process, so trials cannot affect each
+    other, and the result is sent back through the connection. The child is
+    pinned to the cores of the trial. The thread environment is read by the
+    libraries of the user program when they are imported, so it is set when
+    the worker starts (see WarmWorkerPool) instead of here.
+
+    Args:
+        run (Run): The Run object of the user program.
+        func (Callable[[dict[str, Any]], Any]): User-defined python function.
+        y_data_type (str | None): Name of data type of objective value.
+        fd (int): The file descriptor of the connection to the manager.
+
+    Returns:
+        None
+    """
+    conn = Connection(fd)
+    while True:
+        try:
+            trial_id, xs, cores = conn.recv()
+        except EOFError:
+            return
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                if cores is not None:
+                    pin_process(0, cores)
+                run.args.trial_id = trial_id
+                _, ys, err, _, _ = run.execute(func, xs, y_data_type)
+                conn.send((format_report(ys), err))
+                status = 0
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            conn.send(([], f"The trial process exited with status {returncode}."))
+
+
+class WarmWorkerJob:
+    """A trial running in a warm worker.
+
+    It has the interface of OutputHandler. The standard output is the lines
+    aiaccel.Run would have reported, and the error of the trial is written
+    to `stderr_file`.
+
+    Args:
+        on_exit (Callable[[], None] | None, optional): Called from the thread
+            of the pool after the trial has finished. Defaults to None.
+        stderr_file (Path | str | None, optional): A file the error is
+            written to. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        on_exit: Callable[[], None] | None = None,
+        stderr_file: Path | str | None = None,
+    ) -> None:
+        self._on_exit = on_exit
+        self._stderr_file = stderr_file
+        self._worker: subprocess.Popen[bytes] | None = None
+        self._stdouts: list[str] = []
+        self._stderrs: list[str] = []
+        self._returncode: int | None = None
+        self._start_time = datetime.datetime.now()
+        self._end_time: datetime.datetime | None = None
+        self._finished = threading.Event()
+
+    def start(self) -> None:
+        """Does nothing. The trial starts when it is submitted to the pool.
+
+        Returns:
+            None
+        """
+        pass
+
+    def is_alive(self) -> bool:
+        """Whether the trial is running.
+
+        Returns:
+            bool: False after the trial has finished.
+        """
+        return not self._finished.is_set()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Waits until the trial has finished.
+
+        Args:
+            timeout (float | None, optional): The maximum seconds to wait.
+                Defaults to None.
+
+        Returns:
+            None
+        """
+        self._finished.wait(timeout)
+
+    def _finish(self, stdouts: list[str], err: str) -> None:
+        self._stdouts = stdouts
+        if err != "":
+            self._stderrs = err.splitlines()
+            if self._stderr_file is not None:
+                try:
+                    with open(self._stderr_file, "a") as f:
+                        f.write(f"{err}\n")
+                except OSError:
+                    pass
+        self._returncode = 0 if err == "" else 1
+        self._end_time = datetime.datetime.now()
+        self._finished.set()
+        if self._on_exit is not None:
+            self._on_exit()
+
+    def get_stdouts(self) -> list[str]:
+        """Get the reported lines of the trial.
+
+        Returns:
+            list[str]: A list of stdout.
+        """
+        return list(self._stdouts)
+
+    def get_stderrs(self) -> list[str]:
+        """Get the lines of the error of the trial.
+
+        Returns:
+            list[str]: A list of stderr.
+        """
+        return list(self._stderrs)
+
+    def get_start_time(self) -> str:
+        """Get a start time of the trial.
+
+        Returns:
+            str: A start time of the trial.
+        """
+        return self._start_time.strftime(datetime_format)
+
+    def get_end_time(self) -> str:
+        """Get an end time of the trial.
+
+        Returns:
+            str: An end time of the trial.
+        """
+        if self._end_time is None:
+            return ""
+        return self._end_time.strftime(datetime_format)
+
+    def get_returncode(self) -> int | None:
+        return self._returncode
+
+    def raise_exception_if_error(self) -> None:
+        """Raise an exception if an error is detected.
+
+        Returns:
+            None
+        """
+        if self._returncode != 0:
+            raise RuntimeError(
+                f"An error occurred in the subprocess.\n"
+                f"stdout: {self.get_stdouts()}\n"
+                f"stderr: {self.get_stderrs()}"
+            )
+
+    def enforce_kill(self) -> None:
+        """Enforce killing the worker running the trial.
+
+        The pool starts a new worker for the next trial.
+
+        Returns:
+            None
+        """
+        if self._worker is not None:
+            _kill_worker(self._worker)
+        raise RuntimeError(
+            f"An error occurred in the subprocess.\n" f"stdout: {self.get_stdouts()}\n" f"stderr: {self.get_stderrs()}"
+        )
+
+
+def _kill_worker(proc: subprocess.Popen[bytes]) -> None:
+    # The trial runs in a child of the worker, in the session of the worker.
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class _Worker:
+    def __init__(self, proc: subprocess.Popen[bytes], conn: Connection) -> None:
+        self.proc = proc
+        self.conn = conn
+
+
+class WarmWorkerPool:
+    """Long-lived processes of a user program running one trial at a time.
+
+    Each worker runs `command` once. When the user program calls
+    aiaccel.Run.execute_and_report(), the worker receives the parameters of
+    trials from this pool instead of the command line, so the interpreter
+    startup and the imports of the user program are paid once per worker
+    instead of once per trial. Workers are started on demand and are reused;
+    a worker that exits, for example because the trial was killed, is
+    replaced by a new one. The results of all workers are received by one
+    thread.
+
+    Args:
+        command (list[str]): The command of the user program, including the
+            `--config` option.
+        output_dir (Path | None, optional): A directory the output of the
+            workers is written to, one file per worker. Defaults to None
+            (discarded).
+        env (dict[str, str] | None, optional): Environment variables the
+            workers start with in addition to those of this process, such as
+            the thread environment of the trials. Defaults to None.
+    """
+
+    def __init__(self, command: list[str], output_dir: Path | None = None, env: dict[str, str] | None = None) -> None:
+        self.command = command
+        self.output_dir = output_dir
+        self.env = env
+        self._lock = threading.Lock()
+        self._idle: list[_Worker] = []
+        self._busy: dict[Connection, tuple[_Worker, WarmWorkerJob]] = {}
+        self._all: list[_Worker] = []
+        self._num_started = 0
+        self._wakeup_recv, self._wakeup_send = Pipe(duplex=False)
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit(
+        self,
+        trial_id: int,
+        xs: dict[str, Any],
+        on_exit: Callable[[], None] | None = None,
+        stderr_file: Path | str | None = None,
+        cores: list[int] | None = None,
+    ) -> WarmWorkerJob:
+        """Runs a trial in an idle worker.
+
+        Args:
+            trial_id (int): Trial ID.
+            xs (dict[str, Any]): The parameters of the trial.
+            on_exit (Callable[[], None] | None, optional): Called from the
+                thread of the pool after the trial has finished. Defaults to
+                None.
+            stderr_file (Path | str | None, optional): A file the error of
+                the trial is written to. Defaults to None.
+            cores (list[int] | None, optional): The cores the trial is
+                pinned to. Defaults to None (not pinned).
+
+        Returns:
+            WarmWorkerJob: The running trial.
+        """
+        job = WarmWorkerJob(on_exit, stderr_file)
+        with self._lock:
+            worker = self._get_idle_worker()
+            try:
+                worker.conn.send((trial_id, xs, cores))
+            except OSError:
+                # The worker has exited since it was checked, so the trial
+                # is sent to a new worker.
+                self._stop_worker(worker)
+                worker = self._start_worker()
+                worker.conn.send((trial_id, xs, cores))
+            job._worker = worker.proc
+            self._busy[worker.conn] = (worker, job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="WarmWorkerPool", daemon=True)
+                self._thread.start()
+        self._wakeup_send.send_bytes(b"")
+        return job
+
+    def _get_idle_worker(self) -> _Worker:
+        # An idle worker may have exited, for example killed by the OOM
+        # killer, while no trial was running. It is replaced by a new one
+        # instead of failing the next trial.
+        while len(self._idle) > 0:
+            worker = self._idle.pop()
+            if worker.proc.poll() is None:
+                return worker
+            self._stop_worker(worker)
+        return self._start_worker()
+
+    def _start_worker(self) -> _Worker:
+        conn, worker_conn = Pipe()
+        env = {**os.environ, **(self.env or {})}
+        env[WARM_WORKER_FD_ENV] = str(worker_conn.fileno())
+        if self.output_dir is None:
+            output: Any = subprocess.DEVNULL
+        else:
+            output = open(self.output_dir / f"warm_worker_{self._num_started}.log", "ab")
+        self._num_started += 1
+        try:
+            proc = subprocess.Popen(
+                self.command,
+                stdout=output,
+                stderr=subprocess.STDOUT,
+                pass_fds=(worker_conn.fileno(),),
+                env=env,
+                start_new_session=True,
+            )
+        finally:
+            worker_conn.close()
+            if output is not subprocess.DEVNULL:
+                output.close()
+        worker = _Worker(proc, conn)
+        self._all.append(worker)
+        return worker
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                conns = [self._wakeup_recv, *self._busy.keys()]
+            for conn in wait(conns):
+                if conn is self._wakeup_recv:
+                    self._wakeup_recv.recv_bytes()
+                    continue
+                assert isinstance(conn, Connection)
+                try:
+                    stdouts, err = conn.recv()
+                except (EOFError, OSError):
+                    stdouts, err = [], (
+                        "The warm worker exited without reporting the result. "
+                        "The user program has to call aiaccel.Run.execute_and_report()."
+                    )
+                    alive = False
+                else:
+                    alive = True
+                with self._lock:
+                    worker, job = self._busy.pop(conn)
+                    if alive:
+                        self._idle.append(worker)
+                    else:
+                        self._stop_worker(worker)
+                job._finish(stdouts, err)
+
+    def _stop_worker(self, worker: _Worker) -> None:
+        _kill_worker(worker.proc)
+        worker.proc.wait()
+        worker.conn.close()
+        self._all.remove(worker)
+
+    def close(self) -> None:
+        """Stops all workers.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._closed = True
+            workers = list(self._all)
+            self._idle = []
+            self._busy = {}
+        self._wakeup_send.send_bytes(b"")
+        for worker in workers:
+            _kill_worker(worker.proc)
+            worker.proc.wait()
+            worker.conn.close()
+        self._all = []
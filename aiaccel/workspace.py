@@ -186,3 +186,27 @@ class Workspace:
             Path: The file path for the runner script.
         """
         return self.runner / f"run_{trial_id}.sh"
+
+    def get_array_job_file(self, trial_id: int) -> Path:
+        """
+        Returns the file path for the runner script of the array job whose first task is the given trial ID.
+
+        Args:
+            trial_id(int): The trial id of the first task
+
+        Returns:
+            Path: The file path for the runner script of the array job.
+        """
+        return self.runner / f"array_{trial_id}.sh"
+
+    def get_array_job_manifest_file(self, trial_id: int) -> Path:
+        """
+        Returns the file path for the manifest of the array job whose first task is the given trial ID.
+
+        Args:
+            trial_id(int): The trial id of the first task
+
+        Returns:
+            Path: The file path for the manifest listing the runner scripts of the tasks.
+        """
+        return self.runner / f"array_{trial_id}.txt"
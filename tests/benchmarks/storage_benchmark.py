@@ -0,0 +1,416 @@
+"""Micro-benchmarks of aiaccel.storage.
+
+Each operation is timed on a storage that already holds a given number of
+trials, with a given number of processes writing to it at the same time.
+For a write operation every writer runs the operation; for the other
+operations one process runs it while the other writers keep writing
+variables, as modules do when they serialize their state.
+
+Example:
+    Run the benchmarks and compare them with the stored baseline::
+
+        python -m tests.benchmarks.storage_benchmark --output results.json \\
+            --baseline tests/benchmarks/storage_baseline.json
+
+    The command exits with status 1 if an operation is slower than the
+    baseline by more than the threshold. Record a new baseline on the
+    reference machine by writing the results over the baseline file.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy import insert, text
+
+from aiaccel.storage import HpTable, ResultTable, Storage, TimestampTable, TrialTable, VariableTable
+from aiaccel.storage.migration import REBUILD_BEST_VALUE_SQL
+from aiaccel.storage.model import typed_value_columns
+
+NUM_TRIALS = [1000, 10000, 100000]
+NUM_WRITERS = [1, 4]
+READ_OPERATIONS = [
+    "get_any_trial_params",
+    "get_num_running_ready_finished",
+    "get_hp_dict",
+    "get_best_trial",
+    "serializer_get",
+]
+WRITE_OPERATIONS = ["set_any_trial_params", "serializer_set"]
+OPERATIONS = READ_OPERATIONS + WRITE_OPERATIONS + ["delete_trial_data_after_this"]
+
+PROCESS_NAME = "benchmark"
+LABEL = "state"
+# Trial ids used by the background writers, far above the populated trials.
+BACKGROUND_TRIAL_ID = 10**9
+# The number of trials removed by one call of delete_trial_data_after_this.
+NUM_DELETED_TRIALS = 10
+
+
+def _params(rng: np.random.RandomState) -> list[dict[str, Any]]:
+    return [
+        {"parameter_name": "x1", "type": "uniform_float", "value": float(rng.uniform(-5.0, 5.0))},
+        {"parameter_name": "x2", "type": "uniform_int", "value": int(rng.randint(0, 100))},
+        {"parameter_name": "x3", "type": "categorical", "value": str(rng.choice(["red", "green", "blue"]))},
+    ]
+
+
+def _state(trial_id: int) -> dict[str, Any]:
+    return {"trial_id": trial_id, "history": list(range(32)), "name": PROCESS_NAME}
+
+
+def populate(storage: Storage, start: int, stop: int, seed: int = 0) -> None:
+    """Inserts finished trials with parameters, results, timestamps and a
+    serialized variable directly, bypassing the accessors.
+
+    Args:
+        storage (Storage): The storage.
+        start (int): The first trial id.
+        stop (int): The trial id after the last one.
+        seed (int, optional): Random seed of the values. Defaults to 0.
+
+    Returns:
+        None
+    """
+    rng = np.random.RandomState(seed + start)
+    trials, params, results, timestamps, variables = [], [], [], [], []
+    for trial_id in range(start, stop):
+        # A few trials at the end are still in progress.
+        state = "finished" if trial_id < stop - 8 else ("running" if trial_id % 2 == 0 else "ready")
+        trials.append({"trial_id": trial_id, "state": state})
+        for param in _params(rng):
+            params.append(
+                {
+                    "trial_id": trial_id,
+                    "param_name": param["parameter_name"],
+                    "param_type": param["type"],
+                    **typed_value_columns(param["value"]),
+                }
+            )
+        if state == "finished":
+            objective = float(rng.standard_normal())
+            results.append(
+                {"trial_id": trial_id, "objective_index": 0, "data_type": str(float), **typed_value_columns(objective)}
+            )
+            timestamps.append({"trial_id": trial_id, "start_time": "01/01/2023 00:00:00", "end_time": None})
+        variables.append(
+            {"trial_id": trial_id, "process_name": PROCESS_NAME, "label": LABEL, "value": _state(trial_id)}
+        )
+
+    with storage.trial.engine.begin() as conn:
+        for table, rows in (
+            (TrialTable, trials),
+            (HpTable, params),
+            (ResultTable, results),
+            (TimestampTable, timestamps),
+            (VariableTable, variables),
+        ):
+            if len(rows) > 0:
+                conn.execute(insert(table), rows)
+        for sql in REBUILD_BEST_VALUE_SQL:
+            conn.execute(text(sql))
+
+
+def open_storage(storage_file_path: Path, backend: str) -> Storage:
+    storage = Storage(storage_file_path, backend=backend)
+    storage.variable.register(process_name=PROCESS_NAME, labels=[LABEL])
+    return storage
+
+
+def _operation(storage: Storage, operation: str, num_trials: int) -> Callable[[int], Any]:
+    if operation == "get_any_trial_params":
+        return lambda trial_id: storage.hp.get_any_trial_params(trial_id % num_trials)
+    if operation == "get_num_running_ready_finished":
+        return lambda _: storage.get_num_running_ready_finished()
+    if operation == "get_hp_dict":
+        return lambda trial_id: storage.get_hp_dict(trial_id % num_trials)
+    if operation == "get_best_trial":
+        return lambda _: storage.get_best_trial(["minimize"])
+    if operation == "serializer_get":
+        return lambda trial_id: storage.variable.d[LABEL].get(trial_id % num_trials)
+    if operation == "set_any_trial_params":
+        rng = np.random.RandomState(num_trials)
+        return lambda trial_id: storage.hp.set_any_trial_params(trial_id, _params(rng))
+    if operation == "serializer_set":
+        return lambda trial_id: storage.variable.d[LABEL].set(trial_id, _state(trial_id))
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def _time_calls(func: Callable[[int], Any], trial_ids: list[int]) -> list[float]:
+    latencies = []
+    for trial_id in trial_ids:
+        start = time.perf_counter()
+        func(trial_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _write_worker(args: tuple[str, str, str, int, list[int]]) -> list[float]:
+    storage_file_path, backend, operation, num_trials, trial_ids = args
+    storage = open_storage(Path(storage_file_path), backend)
+    try:
+        return _time_calls(_operation(storage, operation, num_trials), trial_ids)
+    finally:
+        storage.close()
+
+
+def _background_writer(storage_file_path: str, backend: str, first_trial_id: int, stop: Any) -> None:
+    storage = open_storage(Path(storage_file_path), backend)
+    trial_id = first_trial_id
+    while not stop.is_set():
+        storage.variable.d[LABEL].set(trial_id, _state(trial_id))
+        trial_id += 1
+    storage.close()
+
+
+def _summarize(
+    operation: str, num_trials: int, num_writers: int, backend: str, latencies: list[float], wall_time: float
+) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "operation": operation,
+        "num_trials": num_trials,
+        "num_writers": num_writers,
+        "backend": backend,
+        "repeat": len(latencies),
+        "mean": statistics.mean(latencies),
+        "median": statistics.median(latencies),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "min": ordered[0],
+        "max": ordered[-1],
+        "ops_per_sec": len(latencies) / wall_time if wall_time > 0 else float("inf"),
+    }
+
+
+def run_case(
+    storage: Storage,
+    operation: str,
+    num_trials: int,
+    num_writers: int,
+    repeat: int,
+    next_trial_id: int,
+    backend: str = "sqlite",
+) -> dict[str, Any]:
+    """Times one operation.
+
+    Args:
+        storage (Storage): A storage populated with num_trials trials.
+        operation (str): One of OPERATIONS.
+        num_trials (int): The number of populated trials.
+        num_writers (int): The number of processes writing concurrently.
+        repeat (int): The number of calls per process. A tenth of it (at
+            least one) for delete_trial_data_after_this, which is far slower.
+        next_trial_id (int): The first unused trial id for new trials.
+        backend (str, optional): The backend of the storage. Defaults to
+            'sqlite'.
+
+    Returns:
+        dict[str, Any]: The latency statistics in seconds and the throughput.
+    """
+    storage_file_path = str(storage.db_path)
+    ctx = multiprocessing.get_context()
+
+    if operation in WRITE_OPERATIONS and num_writers > 1:
+        chunks = [
+            (
+                storage_file_path,
+                backend,
+                operation,
+                num_trials,
+                list(range(next_trial_id + i * repeat, next_trial_id + (i + 1) * repeat)),
+            )
+            for i in range(num_writers)
+        ]
+        with ctx.Pool(num_writers) as pool:
+            start = time.perf_counter()
+            latencies = [latency for chunk in pool.map(_write_worker, chunks) for latency in chunk]
+            wall_time = time.perf_counter() - start
+        return _summarize(operation, num_trials, num_writers, backend, latencies, wall_time)
+
+    stop = ctx.Event()
+    writers = [
+        ctx.Process(
+            target=_background_writer,
+            args=(storage_file_path, backend, BACKGROUND_TRIAL_ID + i * 10**6, stop),
+        )
+        for i in range(num_writers - 1)
+    ]
+    for writer in writers:
+        writer.start()
+    try:
+        if operation == "delete_trial_data_after_this":
+            latencies = []
+            wall_time = 0.0
+            first_deleted = num_trials - NUM_DELETED_TRIALS
+            for _ in range(max(1, repeat // 10)):
+                start = time.perf_counter()
+                storage.delete_trial_data_after_this(first_deleted - 1)
+                latencies.append(time.perf_counter() - start)
+                wall_time += latencies[-1]
+                populate(storage, first_deleted, num_trials)
+        else:
+            if operation in WRITE_OPERATIONS:
+                trial_ids = list(range(next_trial_id, next_trial_id + repeat))
+            else:
+                trial_ids = [int(i) for i in np.random.RandomState(0).randint(0, num_trials, repeat)]
+            start = time.perf_counter()
+            latencies = _time_calls(_operation(storage, operation, num_trials), trial_ids)
+            wall_time = time.perf_counter() - start
+    finally:
+        stop.set()
+        for writer in writers:
+            writer.join()
+    return _summarize(operation, num_trials, num_writers, backend, latencies, wall_time)
+
+
+def run_benchmarks(
+    num_trials_list: list[int],
+    num_writers_list: list[int],
+    operations: list[str],
+    repeat: int,
+    backend: str = "sqlite",
+    work_dir: Path | None = None,
+) -> dict[str, Any]:
+    """Runs the benchmarks.
+
+    Args:
+        num_trials_list (list[int]): Numbers of trials in the storage.
+        num_writers_list (list[int]): Numbers of concurrent writers.
+        operations (list[str]): Operations to time.
+        repeat (int): The number of calls per case and process.
+        backend (str, optional): The storage backend. Defaults to 'sqlite'.
+        work_dir (Path | None, optional): Directory for the storage files.
+            Defaults to None (a temporary directory).
+
+    Returns:
+        dict[str, Any]: The environment and the results of all cases.
+
+    Raises:
+        ValueError: Causes when concurrent writers are requested for an
+            in-memory backend, which other processes cannot write to.
+    """
+    if backend != "sqlite" and max(num_writers_list) > 1:
+        raise ValueError(f"The {backend} backend does not support concurrent writers.")
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for num_trials in num_trials_list:
+            storage_file_path = Path(tmp_dir) / f"storage_{num_trials}.db"
+            storage = open_storage(storage_file_path, backend)
+            populate(storage, 0, num_trials)
+            next_trial_id = num_trials
+            for num_writers in num_writers_list:
+                for operation in operations:
+                    results.append(
+                        run_case(storage, operation, num_trials, num_writers, repeat, next_trial_id, backend)
+                    )
+                    if operation in WRITE_OPERATIONS:
+                        next_trial_id += num_writers * repeat
+            storage.close()
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def _key(result: dict[str, Any]) -> tuple[str, int, int, str]:
+    return (result["operation"], result["num_trials"], result["num_writers"], result["backend"])
+
+
+def find_regressions(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float = 1.5, min_delta: float = 1e-4
+) -> list[dict[str, Any]]:
+    """Compares the median latencies with a baseline.
+
+    Args:
+        results (dict[str, Any]): The return value of run_benchmarks().
+        baseline (dict[str, Any]): The results of an earlier run.
+        threshold (float, optional): The ratio to the baseline median above
+            which a case is a regression. Defaults to 1.5.
+        min_delta (float, optional): Differences below this many seconds are
+            ignored as noise. Defaults to 1e-4.
+
+    Returns:
+        list[dict[str, Any]]: The regressed cases with their baseline median
+        and ratio. Cases missing from the baseline are skipped.
+    """
+    baseline_by_key = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        base = baseline_by_key.get(_key(result))
+        if base is None:
+            continue
+        if result["median"] > base["median"] * threshold and result["median"] - base["median"] > min_delta:
+            regressions.append(
+                {**result, "baseline_median": base["median"], "ratio": result["median"] / base["median"]}
+            )
+    return regressions
+
+
+def format_results(results: dict[str, Any]) -> str:
+    lines = [
+        f"{'operation':<32}{'trials':>8}{'writers':>8}{'median[ms]':>12}{'p95[ms]':>12}{'ops/s':>12}",
+    ]
+    for r in results["results"]:
+        lines.append(
+            f"{r['operation']:<32}{r['num_trials']:>8}{r['num_writers']:>8}"
+            f"{r['median'] * 1000:>12.3f}{r['p95'] * 1000:>12.3f}{r['ops_per_sec']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description="Micro-benchmarks of aiaccel.storage.")
+    parser.add_argument("--num-trials", type=int, nargs="+", default=NUM_TRIALS)
+    parser.add_argument("--num-writers", type=int, nargs="+", default=NUM_WRITERS)
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--backend", choices=["sqlite", "memory", "journal"], default="sqlite")
+    parser.add_argument("--work-dir", type=Path, default=None)
+    parser.add_argument("--output", type=Path, default=None, help="Write the results as JSON.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare with the results of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--min-delta", type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.num_trials, args.num_writers, args.operations, args.repeat, backend=args.backend, work_dir=args.work_dir
+    )
+    print(format_results(results))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, threshold=args.threshold, min_delta=args.min_delta)
+    for r in regressions:
+        print(
+            f"REGRESSION {r['operation']} trials={r['num_trials']} writers={r['num_writers']}: "
+            f"median {r['median'] * 1000:.3f} ms vs baseline {r['baseline_median'] * 1000:.3f} ms "
+            f"({r['ratio']:.2f}x)",
+            file=sys.stderr,
+        )
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import json
+
+from tests.benchmarks.storage_benchmark import OPERATIONS, find_regressions, main, run_benchmarks
+
+
+def test_run_benchmarks(tmp_path):
+    results = run_benchmarks([20], [1, 2], OPERATIONS, repeat=3, work_dir=tmp_path)
+    assert len(results["results"]) == 2 * len(OPERATIONS)
+    for result in results["results"]:
+        assert result["median"] > 0
+        assert result["ops_per_sec"] > 0
+    assert find_regressions(results, results) == []
+
+    baseline = json.loads(json.dumps(results))
+    for result in baseline["results"]:
+        result["median"] /= 100
+    regressions = find_regressions(results, baseline, threshold=1.5, min_delta=0.0)
+    assert len(regressions) == len(results["results"])
+    assert all(r["ratio"] > 1.5 for r in regressions)
+
+
+def test_main(tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--num-trials", "20", "--num-writers", "1", "--repeat", "2", "--work-dir", str(tmp_path)]
+    assert main(args + ["--operations", "get_best_trial", "--output", str(output)]) == 0
+
+    baseline = json.loads(output.read_text())
+    baseline["results"][0]["median"] = 1e-9
+    output.write_text(json.dumps(baseline))
+    assert main(args + ["--operations", "get_best_trial", "--baseline", str(output), "--min-delta", "0"]) == 1
@@ -0,0 +1,17 @@
+# A stand-in for `qstat -xml` on machines without ABCI.
+#
+#   python fake_qstat.py <xml file> <log file>
+#
+# It prints the XML file as qstat would, and appends a line to the log file
+# per call so tests can count the calls. A missing XML file makes it fail
+# like qstat does when the scheduler cannot be reached.
+import sys
+from pathlib import Path
+
+xml_file, log_file = Path(sys.argv[1]), Path(sys.argv[2])
+with open(log_file, "a") as f:
+    f.write("qstat -xml\n")
+if not xml_file.exists():
+    print("error: failed receiving gdi request", file=sys.stderr)
+    sys.exit(1)
+sys.stdout.write(xml_file.read_text())
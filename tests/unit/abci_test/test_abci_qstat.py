@@ -1,6 +1,7 @@
+import sys
 import xml.etree.ElementTree as ElementTree
 
-from aiaccel.abci import parse_job_list, parse_qstat
+from aiaccel.abci import QstatPoller, iterparse_qstat, parse_job_list, parse_qstat, parse_task_ids
 
 
 def test_parse_qstat(data_dir, load_test_config):
@@ -12,6 +13,26 @@ def test_parse_qstat(data_dir, load_test_config):
 
     stat_list = parse_qstat(xml_string)
     assert type(stat_list) is list
+    assert [stat['job-ID'] for stat in stat_list] == ['4300139', '4300140', '4300141']
+    assert stat_list[0] == {
+        'job-ID': '4300139',
+        'prior': '0.25586',
+        'name': 'run_oL8g5ubbbPIa84yRnBUbHoWC8FJowoRo.sh',
+        'user': 'aca10423ls',
+        'state': 'r',
+        'submit/start at': '2020-10-21T12:52:25.479',
+        'queue': 'gpu@g0004',
+        'jclass': None,
+        'slots': '10',
+        'ja-task-ID': None,
+    }
+
+
+def test_iterparse_qstat(data_dir):
+    with open(data_dir.joinpath('qstat.xml'), 'rb') as f:
+        jobs = iterparse_qstat(f)
+    assert list(jobs.keys()) == [('4300139', None), ('4300140', None), ('4300141', None)]
+    assert jobs[('4300140', None)]['state'] == 'qw'
 
 
 def test_parse_job_list(data_dir, load_test_config):
@@ -27,3 +48,117 @@ def test_parse_job_list(data_dir, load_test_config):
         parse_job_list(i)
 
     assert parse_job_list('') == []
+
+
+def test_parse_array_job():
+    xml_string = """<?xml version='1.0'?>
+<job_info>
+    <queue_info>
+        <job_list state="running">
+            <JB_job_number>4300150</JB_job_number>
+            <JB_name>array_0.sh</JB_name>
+            <state>r</state>
+            <tasks>1</tasks>
+        </job_list>
+    </queue_info>
+    <job_info>
+        <job_list state="pending">
+            <JB_job_number>4300150</JB_job_number>
+            <JB_name>array_0.sh</JB_name>
+            <state>qw</state>
+            <tasks>2-4:1</tasks>
+        </job_list>
+    </job_info>
+</job_info>
+"""
+    stat_list = parse_qstat(xml_string)
+    assert [stat['ja-task-ID'] for stat in stat_list] == ['1', '2-4:1']
+    assert [stat['state'] for stat in stat_list] == ['r', 'qw']
+
+
+def test_parse_task_ids():
+    assert parse_task_ids(None) == []
+    assert parse_task_ids('') == []
+    assert parse_task_ids('3') == [3]
+    assert parse_task_ids('2-5:1') == [2, 3, 4, 5]
+    assert parse_task_ids('1-7:3') == [1, 4, 7]
+    assert parse_task_ids('1,4-6:1') == [1, 4, 5, 6]
+
+
+def test_qstat_poller(data_dir, tmp_path):
+    xml_file = tmp_path / 'qstat.xml'
+    log_file = tmp_path / 'qstat.log'
+    xml_string = data_dir.joinpath('qstat.xml').read_text()
+    xml_file.write_text(xml_string)
+    command = [sys.executable, str(data_dir.joinpath('fake_qstat.py')), str(xml_file), str(log_file)]
+
+    def num_calls():
+        return len(log_file.read_text().splitlines())
+
+    poller = QstatPoller(60.0, command)
+    diff = poller.poll()
+    assert [stat['job-ID'] for stat in diff.added] == ['4300139', '4300140', '4300141']
+    assert diff.changed == [] and diff.removed == []
+    assert len(poller.jobs) == 3
+
+    # The jobs are served from the previous run until the interval has
+    # passed.
+    assert poller.poll() is None
+    assert num_calls() == 1
+    assert len(poller.jobs) == 3
+
+    # 4300140 starts running, and 4300141 leaves the queue.
+    root = ElementTree.fromstring(xml_string)
+    job_info = root.find('./job_info')
+    for job_list in job_info.findall('job_list'):
+        if job_list.find('JB_job_number').text == '4300141':
+            job_info.remove(job_list)
+        else:
+            job_list.find('state').text = 'r'
+    xml_file.write_bytes(ElementTree.tostring(root))
+    diff = poller.poll(force=True)
+    assert num_calls() == 2
+    assert diff.added == []
+    assert [(stat['job-ID'], stat['state']) for stat in diff.changed] == [('4300140', 'r')]
+    assert [stat['job-ID'] for stat in diff.removed] == ['4300141']
+    assert set(poller.jobs.keys()) == {('4300139', None), ('4300140', None)}
+
+    # A failed run keeps the jobs.
+    xml_file.unlink()
+    poller.min_interval = 0.0
+    assert poller.poll() is None
+    assert num_calls() == 3
+    assert set(poller.jobs.keys()) == {('4300139', None), ('4300140', None)}
+
+
+def test_qstat_poller_array_job(tmp_path, data_dir):
+    xml_file = tmp_path / 'qstat.xml'
+    log_file = tmp_path / 'qstat.log'
+    command = [sys.executable, str(data_dir.joinpath('fake_qstat.py')), str(xml_file), str(log_file)]
+    job_list = (
+        '<job_list state="{state}"><JB_job_number>4300150</JB_job_number>'
+        '<JB_name>array_0.sh</JB_name><state>{state}</state><tasks>{tasks}</tasks></job_list>'
+    )
+
+    def write_qstat(running, pending):
+        jobs = [job_list.format(state='r', tasks=task) for task in running]
+        if pending is not None:
+            jobs.append(job_list.format(state='qw', tasks=pending))
+        xml_file.write_text(f"<job_info><queue_info>{''.join(jobs)}</queue_info></job_info>")
+
+    poller = QstatPoller(0.0, command)
+    write_qstat([], '1-4:1')
+    assert [stat['ja-task-ID'] for stat in poller.poll().added] == ['1-4:1']
+
+    # Task 1 starts. The pending range shrinks, but it is the same entry.
+    write_qstat(['1'], '2-4:1')
+    diff = poller.poll()
+    assert [stat['ja-task-ID'] for stat in diff.added] == ['1']
+    assert diff.changed == [] and diff.removed == []
+    assert poller.jobs[('4300150', None)]['ja-task-ID'] == '2-4:1'
+
+    # Task 1 finishes, and the last pending tasks start.
+    write_qstat(['2', '3', '4'], None)
+    diff = poller.poll()
+    assert [stat['ja-task-ID'] for stat in diff.added] == ['2', '3', '4']
+    assert [stat['ja-task-ID'] for stat in diff.removed] == ['1', '2-4:1']
@@ -43,6 +43,11 @@ def test_create_qsub_command(load_test_config):
         command_tmp.insert(-1, cmd)
     assert create_qsub_command(tmp_config, optimizer_file) == command_tmp
 
+    command_tmp = command.copy()
+    for cmd in ['-t', '1-5', 'aaa', 'bbb']:
+        command_tmp.insert(-1, cmd)
+    assert create_qsub_command(tmp_config, optimizer_file, num_tasks=5) == command_tmp
+
     # tmp_config.ABCI.job_execution_options = ['aaa bbb']
     # command_tmp = command.copy()
     # for option in ['aaa bbb']:
@@ -12,7 +12,8 @@ from aiaccel.common import (
     goal_minimize,
 )
 from aiaccel.config import ResourceType
-from aiaccel.manager import CustomMachine, Job, LocalModel, LocalManager, create_manager
+from aiaccel.manager import AbstractModel, CustomMachine, Job, JobState, LocalModel, LocalManager, create_manager
+from aiaccel.manager.job.job import JOB_TRANSITION_TABLE
 from aiaccel.util.process import OutputHandler
 from tests.base_test import BaseTest
 from aiaccel.optimizer import create_optimizer
@@ -85,3 +86,76 @@ class TestJob(BaseTest):
 
     def test_get_state_name(self, database_remove):
         assert self.job.get_state_name() == 'ready'
+
+    def test_trigger(self, database_remove):
+        class Model(AbstractModel):
+            def __init__(self):
+                self.finished = False
+                self.called = []
+
+            def before_running(self, obj):
+                self.called.append(('before_running', obj.get_state_name()))
+
+            def after_running(self, obj):
+                self.called.append(('after_running', obj.get_state_name()))
+
+            def conditions_job_finished(self, obj):
+                return self.finished
+
+            def before_finished(self, obj):
+                ...
+
+            def after_finished(self, obj):
+                ...
+
+        model = Model()
+        job = Job(self.job.config, self.job.manager, model, 2)
+        assert job.state is JobState.ready
+        assert model.next_state(job)
+        assert model.called == [('before_running', 'ready'), ('after_running', 'running')]
+        assert not model.next_state(job)
+        assert job.state is JobState.running
+        model.finished = True
+        assert model.next_state(job)
+        assert model.next_state(job)
+        assert job.get_state_name() == 'success'
+        with pytest.raises(ValueError):
+            model.next_state(job)
+
+        job.set_state('running')
+        assert model.expire(job)
+        assert job.state is JobState.failure
+
+    def test_transition_table(self):
+        assert set(JOB_TRANSITION_TABLE['timeout']) == {JobState.ready, JobState.running, JobState.finished}
+        finished, pruned = JOB_TRANSITION_TABLE['next_state'][JobState.running]
+        assert finished.dest is JobState.finished
+        assert finished.conditions == 'conditions_job_finished'
+        assert pruned.dest is JobState.pruned
+        assert pruned.conditions == 'conditions_job_pruned'
+
+    def test_pruned(self, database_remove):
+        class Model(AbstractModel):
+            def __init__(self):
+                self.stopped = False
+
+            def conditions_job_finished(self, obj):
+                return False
+
+            def conditions_job_pruned(self, obj):
+                return True
+
+            def stop_job(self, obj):
+                self.stopped = True
+
+        model = Model()
+        job = Job(self.job.config, self.job.manager, model, 1)
+        job.storage.intermediate.set_any_trial_intermediate(1, 0, 3.0)
+        job.storage.intermediate.set_any_trial_intermediate(1, 1, 2.0)
+        assert model.next_state(job)
+        assert model.next_state(job)
+        assert job.state is JobState.pruned
+        assert model.stopped
+        assert job.storage.result.get_any_trial_objective(1) == [2.0]
+        assert job.storage.jobstate.get_any_trial_jobstate(1) == 'pruned'
+        assert job.storage.trial.get_any_trial_state(1) == 'finished'
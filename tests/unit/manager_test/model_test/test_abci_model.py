@@ -105,3 +105,8 @@ class TestModel(BaseTest):
             'start_time': '11/03/2020 16:07:40',
             'end_time': '11/03/2020 16:07:40'
         }
+
+    def test_stop_job(self):
+        self.model.stop_job(self.job)
+        self.model.stop_job(self.job)
+        assert self.manager.trials_to_delete == [0, 0]
@@ -1,8 +1,28 @@
+from unittest.mock import patch
+
 from aiaccel.manager import AbciManager
 from aiaccel.optimizer import create_optimizer
 
 from tests.base_test import BaseTest
 
+QSTAT_XML = """<?xml version='1.0'?>
+<job_info>
+    <queue_info>
+        <job_list state="running">
+            <JB_job_number>100</JB_job_number>
+            <JB_name>run_3.sh</JB_name>
+            <state>r</state>
+        </job_list>
+        <job_list state="running">
+            <JB_job_number>101</JB_job_number>
+            <JB_name>array_4.sh</JB_name>
+            <state>r</state>
+            <tasks>2</tasks>
+        </job_list>
+    </queue_info>
+</job_info>
+"""
+
 
 class TestAbciManager(BaseTest):
 
@@ -16,11 +36,13 @@ class TestAbciManager(BaseTest):
     ):
         database_remove()
         config = self.load_config_for_test(self.configs['config.json'])
+        config.ABCI.qstat_interval = 0
         optimizer = create_optimizer(config.optimize.search_algorithm)(config)
         manager = AbciManager(config, optimizer)
         xml_path = data_dir.joinpath('qstat.xml')
         fake_process.register_subprocess(['qstat', '-xml'], stdout=[])
         assert manager.get_stats() is None
+        assert manager.stats == []
 
         with open(xml_path, 'r') as f:
             xml_string = f.read()
@@ -30,6 +52,13 @@ class TestAbciManager(BaseTest):
             stdout=[xml_string]
         )
         assert manager.get_stats() is None
+        assert [stat['job-ID'] for stat in manager.stats] == ['4300139', '4300140', '4300141']
+
+        # qstat does not run again within the interval.
+        manager.qstat.min_interval = 60
+        assert manager.get_stats() is None
+        assert fake_process.call_count(['qstat', '-xml']) == 2
+        assert len(manager.stats) == 3
 
     def test_parse_trial_id(
         self,
@@ -47,3 +76,76 @@ class TestAbciManager(BaseTest):
         s = {"name": "run_xxxxxx.sh"}
         trial_id = manager.parse_trial_id(s['name'])
         assert trial_id is None
+
+    def test_array_job(
+        self,
+        clean_work_dir,
+        config_json,
+        fake_process,
+        database_remove
+    ):
+        database_remove()
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.resource.num_workers = 5
+        config.ABCI.array_job = True
+        config.ABCI.array_job_size = 2
+        config.ABCI.job_script_preamble = '#!/bin/bash\n#$-l rt_C.small=1'
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = AbciManager(config, optimizer)
+        manager.pre_process()
+        fake_process.register_subprocess(['qsub', fake_process.any()], occurrences=3)
+        # The fake processes have no pipes to read.
+        with patch('aiaccel.manager.abci_manager.OutputHandler'):
+            assert manager.inner_loop_main_process() is True
+
+        # Five trials in three array jobs.
+        assert fake_process.call_count(['qsub', fake_process.any()]) == 3
+        assert manager.trials_to_submit == []
+        assert manager.array_jobs == {'array_0.sh': [0, 1], 'array_2.sh': [2, 3], 'array_4.sh': [4]}
+        qsub_commands = [call for call in fake_process.calls if call[0] == 'qsub']
+        assert all(call[-1].endswith(name) for call, name in zip(qsub_commands, manager.array_jobs))
+        assert [call[call.index('-t') + 1] for call in qsub_commands] == ['1-2', '1-2', '1-1']
+
+        manifest = manager.workspace.get_array_job_manifest_file(2).read_text().splitlines()
+        assert manifest == [str(manager.workspace.get_runner_file(2)), str(manager.workspace.get_runner_file(3))]
+        # The preamble is in the script of the array job, not in those of the
+        # trials.
+        script = manager.workspace.get_array_job_file(2).read_text()
+        assert script.startswith('#!/bin/bash\n#$-l rt_C.small=1\n')
+        assert 'SGE_TASK_ID' in script
+        assert str(manager.workspace.get_array_job_manifest_file(2)) in script
+        assert 'rt_C.small' not in manager.workspace.get_runner_file(3).read_text()
+
+        stats = manager.expand_array_job_stat(
+            {'job-ID': '1', 'name': 'array_2.sh', 'state': 'qw', 'ja-task-ID': '1-2:1'}
+        )
+        assert [(stat['ja-task-ID'], stat['trial_id']) for stat in stats] == [(1, 2), (2, 3)]
+        stat = {'job-ID': '2', 'name': 'run_5.sh', 'state': 'r', 'ja-task-ID': None}
+        assert manager.expand_array_job_stat(stat) == [stat]
+
+    def test_delete_jobs(
+        self,
+        clean_work_dir,
+        config_json,
+        fake_process,
+        database_remove
+    ):
+        database_remove()
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.ABCI.qstat_interval = 60
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = AbciManager(config, optimizer)
+        manager.array_jobs = {'array_4.sh': [4, 5]}
+        fake_process.register_subprocess(['qstat', '-xml'], stdout=[QSTAT_XML])
+        fake_process.register_subprocess(['qdel', '100'])
+        fake_process.register_subprocess(['qdel', '101', '-t', '2'])
+
+        manager.trials_to_delete = [3, 5, 6]
+        manager.delete_jobs()
+
+        # 'qstat' runs regardless of the interval, because the jobs were not
+        # known yet.
+        assert fake_process.call_count(['qstat', '-xml']) == 1
+        assert fake_process.call_count(['qdel', '100']) == 1
+        assert fake_process.call_count(['qdel', '101', '-t', '2']) == 1
+        assert manager.trials_to_delete == []
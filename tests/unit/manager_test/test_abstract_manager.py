@@ -117,7 +117,15 @@ class TestAbstractManager(BaseTest):
             manager = AbstractManager(config, optimizer)
             manager.pre_process()
             setup_hp_ready(1)
-            assert manager.inner_loop_main_process()
+            try:
+                assert manager.inner_loop_main_process()
+            finally:
+                # The trials would otherwise write to the workspace of the
+                # next test.
+                for job in manager.jobs.values():
+                    if job.proc is not None:
+                        job.proc.kill()
+                        job.proc.wait()
 
     def test_serialize(
         self,
@@ -155,17 +163,12 @@ class TestAbstractManager(BaseTest):
         manager = AbstractManager(config, optimizer)
         assert manager.is_error_free() is True
 
-        jobstates = [
-            {'trial_id': 0, 'jobstate': 'failure'}
-        ]
-
-        with patch.object(manager, 'job_status', {1: 'failure'}):
-            with patch.object(manager.storage.jobstate, 'get_all_trial_jobstate', return_value=jobstates):
-                assert manager.is_error_free() is True
-
-        with patch.object(manager, 'job_status', {0: 'failure'}):
-            with patch.object(manager.storage.jobstate, 'get_all_trial_jobstate', return_value=jobstates):
-                assert manager.is_error_free() is False
+        # The job states are not read.
+        with patch.object(manager.storage.jobstate, 'get_all_trial_jobstate') as get_all_trial_jobstate:
+            manager.failed = True
+            assert manager.is_error_free() is False
+        get_all_trial_jobstate.assert_not_called()
+        assert 'failed' not in manager.__getstate__()
 
     def test_resume(self, config_json):
         config = self.load_config_for_test(self.configs['config.json'])
@@ -180,3 +183,26 @@ class TestAbstractManager(BaseTest):
 
         manager.config.resume = None
         assert manager.resume() is None
+
+    def test_write_evaluation_cache(self, database_remove):
+        database_remove()
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.generic.evaluation_cache = str(self.tmpdir_path / 'cache.db')
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = AbstractManager(config, optimizer)
+        params = [{'parameter_name': 'x1', 'type': 'uniform_float', 'value': 0.25}]
+        for trial_id, jobstate in [(0, 'success'), (1, 'failure'), (2, 'pruned')]:
+            manager.storage.hp.set_any_trial_params(trial_id=trial_id, params=[{**params[0], 'value': trial_id}])
+            manager.storage.set_any_trial_result(trial_id, [float(trial_id)], returncode=0)
+            manager.storage.jobstate.set_any_trial_jobstate(trial_id=trial_id, state=jobstate)
+            manager.storage.trial.set_any_trial_state(trial_id=trial_id, state='finished')
+        assert manager.trials_to_cache == {0, 1, 2}
+
+        cache = optimizer.evaluation_cache
+        with patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            manager.write_evaluation_cache()
+        set_many.assert_called_once()
+        assert manager.trials_to_cache == set()
+        assert optimizer.evaluation_cache.get([{**params[0], 'value': 0}]) == [0.0]
+        assert optimizer.evaluation_cache.get([{**params[0], 'value': 1}]) is None
+        assert optimizer.evaluation_cache.get([{**params[0], 'value': 2}]) is None
@@ -0,0 +1,111 @@
+import sys
+
+from aiaccel.manager import AsyncLocalManager
+from aiaccel.optimizer import create_optimizer
+from tests.base_test import BaseTest
+
+OBJECTIVE = """
+import sys
+print(sum(float(arg.split("=")[1]) for arg in sys.argv if arg.startswith("--x")))
+"""
+
+FAILURE = """
+import sys
+print(0.0)
+sys.exit(1)
+"""
+
+NO_OBJECTIVE = """
+pass
+"""
+
+SLEEP = """
+import time
+time.sleep(60)
+"""
+
+
+class TestAsyncLocalManager(BaseTest):
+
+    def create_manager(self, script, **generic):
+        script_path = self.tmpdir_path / 'async_main.py'
+        script_path.write_text(script)
+        config = self.load_config_for_test(self.configs['config_random.json'])
+        config.generic.job_command = f'{sys.executable} {script_path}'
+        for key, value in generic.items():
+            config.generic[key] = value
+        config.optimize.trial_number = 4
+        config.resource.num_workers = 2
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = AsyncLocalManager(config, optimizer)
+        manager.pre_process()
+        return manager
+
+    def run_manager(self, manager):
+        for _ in range(1000):
+            if not manager.inner_loop_main_process():
+                break
+            manager.wait_for_events(timeout=1)
+        manager.post_process()
+
+    def test_run(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_manager(OBJECTIVE)
+        self.run_manager(manager)
+
+        assert manager.storage.get_num_finished() == 4
+        assert manager.failed is False
+        for trial_id in range(4):
+            objective = manager.storage.result.get_any_trial_objective(trial_id)
+            params = manager.storage.hp.get_any_trial_params(trial_id)
+            assert objective[0] == sum(float(param.param_value) for param in params)
+            assert manager.storage.returncode.get_any_trial_returncode(trial_id) == 0
+            assert manager.storage.jobstate.get_any_trial_jobstate(trial_id) == 'success'
+            assert manager.storage.timestamp.get_any_trial_end_time(trial_id) is not None
+
+    def test_timeout(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_manager(SLEEP, batch_job_timeout=1)
+        self.run_manager(manager)
+
+        assert manager.failed is True
+        # The trials start together, so any of them may time out first.
+        states = [manager.storage.trial.get_any_trial_state(trial_id) for trial_id in range(4)]
+        assert 'timeout' in states
+
+    def test_failure(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_manager(FAILURE)
+        self.run_manager(manager)
+
+        assert manager.failed is True
+        assert manager.is_error_free() is False
+        assert 'failure' in [manager.storage.jobstate.get_any_trial_jobstate(trial_id) for trial_id in range(4)]
+
+    def test_no_objective(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_manager(NO_OBJECTIVE)
+        self.run_manager(manager)
+
+        assert manager.failed is True
+        # The trials whose output has been read are finished as failures
+        # instead of being left running.
+        finished = manager.storage.trial.get_finished()
+        assert len(finished) > 0
+        for trial_id in finished:
+            assert manager.storage.jobstate.get_any_trial_jobstate(trial_id) == 'failure'
+            assert manager.storage.timestamp.get_any_trial_end_time(trial_id) is not None
+
+    def test_write_error(self, clean_work_dir, database_remove, monkeypatch):
+        database_remove()
+        manager = self.create_manager(OBJECTIVE)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(AsyncLocalManager, '_write_result', fail)
+        self.run_manager(manager)
+
+        assert manager.failed is True
+        assert manager.writer.cancelled()
+        assert manager.storage.get_num_finished() == 0
@@ -1,6 +1,7 @@
 import pytest
 
 from aiaccel.manager import AbciManager
+from aiaccel.manager import AsyncLocalManager
 from aiaccel.manager import LocalManager
 from aiaccel.manager import PylocalManager
 from aiaccel.manager import create_manager
@@ -10,5 +11,6 @@ def test_create():
     assert create_manager('abci') == AbciManager
     assert create_manager('local') == LocalManager
     assert create_manager('python_local') == PylocalManager
+    assert create_manager('async_local') == AsyncLocalManager
     with pytest.raises(ValueError):
         assert create_manager('invalid')
@@ -0,0 +1,40 @@
+import threading
+import time
+
+from aiaccel.manager import EventLoop
+
+
+def test_notify():
+    events = EventLoop()
+    assert events.wait(0) == set()
+
+    events.notify(1)
+    events.notify(2)
+    events.notify()
+    assert events.wait(10) == {1, 2}
+    assert events.wait(0) == set()
+
+    # Wakes up a waiting thread at once.
+    threading.Timer(0.05, events.notify, args=(3,)).start()
+    start = time.monotonic()
+    assert events.wait(10) == {3}
+    assert time.monotonic() - start < 5
+    events.close()
+
+
+def test_timers():
+    events = EventLoop()
+    events.call_later(0.05, 1)
+    cancelled = events.call_later(0.01, 2)
+    cancelled.cancel()
+    events.call_later(10, 3)
+
+    start = time.monotonic()
+    assert events.wait() == {1}
+    assert 0.04 < time.monotonic() - start < 5
+
+    # Times out before the next deadline.
+    start = time.monotonic()
+    assert events.wait(0.05) == set()
+    assert time.monotonic() - start >= 0.04
+    events.close()
@@ -1,33 +1,42 @@
+import os
+import subprocess
+import sys
+
 from aiaccel.manager import Job, LocalManager
 from aiaccel.optimizer import create_optimizer
+from aiaccel.storage import EvaluationCache
+from aiaccel.util import CoreAllocator
 
 from tests.base_test import BaseTest
 
 
 class TestLocalManager(BaseTest):
 
-    def test_get_stats(self, clean_work_dir, config_json, fake_process):
+    def test_get_stats(self, clean_work_dir, config_json):
         config = self.load_config_for_test(self.configs['config.json'])
         optimizer = create_optimizer(config.optimize.search_algorithm)(config)
         manager = LocalManager(config, optimizer)
-        fake_process.register_subprocess(
-            ['/bin/ps', '-eo', 'pid,user,stat,lstart,args'],
-            stdout=[
-                "PID ARGS                          USER          STAT "
-                "STARTED\n"
-                # "1   python wrapper.py -i sample1  root          Ss   Mon Oct "
-                "1   python wrapper.py --trial_id 1  root          Ss   Mon Oct "
-                "10 00:00:00 2020\n"
-                # "2   python wrapper.py -i sample2  root          Ss   Mon Oct "
-                "2   python wrapper.py --trial_id 2  root          Ss   Mon Oct "
-                "10 00:00:10 2020\n"
-            ]
-        )
+        assert manager.get_stats() is None
+        assert manager.stats == []
 
-        trial_id = 1
-        job = Job(config, manager, manager.create_model(), trial_id)
-        manager.jobs.append(job)
+        proc = subprocess.Popen(
+            [sys.executable, '-c', 'import time; print(flush=True); time.sleep(60)', '--trial_id=1'],
+            stdout=subprocess.PIPE,
+        )
+        try:
+            # The command line is that of the child once it prints.
+            proc.stdout.readline()
+            manager.process_registry.register(1, proc.pid)
+            assert manager.get_stats() is None
+            assert [stat['trial_id'] for stat in manager.stats] == [1]
+            assert manager.stats[0]['job-ID'] == proc.pid
+            assert int(manager.parse_trial_id(manager.stats[0]['name'])) == 1
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
         assert manager.get_stats() is None
+        assert manager.stats == []
 
     def test_parse_trial_id(self, config_json, database_remove):
         database_remove()
@@ -37,3 +46,74 @@ class TestLocalManager(BaseTest):
         s = {"name": "2 python user.py --trial_id=5 --config=config.yaml --x1=1.0 --x2=1.0"}
         trial_id = int(manager.parse_trial_id(s['name']))
         assert trial_id == 5
+
+    def test_cores_per_trial(self, config_json, database_remove):
+        database_remove()
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.resource.cores_per_trial = 1
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = LocalManager(config, optimizer)
+        manager.core_allocator = CoreAllocator(1, numa_nodes=[[0, 1]], total_memory=16)
+        manager.num_workers = 4
+        manager.trial_number = 10
+        assert manager.get_available_pool_size(0, 0, 0) == 2
+        assert manager.get_available_pool_size(1, 0, 0) == 1
+        manager.core_allocator.allocate(0)
+        manager.core_allocator.allocate(1)
+        assert manager.get_available_pool_size(0, 2, 0) == 0
+
+    def test_cores_per_trial_affinity(self, clean_work_dir, config_json, database_remove):
+        database_remove()
+        script_path = self.tmpdir_path / 'affinity_main.py'
+        script_path.write_text(
+            'import os\n'
+            'cores = os.sched_getaffinity(0)\n'
+            'print(min(cores) if len(cores) == 1 else -1)\n'
+        )
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.generic.job_command = f'{sys.executable} {script_path}'
+        config.resource.cores_per_trial = 1
+        config.resource.num_workers = 1
+        config.optimize.trial_number = 1
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = LocalManager(config, optimizer)
+        core = max(os.sched_getaffinity(0))
+        manager.core_allocator = CoreAllocator(1, numa_nodes=[[core]], total_memory=16)
+        manager.pre_process()
+        for _ in range(100):
+            if not manager.inner_loop_main_process():
+                break
+            manager.wait_for_events(timeout=1)
+        manager.post_process()
+
+        # The affinity read by the trial itself.
+        assert manager.storage.result.get_any_trial_objective(0) == [core]
+
+    def test_evaluation_cache_last_trials(self, clean_work_dir, config_json, database_remove):
+        database_remove()
+        script_path = self.tmpdir_path / 'cache_main.py'
+        script_path.write_text('print(1.0)\n')
+        config = self.load_config_for_test(self.configs['config.json'])
+        config.generic.job_command = f'{sys.executable} {script_path}'
+        config.generic.evaluation_cache = str(self.tmpdir_path / 'cache.db')
+        config.resource.num_workers = 2
+        config.optimize.trial_number = 2
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        manager = LocalManager(config, optimizer)
+        manager.pre_process()
+        # The main loop exits right after the last trials have finished,
+        # without another main loop.
+        for _ in range(100):
+            if not manager.inner_loop_main_process() or manager.storage.get_num_finished() == 2:
+                break
+            manager.wait_for_events(timeout=1)
+        assert len(manager.trials_to_cache) > 0
+        manager.post_process()
+
+        # The trials of the last main loop are in the cache as well.
+        assert manager.trials_to_cache == set()
+        cache = EvaluationCache(config.generic.evaluation_cache, config.generic.objective_version)
+        for trial_id in range(2):
+            params = manager.storage.hp.get_any_trial_params(trial_id)
+            assert cache.get([{'parameter_name': p.param_name, 'value': p.param_value} for p in params]) == [1.0]
+        cache.close()
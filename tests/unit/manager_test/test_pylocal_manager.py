@@ -1,5 +1,9 @@
 import unittest
 from unittest.mock import MagicMock
+
+import pytest
+from omegaconf import OmegaConf
+
 from aiaccel.manager.pylocal_manager import PylocalManager
 from aiaccel.optimizer import create_optimizer
 from tests.base_test import BaseTest
@@ -13,6 +17,25 @@ class TestPylocalManager(BaseTest):
         manager = PylocalManager(config, optimizer)
         assert manager.__init__(config, optimizer) is None
 
+    def test_pruner_not_supported(self):
+        config = self.load_config_for_test(self.configs['config_pylocal.json'])
+        config.optimize.pruner.type = 'aiaccel.pruner.MedianPruner'
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        with pytest.raises(ValueError):
+            PylocalManager(config, optimizer)
+
+    def test_local_resources_not_supported(self):
+        for name, value in (
+            ("resource.cores_per_trial", 1),
+            ("resource.memory_per_trial", 1.0),
+            ("generic.warm_workers", True),
+        ):
+            config = self.load_config_for_test(self.configs['config_pylocal.json'])
+            OmegaConf.update(config, name, value)
+            optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+            with pytest.raises(ValueError, match=name):
+                PylocalManager(config, optimizer)
+
     def test_inner_loop_main_process(self, setup_hp_ready):
         config = self.load_config_for_test(self.configs['config_pylocal.json'])
         with self.create_main():
@@ -36,3 +59,95 @@ class TestPylocalManager(BaseTest):
             manager.inner_loop_main_process()
             xs = manager.get_any_trial_xs(1)
             assert xs == {'x1': 1.69, 'x2': 2.27, 'x3': 4.38, 'x4': 2.0, 'x5': 3.9, 'x6': 4.62, 'x7': -2.2, 'x8': 4.77, 'x9': -3.66, 'x10': 3.59}
+
+    def test_continuous_dispatch(self, clean_work_dir, database_remove):
+        database_remove()
+        config = self.load_config_for_test(self.configs['config_pylocal.json'])
+        config.optimize.trial_number = 6
+        config.resource.num_workers = 2
+        with self.create_main():
+            optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+            manager = PylocalManager(config, optimizer)
+            manager.pre_process()
+            assert manager.inner_loop_main_process() is True
+            # Trials are submitted without waiting for them.
+            assert len(manager.pending) == 2
+            for _ in range(1000):
+                manager.wait_for_events(timeout=1)
+                if not manager.inner_loop_main_process():
+                    break
+            assert manager.storage.get_num_finished() == 6
+            assert len(manager.pending) == 0
+            for trial_id in range(6):
+                assert manager.storage.result.get_any_trial_objective(trial_id) is not None
+
+    def create_batch_manager(self, source, batch_size, num_workers, trial_number=10):
+        # The pool workers load the configuration and the function from
+        # the files.
+        main_file = self.tmpdir_path / 'batch_main.py'
+        main_file.write_text(source)
+        config = self.load_config_for_test(self.configs['config_pylocal.json'])
+        config.generic.python_file = str(main_file)
+        config.generic.batch_function = True
+        config.generic.batch_size = batch_size
+        config.resource.num_workers = num_workers
+        config.optimize.search_algorithm = 'aiaccel.optimizer.RandomOptimizer'
+        config.optimize.trial_number = trial_number
+        for parameter in config.optimize.parameters:
+            parameter.initial = None
+        config_path = self.tmpdir_path / 'config_batch.yaml'
+        OmegaConf.save(config, config_path)
+        config.config_path = str(config_path)
+        optimizer = create_optimizer(config.optimize.search_algorithm)(config)
+        return PylocalManager(config, optimizer)
+
+    def test_batch_function(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_batch_manager(
+            'import numpy as np\n'
+            '\n'
+            '\n'
+            'def main(p):\n'
+            '    assert isinstance(p["x1"], np.ndarray)\n'
+            '    x = np.stack([p[f"x{i}"] for i in range(1, 11)], axis=1)\n'
+            '    return np.sum(x ** 2, axis=1)\n',
+            batch_size=4,
+            num_workers=2,
+            trial_number=20,
+        )
+        manager.pre_process()
+        assert manager.get_available_pool_size(0, 0, 0) == 8
+        assert manager.get_available_pool_size(0, 0, 16) == 4
+        assert manager.inner_loop_main_process() is True
+        # Two batches of four trials.
+        assert len(manager.pending) == 8
+        assert len(set(manager.pending.values())) == 2
+        for _ in range(1000):
+            manager.wait_for_events(timeout=1)
+            if not manager.inner_loop_main_process():
+                break
+        assert manager.storage.get_num_finished() == 20
+        for trial_id in range(20):
+            xs = manager.get_any_trial_xs(trial_id)
+            objective = manager.storage.result.get_any_trial_objective(trial_id)
+            assert objective == [pytest.approx(sum(x ** 2 for x in xs.values()))]
+        manager.post_process()
+
+    def test_batch_function_error(self, clean_work_dir, database_remove):
+        database_remove()
+        manager = self.create_batch_manager(
+            'import numpy as np\n\n\ndef main(p):\n    return np.zeros(len(p["x1"]) + 1)\n',
+            batch_size=4,
+            num_workers=1,
+        )
+        manager.pre_process()
+        assert manager.inner_loop_main_process() is True
+        for _ in range(100):
+            manager.wait_for_events(timeout=1)
+            if not manager.inner_loop_main_process():
+                break
+        else:
+            assert False
+        assert manager.storage.get_num_finished() == 0
+        assert 'objectives for 4 trials' in manager.workspace.get_error_output_file(0).read_text()
+        manager.post_process()
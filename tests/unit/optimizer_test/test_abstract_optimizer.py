@@ -37,6 +37,35 @@ class TestAbstractOptimizer(BaseTest):
 
         assert self.optimizer.register_new_parameters(params) is None
 
+    def test_register_new_parameters_with_evaluation_cache(self):
+        config = self.load_config_for_test(self.configs["config.json"])
+        config.generic.evaluation_cache = str(self.tmpdir_path / "cache.db")
+        optimizer = AbstractOptimizer(config)
+        optimizer.trial_id.initial(num=0)
+        cached = [
+            {'parameter_name': 'x1', 'type': 'uniform_float', 'value': 0.1},
+            {'parameter_name': 'x2', 'type': 'uniform_float', 'value': 0.1}
+        ]
+        optimizer.evaluation_cache.set(cached, [0.5])
+
+        optimizer.register_new_parameters(cached)
+        optimizer.trial_id.increment()
+        optimizer.register_new_parameters([{**cached[0], 'value': 0.2}, cached[1]])
+        assert optimizer.storage.trial.get_any_trial_state(0) == 'ready'
+        assert 'trials_to_look_up' not in optimizer.__getstate__()
+
+        # The trials are looked up together, and only once.
+        cache = optimizer.evaluation_cache
+        with patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            optimizer.look_up_evaluation_cache()
+            optimizer.look_up_evaluation_cache()
+        get_many.assert_called_once()
+        assert optimizer.storage.trial.get_any_trial_state(0) == 'finished'
+        assert optimizer.storage.result.get_any_trial_objective(0) == [0.5]
+        assert optimizer.storage.jobstate.get_any_trial_jobstate(0) == 'success'
+        assert optimizer.storage.trial.get_any_trial_state(1) == 'ready'
+        assert 'evaluation_cache' not in optimizer.__getstate__()
+
     def test_generate_initial_parameter(self):
         with patch.object(self.optimizer.params, 'sample', return_value=[]):
             assert self.optimizer.generate_initial_parameter() == []
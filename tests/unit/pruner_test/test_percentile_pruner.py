@@ -0,0 +1,63 @@
+import pytest
+
+from aiaccel.pruner import MedianPruner, PercentilePruner, create_pruner
+from aiaccel.storage import Storage
+
+from tests.base_test import BaseTest
+
+
+class TestPercentilePruner(BaseTest):
+
+    @pytest.fixture(autouse=True)
+    def setup_pruner(self, clean_work_dir):
+        self.workspace.create()
+        self.storage = Storage(self.workspace.storage_file_path)
+        self.config = self.load_config_for_test(self.configs['config.json'])
+        self.config.optimize.pruner.n_startup_trials = 2
+        self.config.optimize.pruner.n_warmup_steps = 1
+        yield
+        self.storage = None
+
+    def add_trial(self, trial_id, values, jobstate=None):
+        for step, value in enumerate(values):
+            self.storage.intermediate.set_any_trial_intermediate(trial_id, step, value)
+        if jobstate is not None:
+            self.storage.jobstate.set_any_trial_jobstate(trial_id, jobstate)
+
+    def test_median_pruner(self):
+        pruner = MedianPruner(self.config)
+        self.add_trial(0, [5.0, 4.0, 3.0], 'success')
+        assert not pruner.prune(self.storage, 1)
+
+        self.add_trial(1, [9.0, 9.0])
+        # Not enough succeeded trials.
+        assert not pruner.prune(self.storage, 1)
+
+        self.add_trial(2, [3.0, 2.0, 1.0], 'success')
+        self.add_trial(3, [1.0, 1.0, 1.0], 'pruned')
+        assert pruner.prune(self.storage, 1)
+
+        # Warmup steps.
+        self.add_trial(4, [9.0])
+        assert not pruner.prune(self.storage, 4)
+
+        # The best value of the trial so far is compared.
+        self.add_trial(5, [1.0, 9.0])
+        assert not pruner.prune(self.storage, 5)
+
+    def test_percentile_pruner_maximize(self):
+        self.config.optimize.goal = ['maximize']
+        self.config.optimize.pruner.percentile = 25.0
+        pruner = create_pruner('aiaccel.pruner.PercentilePruner')(self.config)
+        assert isinstance(pruner, PercentilePruner)
+        for trial_id in range(4):
+            self.add_trial(trial_id, [0.0, float(trial_id)], 'success')
+        self.add_trial(4, [0.0, 2.5])
+        self.add_trial(5, [0.0, 1.0])
+        assert not pruner.prune(self.storage, 4)
+        assert pruner.prune(self.storage, 5)
+
+    def test_invalid_percentile(self):
+        self.config.optimize.pruner.percentile = 101
+        with pytest.raises(ValueError):
+            PercentilePruner(self.config)
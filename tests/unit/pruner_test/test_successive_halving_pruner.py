@@ -0,0 +1,103 @@
+from collections import Counter
+
+import pytest
+
+from aiaccel.pruner import HyperbandPruner, SuccessiveHalvingPruner
+from aiaccel.storage import Storage
+
+from tests.base_test import BaseTest
+
+
+class TestSuccessiveHalvingPruner(BaseTest):
+
+    @pytest.fixture(autouse=True)
+    def setup_pruner(self, clean_work_dir):
+        self.workspace.create()
+        self.storage = Storage(self.workspace.storage_file_path)
+        self.config = self.load_config_for_test(self.configs['config.json'])
+        self.config.optimize.pruner.min_resource = 1
+        self.config.optimize.pruner.max_resource = 9
+        self.config.optimize.pruner.reduction_factor = 3
+        yield
+        self.storage = None
+
+    def report(self, trial_id, values):
+        for step, value in values.items():
+            self.storage.intermediate.set_any_trial_intermediate(trial_id, step, value)
+
+    def test_prune(self):
+        pruner = SuccessiveHalvingPruner(self.config)
+        assert pruner.get_rung_step(0, 0) == 1
+        assert pruner.get_rung_step(0, 2) == 9
+
+        # Before the first rung.
+        self.report(0, {0: 5.0})
+        assert not pruner.prune(self.storage, 0)
+        # The first trial at a rung is promoted.
+        self.report(0, {1: 5.0})
+        assert not pruner.prune(self.storage, 0)
+        assert pruner.rungs[0] == 1
+
+        # Only the best of fewer than 2 * reduction_factor trials is promoted.
+        self.report(1, {1: 4.0})
+        assert not pruner.prune(self.storage, 1)
+        self.report(2, {1: 6.0})
+        assert pruner.prune(self.storage, 2)
+        for trial_id, value in [(3, 7.0), (4, 8.0)]:
+            self.report(trial_id, {1: value})
+            assert pruner.prune(self.storage, trial_id)
+        # Now 2 of 6 trials are promoted.
+        self.report(5, {1: 4.5})
+        assert not pruner.prune(self.storage, 5)
+
+        # The rungs passed since the last check are checked in order, with
+        # the first value reported at or after each rung.
+        self.report(0, {2: 4.0, 3: 3.0, 4: 2.0})
+        assert not pruner.prune(self.storage, 0)
+        assert pruner.rungs[0] == 2
+        self.report(1, {4: 3.5})
+        assert pruner.prune(self.storage, 1)
+
+        # No pruning at max_resource.
+        self.report(0, {9: 100.0})
+        assert not pruner.prune(self.storage, 0)
+
+    def test_prune_maximize(self):
+        self.config.optimize.goal = ['maximize']
+        pruner = SuccessiveHalvingPruner(self.config)
+        self.report(0, {1: 1.0})
+        assert not pruner.prune(self.storage, 0)
+        self.report(1, {1: 0.5})
+        assert pruner.prune(self.storage, 1)
+        self.report(2, {1: float('nan')})
+        assert pruner.prune(self.storage, 2)
+
+    def test_invalid_config(self):
+        self.config.optimize.pruner.reduction_factor = 1
+        with pytest.raises(ValueError):
+            SuccessiveHalvingPruner(self.config)
+        self.config.optimize.pruner.reduction_factor = 3
+        self.config.optimize.pruner.max_resource = None
+        SuccessiveHalvingPruner(self.config)
+        with pytest.raises(ValueError):
+            HyperbandPruner(self.config)
+
+    def test_hyperband(self):
+        self.config.optimize.pruner.max_resource = 27
+        pruner = HyperbandPruner(self.config)
+        assert pruner.num_brackets == 4
+        assert pruner.bracket_weights == [27, 12, 6, 4]
+
+        brackets = Counter(pruner.get_bracket(trial_id) for trial_id in range(4900))
+        for bracket, weight in enumerate(pruner.bracket_weights):
+            assert brackets[bracket] == pytest.approx(weight * 100, rel=0.2)
+
+        trial_ids = [trial_id for trial_id in range(100) if pruner.get_bracket(trial_id) == 1]
+        other = next(trial_id for trial_id in range(100) if pruner.get_bracket(trial_id) == 0)
+        assert pruner.get_rung_step(trial_ids[0], 0) == 3
+        # Trials in other brackets are not compared.
+        self.report(other, {3: 0.0})
+        self.report(trial_ids[0], {3: 1.0})
+        assert not pruner.prune(self.storage, trial_ids[0])
+        self.report(trial_ids[1], {3: 2.0})
+        assert pruner.prune(self.storage, trial_ids[1])
@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from aiaccel.storage import Storage, TransactionRolledBackError
+from aiaccel.storage.abstract import Abstract, _engines
+from aiaccel.util.retry import retry_counts
+from tests.unit.storage_test.db.base import get_storage, init, t_base, ws
+
+
+@t_base()
+def test_shared_engine():
+    storage = get_storage()
+    engine = storage.trial.engine
+    assert storage.hp.engine is engine
+    assert storage.result.engine is engine
+
+    storage.variable.register(process_name="optimizer", labels=["state"])
+    assert storage.variable.d["state"].engine is engine
+
+    other = get_storage()
+    assert other.trial.engine is engine
+    assert other.trial.session is storage.trial.session
+
+
+@t_base()
+def test_close():
+    storage = get_storage()
+    key = str(ws.storage_file_path.resolve())
+    shared = _engines[key]
+    ref_count = shared.ref_count
+
+    other = get_storage()
+    assert shared.ref_count > ref_count
+    other.close()
+    assert shared.ref_count == ref_count
+
+    storage.close()
+    assert key not in _engines
+
+
+@t_base()
+def test_recreated_file():
+    storage = get_storage()
+    storage.trial.set_any_trial_state(trial_id=0, state="ready")
+    old_engine = storage.trial.engine
+
+    init()
+    ws.create()
+    storage = Storage(ws.storage_file_path)
+    assert storage.trial.engine is not old_engine
+    assert storage.trial.get_all_trial_id() is None
+
+
+@t_base()
+def test_wal_mode():
+    storage = get_storage()
+    with storage.trial.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() != "wal"
+
+    storage = Storage(ws.storage_file_path, wal_mode=True, busy_timeout=5)
+    storage.trial.set_any_trial_state(trial_id=0, state="ready")
+    with storage.trial.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+    # Storage objects without the option keep the shared WAL engine.
+    other = get_storage()
+    assert other.trial.get_ready() == [0]
+    with other.trial.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+@t_base()
+def test_transaction():
+    storage = get_storage()
+    other = get_storage()
+    commits = []
+    event.listen(storage.trial.engine, "commit", lambda conn: commits.append(conn))
+
+    params = [{"parameter_name": "x1", "type": "uniform_float", "value": 0.5}]
+    with storage.transaction():
+        for trial_id in range(10):
+            storage.hp.set_any_trial_params(trial_id=trial_id, params=params)
+            with other.transaction():
+                other.trial.set_any_trial_state(trial_id=trial_id, state="ready")
+        # Writes are visible inside the unit of work before the commit.
+        assert len(storage.trial.get_ready()) == 10
+        assert commits == []
+    assert len(commits) == 1
+    assert storage.trial.get_ready() == list(range(10))
+    assert storage.hp.get_any_trial_params_dict(9) == {"x1": 0.5}
+
+
+@t_base()
+def test_transaction_rollback():
+    storage = get_storage()
+    storage.trial.set_any_trial_state(trial_id=0, state="ready")
+
+    with pytest.raises(ValueError):
+        with storage.transaction():
+            storage.trial.set_any_trial_state(trial_id=0, state="running")
+            storage.trial.set_any_trial_state(trial_id=1, state="ready")
+            raise ValueError
+    assert storage.trial.get_any_trial_state(0) == "ready"
+    assert storage.trial.get_any_trial_state(1) is None
+
+    # A failed operation discards the unit of work even if it is caught.
+    with pytest.raises(TransactionRolledBackError):
+        with storage.transaction():
+            storage.trial.set_any_trial_state(trial_id=1, state="ready")
+            try:
+                storage.trial.session().rollback()
+            except TransactionRolledBackError:
+                pass
+            storage.trial.set_any_trial_state(trial_id=2, state="ready")
+    assert storage.trial.get_ready() == [0]
+
+
+@t_base()
+def test_transaction_failed_operation_is_not_retried(monkeypatch):
+    storage = get_storage()
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(1)
+        raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+
+    qualname = storage.trial.set_any_trial_state.__qualname__
+    count = retry_counts[qualname]
+    with pytest.raises(TransactionRolledBackError):
+        with storage.transaction():
+            storage.hp.set_any_trial_params(trial_id=0, params=[])
+            monkeypatch.setattr(storage.trial.session(), "add", fail)
+            storage.trial.set_any_trial_state(trial_id=0, state="ready")
+    assert len(calls) == 1
+    assert retry_counts[qualname] == count
+
+
+@t_base()
+def test_transaction_takes_write_lock():
+    storage = get_storage()
+    other = sqlite3.connect(ws.storage_file_path, timeout=0)
+    try:
+        with storage.transaction():
+            # Locked before anything is written.
+            with pytest.raises(sqlite3.OperationalError):
+                other.execute("BEGIN IMMEDIATE")
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+    finally:
+        other.close()
+
+
+@t_base()
+def test_transaction_retries_busy_begin():
+    storage = Storage(ws.storage_file_path, busy_timeout=0.01)
+    other = sqlite3.connect(ws.storage_file_path, timeout=0, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(0.2, other.rollback)
+    count = retry_counts[Abstract._begin.__qualname__]
+    timer.start()
+    try:
+        with storage.transaction():
+            storage.trial.set_any_trial_state(trial_id=0, state="ready")
+    finally:
+        timer.join()
+        other.close()
+    assert retry_counts[Abstract._begin.__qualname__] > count
+    assert storage.trial.get_ready() == [0]
@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+from aiaccel.storage import Storage
+from aiaccel.storage.backend import create_backend, get_journal_file_path
+from tests.unit.storage_test.db.base import t_base, ws
+
+
+def write_trial(storage, trial_id, objective):
+    with storage.transaction():
+        storage.trial.set_any_trial_state(trial_id=trial_id, state="finished")
+        storage.hp.set_any_trial_params(
+            trial_id=trial_id, params=[{"parameter_name": "x1", "type": "uniform_float", "value": 0.5}]
+        )
+        storage.result.set_any_trial_objective(trial_id=trial_id, objective=[objective])
+
+
+@t_base()
+def test_memory_backend():
+    storage = Storage(ws.storage_file_path, backend="memory")
+    write_trial(storage, 0, 1.5)
+    # Accessors opened without a backend share the in-memory database.
+    assert Storage(ws.storage_file_path).result.get_bests(["minimize"]) == [1.5]
+    with pytest.raises(ValueError):
+        Storage(ws.storage_file_path, backend="sqlite")
+    assert not ws.storage_file_path.exists()
+
+    # Without flush_interval the database is written only when flushed or
+    # closed.
+    storage.flush()
+    conn = sqlite3.connect(ws.storage_file_path)
+    assert conn.execute('SELECT trial_id FROM "Trial"').fetchall() == [(0,)]
+    conn.close()
+    write_trial(storage, 1, 0.5)
+    storage.close()
+    conn = sqlite3.connect(ws.storage_file_path)
+    assert conn.execute('SELECT trial_id FROM "Trial"').fetchall() == [(0,), (1,)]
+    conn.close()
+
+
+@t_base()
+def test_memory_backend_read_only():
+    storage = Storage(ws.storage_file_path, backend="memory", flush_interval=0, read_only=True)
+    write_trial(storage, 0, 1.5)
+    storage.flush()
+    storage.close()
+    assert not ws.storage_file_path.exists()
+
+
+@t_base()
+def test_memory_backend_flush():
+    storage = Storage(ws.storage_file_path, backend="memory", flush_interval=3600)
+    write_trial(storage, 0, 1.5)
+    assert not ws.storage_file_path.exists()
+    storage.close()
+
+    conn = sqlite3.connect(ws.storage_file_path)
+    assert conn.execute('SELECT trial_id, state FROM "Trial"').fetchall() == [(0, "finished")]
+    conn.close()
+
+    # The flushed file is loaded when the storage is opened again.
+    storage = Storage(ws.storage_file_path, backend="memory", flush_interval=0)
+    assert storage.get_hp_dict(0)["result"] == [1.5]
+    write_trial(storage, 1, 0.5)
+    assert Storage(ws.storage_file_path).trial.get_finished() == [0, 1]
+    storage.close()
+
+
+@t_base()
+def test_journal_backend():
+    storage = Storage(ws.storage_file_path, backend="journal")
+    write_trial(storage, 0, 1.5)
+    with pytest.raises(ValueError):
+        with storage.transaction():
+            write_trial(storage, 1, 0.5)
+            raise ValueError
+    storage.delete_trial(0)
+    write_trial(storage, 2, 2.5)
+    storage.close()
+    assert not ws.storage_file_path.exists()
+
+    journal_file_path = get_journal_file_path(ws.storage_file_path)
+    with open(journal_file_path, "ab") as f:
+        f.write(b"\x80\x05truncated")
+    journal = journal_file_path.read_bytes()
+
+    # A reader does not touch a record that may still be being appended.
+    storage = Storage(ws.storage_file_path, backend="journal", read_only=True)
+    assert storage.trial.get_all_trial_id() == [2]
+    write_trial(storage, 4, 4.5)
+    storage.close()
+    assert journal_file_path.read_bytes() == journal
+
+    storage = Storage(ws.storage_file_path, backend="journal")
+    assert storage.trial.get_all_trial_id() == [2]
+    assert storage.get_best_trial(["minimize"]) == ([2], [2.5])
+    write_trial(storage, 3, 3.5)
+    storage.close()
+
+    storage = Storage(ws.storage_file_path, backend="journal")
+    assert storage.trial.get_all_trial_id() == [2, 3]
+    storage.close()
+
+
+def test_create_backend():
+    assert create_backend().name == "sqlite"
+    assert create_backend("memory", flush_interval=1.0).flush_interval == 1.0
+    with pytest.raises(ValueError):
+        create_backend("redis")
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+import aiaccel.storage.checkpoint
+from aiaccel.storage import StateStore
+from aiaccel.storage.checkpoint import dumps, loads, msgpack
+from tests.unit.storage_test.db.base import get_storage, t_base
+
+
+def save_trials(store, num_trials):
+    states = {}
+    for trial_id in range(num_trials):
+        state = {
+            "history": [(i, float(i)) for i in range(trial_id + 1)],
+            "ids": {i: str(i) for i in range(trial_id + 1)},
+            "count": trial_id,
+            "name": "tpe",
+        }
+        if trial_id % 2 == 0:
+            state["even"] = trial_id
+        store.save(trial_id, state)
+        states[trial_id] = state
+    return states
+
+
+@t_base()
+def test_snapshot_and_delta():
+    storage = get_storage()
+    store = StateStore(storage.checkpoint, "optimizer", "state", interval=4)
+    states = save_trials(store, 10)
+
+    chain = storage.checkpoint.get_checkpoint_chain(6, "optimizer", "state")
+    assert [(row.trial_id, row.kind) for row in chain] == [(4, "snapshot"), (5, "delta"), (6, "delta")]
+    assert len(chain[2].data) < len(chain[0].data)
+
+    for trial_id in (0, 3, 6, 9):
+        assert StateStore(storage.checkpoint, "optimizer", "state").load(trial_id) == states[trial_id]
+    assert store.load(10) is None
+
+    # After a load the next checkpoint is a snapshot.
+    store.load(5)
+    store.save(6, states[6])
+    assert storage.checkpoint.get_checkpoint_chain(6, "optimizer", "state")[0].kind == "snapshot"
+
+    storage.delete_trial(8)
+    assert store.load(9) is None
+    storage.checkpoint.all_delete()
+    assert store.load(0) is None
+
+
+@t_base()
+def test_unchanged_items_are_not_serialized(monkeypatch):
+    storage = get_storage()
+    store = StateStore(storage.checkpoint, "optimizer", "state", interval=100)
+    store.save(0, {"ids": list(range(1000)), "pool": {i: str(i) for i in range(1000)}, "count": 0})
+
+    dumped = []
+
+    def recording_dumps(obj, serializer):
+        dumped.append(obj)
+        return dumps(obj, serializer)
+
+    monkeypatch.setattr(aiaccel.storage.checkpoint, "dumps", recording_dumps)
+    store.save(1, {"ids": list(range(1002)), "pool": {i: str(i) for i in range(1001)}, "count": 0})
+    assert [1000, 1001] in dumped
+    assert {1000: "1000"} in dumped
+    # The delta itself is dumped with the appended items only.
+    assert all(len(obj) <= 2 for obj in dumped[:-1])
+
+    # Items changed in place and removed items are found without the old data.
+    states = {
+        2: {"ids": list(range(1001)) + [-1], "pool": {i: str(i) for i in range(1001)}, "count": 1},
+        3: {"ids": [0.0] + list(range(1, 1002)), "pool": {i: str(i) for i in range(1, 1001)}},
+        4: {"ids": [0.0] + list(range(1, 1002)) + [[1]], "pool": {0: (1, 2)}},
+        5: {"ids": [0.0] + list(range(1, 1002)) + [[1], [2]], "pool": {0: (1, 2), 1: None}},
+    }
+    for trial_id, state in states.items():
+        store.save(trial_id, state)
+    for trial_id, state in states.items():
+        restored = store.load(trial_id)
+        assert restored == state
+        assert type(restored["ids"][0]) is type(state["ids"][0])
+
+
+@t_base()
+def test_shared_references():
+    storage = get_storage()
+    store = StateStore(storage.checkpoint, "optimizer", "state", interval=100)
+    params = [{"name": "x1"}]
+    store.save(0, {"params": params, "best": params[0], "count": 0})
+    store.save(1, {"params": params, "best": params[0], "count": 1})
+    params[0]["value"] = 0.5
+    store.save(2, {"params": params, "best": params[0], "count": 2})
+
+    # A changed attribute that is not atomic is written in a snapshot.
+    chain = storage.checkpoint.get_checkpoint_chain(2, "optimizer", "state")
+    assert [(row.trial_id, row.kind) for row in chain] == [(2, "snapshot")]
+    for trial_id in (1, 2):
+        restored = store.load(trial_id)
+        assert restored["best"] is restored["params"][0]
+    assert store.load(2)["best"] == {"name": "x1", "value": 0.5}
+
+
+@t_base()
+def test_rolled_back_checkpoint():
+    storage = get_storage()
+    store = StateStore(storage.checkpoint, "optimizer", "state", interval=10)
+    store.save(0, {"a": [1]})
+    with pytest.raises(ValueError):
+        with storage.transaction():
+            store.save(1, {"a": [1, 2]})
+            raise ValueError
+    # The next delta is based on the committed trial 0, not on trial 1.
+    store.save(2, {"a": [1, 2, 3]})
+    assert store.load(2) == {"a": [1, 2, 3]}
+    assert store.load(1) is None
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        StateStore(None, "optimizer", "state", interval=0)
+    with pytest.raises(ValueError):
+        StateStore(None, "optimizer", "state", serializer="json")
+    with pytest.raises(ValueError):
+        dumps(0, "json")
+    with pytest.raises(ValueError):
+        loads(b"", "json")
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+def test_msgpack_serializer():
+    value = {"a": [1, 2.5, "x"], "b": (1, 2), "c": np.arange(3), 1: None}
+    restored = loads(dumps(value, "msgpack"), "msgpack")
+    assert restored["a"] == value["a"]
+    assert restored["b"] == (1, 2)
+    assert np.array_equal(restored["c"], value["c"])
+    assert restored[1] is None
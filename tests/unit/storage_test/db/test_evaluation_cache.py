@@ -0,0 +1,42 @@
+import numpy as np
+
+from aiaccel.storage import EvaluationCache
+
+
+def params(x1, x2, c="a"):
+    return [
+        {"parameter_name": "x1", "type": "uniform_float", "value": x1},
+        {"parameter_name": "x2", "type": "uniform_int", "value": x2},
+        {"parameter_name": "c", "type": "categorical", "value": c},
+    ]
+
+
+def test_evaluation_cache(tmp_path):
+    cache = EvaluationCache(tmp_path / "cache" / "cache.db", "v1")
+    try:
+        assert cache.get(params(0.5, 1)) is None
+        assert cache.set(params(0.5, 1), [1.25]) is None
+        assert cache.get(params(0.5, 1)) == [1.25]
+        # The first result is kept.
+        cache.set(params(0.5, 1), [2.0])
+        assert cache.get(params(0.5, 1)) == [1.25]
+
+        # The key does not depend on the order of the parameters or numpy
+        # scalar types.
+        assert cache.get(list(reversed(params(np.float64(0.5), np.int64(1))))) == [1.25]
+        assert cache.get(params(0.5, 2)) is None
+        assert cache.get(params(0.5, 1, "b")) is None
+
+        cache.set(params(0.0, 0), [1, "x"])
+        assert cache.get(params(0.0, 0)) == [1, "x"]
+    finally:
+        cache.close()
+
+    # Shared by another study with the same objective version only.
+    other = EvaluationCache(tmp_path / "cache" / "cache.db", "v1")
+    assert other.get(params(0.5, 1)) == [1.25]
+    other.close()
+    other = EvaluationCache(tmp_path / "cache" / "cache.db", "v2")
+    assert other.get(params(0.5, 1)) is None
+    assert other.make_key(params(0.5, 1)) != cache.make_key(params(0.5, 1))
+    other.close()
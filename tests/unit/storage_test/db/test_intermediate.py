@@ -0,0 +1,50 @@
+import math
+
+from tests.unit.storage_test.db.base import get_storage, t_base
+
+
+# set_any_trial_intermediate
+@t_base()
+def test_set_any_trial_intermediate():
+    storage = get_storage()
+
+    assert storage.intermediate.set_any_trial_intermediate(0, 0, 1.0) is None
+    assert storage.intermediate.set_any_trial_intermediate(0, 1, 0.5) is None
+    # update
+    assert storage.intermediate.set_any_trial_intermediate(0, 1, 0.25) is None
+    assert storage.intermediate.get_any_trial_intermediates(0) == {0: 1.0, 1: 0.25}
+    assert storage.intermediate.get_any_trial_intermediates(1) == {}
+
+
+# get_intermediates_at_step
+@t_base()
+def test_get_intermediates_at_step():
+    storage = get_storage()
+
+    for trial_id in range(3):
+        for step in range(trial_id + 1):
+            storage.intermediate.set_any_trial_intermediate(trial_id, step, float(trial_id * 10 + step))
+    storage.intermediate.set_any_trial_intermediate(3, 1, float("nan"))
+
+    assert storage.intermediate.get_intermediates_at_step(0) == {0: 0.0, 1: 10.0, 2: 20.0}
+    values = storage.intermediate.get_intermediates_at_step(1)
+    assert values[1] == 11.0
+    assert values[2] == 21.0
+    assert math.isnan(values[3])
+
+
+# delete_any_trial_intermediate
+@t_base()
+def test_delete_any_trial_intermediate():
+    storage = get_storage()
+
+    storage.intermediate.set_any_trial_intermediate(0, 0, 1.0)
+    storage.intermediate.set_any_trial_intermediate(1, 0, 2.0)
+    assert storage.intermediate.delete_any_trial_intermediate(0) is None
+    assert storage.intermediate.get_intermediates_at_step(0) == {1: 2.0}
+    storage.delete_trial(1)
+    assert storage.intermediate.get_intermediates_at_step(0) == {}
+
+    storage.intermediate.set_any_trial_intermediate(2, 0, 1.0)
+    assert storage.intermediate.all_delete() is None
+    assert storage.intermediate.get_any_trial_intermediates(2) == {}
@@ -0,0 +1,121 @@
+import math
+import pickle
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from aiaccel.storage.model import SCHEMA_VERSION, Base
+from tests.unit.storage_test.db.base import get_storage, t_base, ws
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE \"Trial\" (trial_id INTEGER NOT NULL, state TEXT, PRIMARY KEY (trial_id))",
+    "CREATE TABLE trial_params (param_id INTEGER NOT NULL, trial_id INTEGER NOT NULL, param_name VARCHAR(512), "
+    "param_value BLOB, param_type VARCHAR(512), PRIMARY KEY (param_id))",
+    "CREATE TABLE result (trial_id INTEGER NOT NULL, data_type VARCHAR(128), objective BLOB, PRIMARY KEY (trial_id))",
+    "CREATE TABLE variable (data_id INTEGER NOT NULL, trial_id INTEGER NOT NULL, process_name VARCHAR(128) NOT NULL, "
+    "label VARCHAR(128) NOT NULL, value BLOB NOT NULL, PRIMARY KEY (data_id))",
+]
+
+
+def create_legacy_storage():
+    conn = sqlite3.connect(ws.storage_file_path)
+    for sql in LEGACY_SCHEMA:
+        conn.execute(sql)
+    conn.execute("INSERT INTO \"Trial\" VALUES (0, 'finished'), (1, 'finished')")
+    params = [
+        (1, 0, "x1", 0.5, "uniform_float"),
+        (2, 0, "x2", 3, "uniform_int"),
+        (3, 0, "x3", "red", "categorical"),
+        (4, 1, "x1", float("nan"), "uniform_float"),
+    ]
+    conn.executemany(
+        "INSERT INTO trial_params VALUES (?, ?, ?, ?, ?)",
+        [(i, t, n, pickle.dumps(v), ty) for i, t, n, v, ty in params],
+    )
+    conn.executemany(
+        "INSERT INTO result VALUES (?, ?, ?)",
+        [(0, str(list), pickle.dumps([1.5, 2])), (1, str(float), pickle.dumps(0.25))],
+    )
+    conn.commit()
+    conn.close()
+
+
+@t_base()
+def test_migrate_legacy_storage():
+    create_legacy_storage()
+    storage = get_storage()
+
+    assert storage.hp.get_any_trial_params_dict(0) == {"x1": 0.5, "x2": 3, "x3": "red"}
+    assert math.isnan(storage.hp.get_any_trial_params_dict(1)["x1"])
+    assert storage.result.get_any_trial_objective(0) == [1.5, 2]
+    assert storage.result.get_any_trial_objective(1) == 0.25
+    assert storage.trial.get_finished() == [0, 1]
+    assert storage.result.get_bests(["minimize"]) == [0.25]
+    assert storage.get_best_trial(["maximize"]) == (None, None)
+
+    conn = sqlite3.connect(ws.storage_file_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "trial_params_v1" not in tables
+    assert "result_v1" not in tables
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "ix_trial_params_trial_id" in indexes
+    assert "ix_Trial_state" in indexes
+    assert "ix_variable_trial_id_process_name_label" in indexes
+    conn.close()
+
+
+@t_base()
+def test_migrate_pruned_results():
+    # A version 5 file has no pruned column, so pruned trials were counted in
+    # the best values.
+    engine = create_engine(f"sqlite:///{ws.storage_file_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(ws.storage_file_path)
+    conn.execute("ALTER TABLE result DROP COLUMN pruned")
+    conn.executemany(
+        "INSERT INTO result (trial_id, objective_index, data_type, value_type, value_float) "
+        "VALUES (?, 0, ?, 'float', ?)",
+        [(0, str(list), 2.0), (1, str(list), 1.0)],
+    )
+    conn.execute("INSERT INTO job_status (trial_id, state) VALUES (0, 'success'), (1, 'pruned')")
+    conn.execute(
+        "INSERT INTO best_value (objective_index, num_trials, num_invalid, min_value, min_trial_id, max_value, "
+        "max_trial_id) VALUES (0, 2, 0, 1.0, 1, 2.0, 0)"
+    )
+    conn.execute("PRAGMA user_version = 5")
+    conn.commit()
+    conn.close()
+
+    storage = get_storage()
+    assert storage.result.get_any_trial_objective(1) == [1.0]
+    assert storage.result.get_pruned_trial_ids() == [1]
+    assert storage.get_best_trial(["minimize"]) == ([0], [2.0])
+    assert storage.result.get_best_values()[0].num_trials == 1
+
+
+@t_base()
+def test_typed_values():
+    storage = get_storage()
+    storage.hp.set_any_trial_params(
+        trial_id=0,
+        params=[
+            {"parameter_name": "x1", "type": "uniform_float", "value": 0.5},
+            {"parameter_name": "x2", "type": "uniform_int", "value": 2},
+            {"parameter_name": "x3", "type": "categorical", "value": "blue"},
+        ],
+    )
+    assert storage.hp.get_any_trial_params_dict(0) == {"x1": 0.5, "x2": 2, "x3": "blue"}
+
+    conn = sqlite3.connect(ws.storage_file_path)
+    rows = conn.execute(
+        "SELECT typeof(value_float), typeof(value_int), typeof(value_str) FROM trial_params ORDER BY param_id"
+    ).fetchall()
+    assert rows == [("real", "null", "null"), ("null", "integer", "null"), ("null", "null", "text")]
+    conn.close()
+
+    storage.result.set_any_trial_objective(trial_id=0, objective=[0.1, 0.2])
+    assert storage.result.get_any_trial_objective(0) == [0.1, 0.2]
+    storage.result.set_any_trial_objective(trial_id=0, objective=[0.3])
+    assert storage.result.get_any_trial_objective(0) == [0.3]
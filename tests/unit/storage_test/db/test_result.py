@@ -261,3 +261,53 @@ def test_delete_any_trial_objective_exception():
     with pytest.raises(SQLAlchemyError):
         delete_any_trial_objective = undecorated(storage.result.delete_any_trial_objective)
         delete_any_trial_objective(storage.result, trial_id=0)
+
+
+# best values
+@t_base()
+def test_best_values():
+    storage = get_storage()
+    assert storage.result.get_bests(["minimize", "maximize"]) == [float("inf"), float("-inf")]
+
+    objectives = [[3, 1.0], [1, 5.0], [float("nan"), 2.0], [1, 5.0], [4, 0.5]]
+    for trial_id, objective in enumerate(objectives):
+        storage.result.set_any_trial_objective(trial_id=trial_id, objective=objective)
+
+    assert storage.result.get_bests(["minimize", "maximize"]) == [1, 5.0]
+    assert storage.result.get_bests(["maximize", "minimize"]) == [4, 0.5]
+    assert storage.get_best_trial(["minimize", "maximize"]) == ([1, 1], [1, 5.0])
+
+    # Overwriting or deleting the best trial falls back to the next best.
+    storage.result.set_any_trial_objective(trial_id=1, objective=[5, 0.0])
+    assert storage.get_best_trial(["minimize", "minimize"]) == ([3, 1], [1, 0.0])
+    storage.result.delete_any_trial_objective(trial_id=3)
+    assert storage.get_best_trial(["minimize", "maximize"]) == ([0, 2], [3, 2.0])
+    storage.result.delete_any_trial_objective(trial_id=4)
+    assert storage.result.get_best_values()[0].num_trials == 3
+
+    trajectory = storage.result.get_best_trajectory(["minimize", "maximize"])
+    assert trajectory.tolist() == [[3, 1.0], [3, 1.0], [3, 2.0]]
+
+    storage.result.all_delete()
+    assert storage.result.get_best_values() == {}
+
+
+@t_base()
+def test_pruned_result():
+    storage = get_storage()
+    storage.result.set_any_trial_objective(trial_id=0, objective=[3.0])
+    storage.result.set_any_trial_objective(trial_id=1, objective=[1.0], pruned=True)
+    storage.result.set_any_trial_objective(trial_id=2, objective=[2.0])
+
+    # The optimizers still see the last intermediate value as the objective.
+    assert storage.result.get_any_trial_objective(trial_id=1) == [1.0]
+    assert storage.result.get_pruned_trial_ids() == [1]
+    assert storage.get_best_trial(["minimize"]) == ([2], [2.0])
+    assert storage.result.get_best_values()[0].num_trials == 2
+    assert storage.result.get_best_trajectory(["minimize"]).tolist() == [[3.0], [3.0], [2.0]]
+
+    # Neither overwriting nor deleting a pruned result touches the best values.
+    storage.result.set_any_trial_objective(trial_id=1, objective=[0.5], pruned=True)
+    storage.result.delete_any_trial_objective(trial_id=1)
+    assert storage.get_best_trial(["minimize"]) == ([2], [2.0])
+    assert storage.result.get_best_values()[0].num_trials == 2
@@ -447,6 +447,28 @@ def test_get_hp_dict_invalid_type():
         assert exp[key] == d[key]
 
 
+# set_any_trial_result
+@t_base()
+def test_set_any_trial_result():
+    storage = get_storage()
+
+    storage.set_any_trial_result(trial_id=0, objective=[0.5, 1])
+    assert storage.result.get_any_trial_objective(trial_id=0) == [0.5, 1]
+    assert storage.returncode.get_any_trial_returncode(trial_id=0) is None
+
+    storage.set_any_trial_result(
+        trial_id=1,
+        objective=[0.1],
+        returncode=0,
+        start_time="00/00/00:00:00",
+        end_time="11/11/11:11:11"
+    )
+    assert storage.result.get_any_trial_objective(trial_id=1) == [0.1]
+    assert storage.returncode.get_any_trial_returncode(trial_id=1) == 0
+    assert storage.timestamp.get_any_trial_start_time(trial_id=1) == "00/00/00:00:00"
+    assert storage.timestamp.get_any_trial_end_time(trial_id=1) == "11/11/11:11:11"
+
+
 # get_result_and_error
 @t_base()
 def test_get_result_and_error():
@@ -594,3 +616,47 @@ def test_rollback_to_ready():
 
     with patch.object(storage.hp, 'get_any_trial_params', return_value=object):
         assert storage.rollback_to_ready(trial_id=1) is None
+
+
+# get_trials
+@t_base()
+def test_get_trials():
+    storage = get_storage()
+    assert list(storage.get_trials()) == []
+
+    with storage.transaction():
+        for trial_id in range(7):
+            storage.hp.set_any_trial_param(
+                trial_id=trial_id, param_name="x1", param_value=trial_id * 0.5, param_type="uniform_float"
+            )
+            storage.trial.set_any_trial_state(trial_id=trial_id, state="finished" if trial_id < 5 else "ready")
+            if trial_id < 5:
+                storage.result.set_any_trial_objective(trial_id=trial_id, objective=[trial_id * 0.1])
+                storage.timestamp.set_any_trial_start_time_and_end_time(trial_id, "00:00", "11:11")
+                storage.jobstate.set_any_trial_jobstate(trial_id=trial_id, state="Success")
+        storage.error.set_any_trial_error(trial_id=3, error_message="error")
+
+    records = list(storage.get_trials(batch_size=2))
+    assert [r["trial_id"] for r in records] == list(range(7))
+    assert records[3] == {
+        "trial_id": 3,
+        "parameters": [{"parameter_name": "x1", "type": "uniform_float", "value": 1.5}],
+        "result": [0.30000000000000004],
+        "start_time": "00:00",
+        "end_time": "11:11",
+        "error": "error",
+        "state": "finished",
+        "jobstate": "Success",
+    }
+    assert records[6]["result"] is None
+    assert records[6]["start_time"] is None
+
+    assert [r["trial_id"] for r in storage.get_trials(range(2, 6), batch_size=3)] == [2, 3, 4, 5]
+    assert [r["trial_id"] for r in storage.get_trials(state="ready")] == [5, 6]
+    assert [r["trial_id"] for r in storage.get_trials([6, 1, 10], batch_size=2)] == [6, 1]
+    assert [r["trial_id"] for r in storage.get_trials([6, 1], state="finished")] == [1]
+
+    for trial_id in range(7):
+        expected = storage.get_hp_dict(trial_id)
+        record = records[trial_id]
+        assert {key: record[key] for key in expected.keys()} == expected
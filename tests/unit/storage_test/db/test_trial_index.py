@@ -0,0 +1,56 @@
+import pytest
+
+from aiaccel.storage.trial_index import TrialStateIndex
+from tests.unit.storage_test.db.base import get_storage, t_base
+
+
+def test_trial_state_index():
+    index = TrialStateIndex([(0, "finished"), (1, "ready")])
+    events = []
+    unsubscribe = index.subscribe(lambda *args: events.append(args))
+
+    index.update(2, "ready")
+    index.update(1, "running")
+    index.update(1, "running")
+    assert index.get_trial_ids("ready") == [2]
+    assert index.count("running") == 1
+    assert index.get_state(1) == "running"
+
+    index.update(0, None)
+    assert index.get_all_trial_ids() == [1, 2]
+    assert events == [(2, None, "ready"), (1, "ready", "running"), (0, "finished", None)]
+
+    unsubscribe()
+    index.clear()
+    assert index.get_all_trial_ids() == []
+    assert len(events) == 3
+
+
+@t_base()
+def test_enable_state_index():
+    storage = get_storage()
+    storage.trial.set_any_trial_state(trial_id=0, state="finished")
+    index = storage.trial.enable_state_index()
+    assert get_storage().trial.state_index is index
+    assert storage.trial.get_finished() == [0]
+
+    events = []
+    index.subscribe(lambda *args: events.append(args))
+    storage.trial.set_any_trial_state(trial_id=1, state="ready")
+    assert storage.get_num_running_ready_finished() == (1, 0, 1)
+    assert storage.trial.get_any_trial_state(1) == "ready"
+
+    # Changes reach the index only when they are committed.
+    with pytest.raises(ValueError):
+        with storage.transaction():
+            storage.trial.set_any_trial_state(trial_id=1, state="running")
+            assert storage.trial.get_running() == [1]
+            raise ValueError
+    assert index.get_trial_ids("running") == []
+
+    storage.delete_trial(0)
+    assert storage.trial.get_all_trial_id() == [1]
+    assert events == [(1, None, "ready"), (0, "finished", None)]
+
+    storage.trial.all_delete()
+    assert storage.trial.get_all_trial_id() is None
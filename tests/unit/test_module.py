@@ -58,6 +58,25 @@ class TestAbstractModule(BaseTest):
         self.module.serialize(1)
         assert self.module.deserialize(1) is None
 
+    def test_deserialize_legacy_state(self):
+        self.module._rng = np.random.RandomState(0)
+        self.module.loop_count = 5
+        self.module.storage.variable.d["state"].set(2, self.module)
+        self.module.storage.variable.d["numpy_random_state"].set(2, self.module.get_numpy_random_state())
+        self.module.loop_count = 0
+        self.module.deserialize(2)
+        assert self.module.loop_count == 5
+
+    def test_deserialize_missing_state(self):
+        with pytest.raises(ValueError):
+            self.module.deserialize(3)
+
+    def test_storage_backend(self):
+        config = self.load_config_for_test(self.configs["config.json"])
+        config.generic.storage_backend = "memory"
+        with pytest.raises(ValueError):
+            AbstractModule(config, "abstract")
+
     def test_is_error_free(self):
         assert self.module.is_error_free() is True
 
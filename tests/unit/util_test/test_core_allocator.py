@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from aiaccel.util import CoreAllocator, get_numa_nodes, get_thread_environment, pin_process
+from aiaccel.util.core_allocator import parse_cpu_list
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
+
+
+def test_get_numa_nodes():
+    cpus = os.sched_getaffinity(0)
+    nodes = get_numa_nodes()
+    assert sorted(cpu for node in nodes for cpu in node) == sorted(cpus)
+
+
+def test_allocate():
+    allocator = CoreAllocator(2, numa_nodes=[[0, 1, 2], [3, 4, 5, 6]], total_memory=16)
+    assert allocator.num_slots == 3
+    # The node with the fewest free cores that fit is used first.
+    assert allocator.allocate(0) == [0, 1]
+    assert allocator.allocate(1) == [3, 4]
+    assert allocator.allocate(1) == [3, 4]
+    assert allocator.num_free_slots == 1
+    assert allocator.allocate(2) == [5, 6]
+    assert allocator.allocate(3) is None
+
+    allocator.release(1)
+    allocator.release(1)
+    assert allocator.num_free_slots == 1
+    assert allocator.allocate(4) == [3, 4]
+
+
+def test_allocate_spanning_nodes():
+    allocator = CoreAllocator(3, numa_nodes=[[0, 1], [2, 3]], total_memory=16)
+    assert allocator.allocate(0) == [0, 1, 2]
+    assert allocator.allocate(1) is None
+    allocator.release(0)
+    assert allocator.allocate(1) == [0, 1, 2]
+
+
+def test_memory_per_trial():
+    allocator = CoreAllocator(1, memory_per_trial=6, numa_nodes=[[0, 1, 2, 3]], total_memory=16)
+    assert allocator.num_slots == 2
+    assert allocator.allocate(0) == [0]
+    assert allocator.allocate(1) == [1]
+    assert allocator.allocate(2) is None
+
+    with pytest.raises(ValueError):
+        CoreAllocator(1, memory_per_trial=32, numa_nodes=[[0]], total_memory=16)
+    with pytest.raises(ValueError):
+        CoreAllocator(2, numa_nodes=[[0]], total_memory=16)
+
+
+def test_pin_process():
+    cores = sorted(os.sched_getaffinity(0))
+    pid = os.fork()
+    if pid == 0:
+        pin_process(0, cores[:1])
+        os._exit(0 if os.sched_getaffinity(0) == {cores[0]} else 1)
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    assert get_thread_environment([0, 1]) == {"OMP_NUM_THREADS": "2"}
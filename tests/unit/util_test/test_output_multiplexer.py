@@ -0,0 +1,103 @@
+import subprocess
+import sys
+import threading
+from subprocess import PIPE
+
+import pytest
+
+from aiaccel.util import OutputMultiplexer, OutputReader
+
+SCRIPT = """
+import sys
+for i in range(1000):
+    print(i)
+sys.stderr.write("warning\\n")
+print("last", end="")
+sys.exit(3)
+"""
+
+
+def count_multiplexer_threads():
+    return sum(t.name == "OutputMultiplexer" for t in threading.enumerate())
+
+
+def test_output_reader(tmp_path):
+    num_threads = count_multiplexer_threads()
+    multiplexer = OutputMultiplexer()
+    exited = threading.Event()
+    stderr_file = tmp_path / "error.txt"
+    readers = [
+        OutputReader(
+            subprocess.Popen([sys.executable, "-c", SCRIPT], stdout=PIPE, stderr=PIPE, bufsize=0),
+            on_exit=exited.set,
+            tail_lines=3,
+            stderr_file=stderr_file,
+            multiplexer=multiplexer,
+        )
+        for _ in range(8)
+    ]
+    assert not readers[0].is_alive()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join(30)
+        assert not reader.is_alive()
+        assert reader.get_returncode() == 3
+        assert reader.get_stdouts() == ["998", "999", "last"]
+        assert reader.get_stderrs() == ["warning"]
+        assert reader.get_end_time() != ""
+        # The pipes are closed at EOF.
+        assert reader._proc.stdout.closed and reader._proc.stderr.closed
+        with pytest.raises(RuntimeError):
+            reader.raise_exception_if_error()
+    assert exited.is_set()
+    assert stderr_file.read_text() == "warning\n" * 8
+    # One thread reads the output of all subprocesses.
+    assert count_multiplexer_threads() == num_threads + 1
+
+
+def test_output_reader_without_pipes():
+    reader = OutputReader(subprocess.Popen([sys.executable, "-c", "pass"]), multiplexer=OutputMultiplexer())
+    reader.start()
+    reader.join(30)
+    assert reader.get_returncode() == 0
+    assert reader.get_stdouts() == []
+
+
+def test_output_reader_errors(caplog):
+    multiplexer = OutputMultiplexer()
+
+    def raise_error(*args):
+        raise RuntimeError("error")
+
+    # An exception from on_exit does not stop the thread.
+    reader = OutputReader(
+        subprocess.Popen([sys.executable, "-c", "print(1)"], stdout=PIPE, stderr=PIPE, bufsize=0),
+        on_exit=raise_error,
+        multiplexer=multiplexer,
+    )
+    reader.start()
+    reader.join(30)
+    assert not reader.is_alive()
+
+    # A reader that fails to read its output is finished.
+    reader = OutputReader(
+        subprocess.Popen([sys.executable, "-c", "print(1)"], stdout=PIPE, stderr=PIPE, bufsize=0),
+        multiplexer=multiplexer,
+    )
+    reader._feed = raise_error
+    reader.start()
+    reader.join(30)
+    assert not reader.is_alive()
+    assert reader._proc.stdout.closed
+    reader._proc.wait()
+
+    reader = OutputReader(
+        subprocess.Popen([sys.executable, "-c", "print(1)"], stdout=PIPE, stderr=PIPE, bufsize=0),
+        multiplexer=multiplexer,
+    )
+    reader.start()
+    reader.join(30)
+    assert reader.get_stdouts() == ["1"]
+    assert "Failed to finish the output" in caplog.text
+    assert "Failed to read the stdout" in caplog.text
@@ -1,8 +1,9 @@
 import os
 import subprocess
+import threading
 from subprocess import PIPE
 
-from aiaccel.util import OutputHandler, ps2joblist
+from aiaccel.util import OutputHandler, notify_on_exit, ps2joblist
 
 
 '''
@@ -94,3 +95,15 @@ def test_OutputHandler():
         assert False
     except TypeError:
         assert True
+
+
+def test_notify_on_exit():
+    exited = threading.Event()
+    _ouputhandler = OutputHandler(subprocess.Popen(["ls"], stdout=PIPE, stderr=PIPE), on_exit=exited.set)
+    _ouputhandler.start()
+    assert exited.wait(10)
+    _ouputhandler.join()
+
+    exited.clear()
+    notify_on_exit(subprocess.Popen(["ls"], stdout=PIPE), exited.set).join(10)
+    assert exited.is_set()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from aiaccel.util import ProcessRegistry
+from aiaccel.util.process_registry import get_child_pids, get_peak_rss
+
+SCRIPT = """
+import subprocess
+import sys
+import time
+
+data = bytearray(64 * 1024 * 1024)
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+print("ready", flush=True)
+end = time.time() + 0.2
+while time.time() < end:
+    pass
+time.sleep(60)
+"""
+
+
+@pytest.fixture
+def proc():
+    proc = subprocess.Popen([sys.executable, "-c", SCRIPT], stdout=subprocess.PIPE, start_new_session=True)
+    assert proc.stdout.readline() == b"ready\n"
+    yield proc
+    os.killpg(proc.pid, 9)
+    proc.wait()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc is used")
+def test_process_registry(proc):
+    registry = ProcessRegistry()
+    registry.register(3, proc.pid)
+    assert registry.get_trial_ids() == [3]
+    assert len(get_child_pids(proc.pid)) == 1
+    assert get_peak_rss(proc.pid) >= 64 * 1024 * 1024
+
+    time.sleep(0.3)
+    stats = registry.sample()
+    assert len(stats) == 1
+    stat = stats[0]
+    assert stat["trial_id"] == 3
+    assert stat["job-ID"] == proc.pid
+    assert "import subprocess" in stat["name"]
+    assert stat["num_processes"] == 2
+    assert stat["cpu_time"] >= 0.1
+    assert stat["peak_rss"] >= 64 * 1024 * 1024
+    assert stat["rss"] <= stat["peak_rss"]
+
+    registry.unregister(3)
+    assert registry.sample() == []
+
+
+def test_process_registry_exited():
+    registry = ProcessRegistry()
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    registry.register(0, proc.pid)
+    proc.wait()
+    assert registry.sample() == []
+    assert get_child_pids(proc.pid) == []
+    assert get_peak_rss(proc.pid) == 0
+    registry.register(1, proc.pid)
+    assert registry.get_trial_ids() == [0]
@@ -1,6 +1,9 @@
+import time
+
 import pytest
 
 from aiaccel.util import retry
+from aiaccel.util.retry import NonRetryableError, retry_counts
 
 
 @retry(_MAX_NUM=5, _DELAY=0.1)
@@ -23,3 +26,46 @@ def test_retry():
     assert dummy_normal_1() is None
     with pytest.raises(ValueError):
         dummy_error()
+
+
+def test_retry_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, "sleep", delays.append)
+
+    @retry(_MAX_NUM=6, _DELAY=0.01, _MAX_DELAY=0.05, _BACKOFF=2.0, _JITTER=0.5)
+    def dummy_locked():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        dummy_locked()
+    assert len(delays) == 5
+    for delay, upper in zip(delays, [0.01, 0.02, 0.04, 0.05, 0.05]):
+        assert upper * 0.5 <= delay <= upper
+    assert retry_counts[dummy_locked.__qualname__] == 5
+
+
+def test_retry_keyboard_interrupt():
+    calls = []
+
+    @retry(_MAX_NUM=5, _DELAY=0.1)
+    def dummy_interrupt():
+        calls.append(1)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        dummy_interrupt()
+    assert len(calls) == 1
+
+
+def test_retry_non_retryable_error():
+    calls = []
+
+    @retry(_MAX_NUM=5, _DELAY=0.1)
+    def dummy_non_retryable():
+        calls.append(1)
+        raise NonRetryableError
+
+    with pytest.raises(NonRetryableError):
+        dummy_non_retryable()
+    assert len(calls) == 1
+    assert retry_counts[dummy_non_retryable.__qualname__] == 0
@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from aiaccel.util import WarmWorkerPool
+from aiaccel.util.warm_worker import format_report
+
+SCRIPT = """
+import os
+import os
+import sys
+import time
+
+import aiaccel
+
+with open(sys.argv[1], "a") as f:
+    f.write(f"{os.getpid()}\\n")
+
+
+def main(p):
+    if p["x"] < 0:
+        raise ValueError("negative")
+    if p["x"] > 100:
+        time.sleep(60)
+    return p["x"] ** 2
+
+
+if __name__ == "__main__":
+    run = aiaccel.Run()
+    run.execute_and_report(main)
+"""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / "user.py"
+    script.write_text(SCRIPT)
+    pool = WarmWorkerPool([sys.executable, str(script), str(tmp_path / "imports.txt")], output_dir=tmp_path)
+    yield pool
+    pool.close()
+
+
+def test_format_report():
+    assert format_report(None) == []
+    assert format_report("1, 2") == ["1", "2"]
+    assert format_report([1.0, 2]) == ["1.0", "2"]
+    assert format_report(3) == ["3"]
+
+
+def test_warm_worker_pool(pool, tmp_path):
+    for x in range(3):
+        exited = threading.Event()
+        job = pool.submit(x, {"x": x}, on_exit=exited.set, stderr_file=tmp_path / f"{x}.txt")
+        job.join(30)
+        assert not job.is_alive()
+        assert exited.is_set()
+        assert job.get_returncode() == 0
+        assert job.get_stdouts() == [str(x**2)]
+        assert job.get_end_time() != ""
+    # The user program is started once for all trials.
+    assert len((tmp_path / "imports.txt").read_text().splitlines()) == 1
+
+    job = pool.submit(3, {"x": -1}, stderr_file=tmp_path / "3.txt")
+    job.join(30)
+    assert job.get_returncode() == 1
+    assert job.get_stdouts() == []
+    assert "ValueError: negative" in (tmp_path / "3.txt").read_text()
+    with pytest.raises(RuntimeError):
+        job.raise_exception_if_error()
+
+
+def test_warm_worker_pool_kill(pool, tmp_path):
+    job = pool.submit(0, {"x": 1000})
+    imports = tmp_path / "imports.txt"
+    deadline = time.time() + 30
+    while not imports.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        job.enforce_kill()
+    job.join(30)
+    assert job.get_returncode() == 1
+
+    # A new worker replaces the killed one.
+    job = pool.submit(1, {"x": 2})
+    job.join(30)
+    assert job.get_stdouts() == ["4"]
+    assert len(imports.read_text().splitlines()) == 2
+
+
+def test_warm_worker_pool_dead_idle_worker(pool, tmp_path):
+    job = pool.submit(0, {"x": 1})
+    job.join(30)
+    assert job.get_returncode() == 0
+
+    # The idle worker exits while no trial is running.
+    worker = pool._idle[0]
+    worker.proc.kill()
+    worker.proc.wait()
+
+    job = pool.submit(1, {"x": 3})
+    job.join(30)
+    assert job.get_returncode() == 0
+    assert job.get_stdouts() == ["9"]
+    assert worker not in pool._all
+    assert len((tmp_path / "imports.txt").read_text().splitlines()) == 2
+
+
+def test_warm_worker_pool_without_run(tmp_path):
+    pool = WarmWorkerPool([sys.executable, "-c", "print(1)"])
+    try:
+        job = pool.submit(0, {"x": 1})
+        job.join(30)
+        assert job.get_returncode() == 1
+        assert "execute_and_report" in job.get_stderrs()[-1]
+    finally:
+        pool.close()
+
+
+def test_warm_worker_pool_env(tmp_path):
+    # The thread environment has to be set before the user program imports
+    # its libraries, so the workers start with it.
+    script = tmp_path / "user.py"
+    script.write_text(
+        "import os\n"
+        "import aiaccel\n"
+        "threads = os.environ.get('OMP_NUM_THREADS')\n"
+        "aiaccel.Run().execute_and_report(lambda p: threads)\n"
+    )
+    pool = WarmWorkerPool([sys.executable, str(script)], env={"OMP_NUM_THREADS": "3"})
+    try:
+        job = pool.submit(0, {"x": 1}, cores=sorted(os.sched_getaffinity(0))[:1])
+        job.join(30)
+        assert job.get_stdouts() == ["3"]
+    finally:
+        pool.close()